@@ -1,15 +1,27 @@
 from fastapi import APIRouter, UploadFile, File, Form, HTTPException
 from fastapi.responses import JSONResponse, StreamingResponse, FileResponse
-from typing import List, Dict
+from typing import List, Dict, Optional
 import os
 import uuid
+import shutil
 import aiofiles
 import asyncio
 import json
-import shutil
-from datetime import datetime, timedelta
+import hashlib
 from app.services.cv_matcher import CVMatcher
-from app.models import FilterResponse, CVMatchResult, ErrorResponse, ProgressUpdate
+from app.services.cache import get_analysis_cache, get_text_cache
+from app.services.file_store import FileStore
+from app.services.janitor import StorageJanitor
+from app.services.progress import ProgressBus, TopKRanking
+from app.services.job_queue import JobQueue, JobRunner, FINAL_STATUSES
+from app.services.cv_index import get_cv_index, EDUCATION_LEVELS
+from app.services.file_processor import FileProcessor
+from app.services.rate_limiter import get_rate_limiter
+from app.services.latency_stats import get_latency_stats
+from app.models import (
+    FilterResponse, CVMatchResult, ErrorResponse, ProgressUpdate, JobStatus, JobResultsResponse,
+    MultiFilterResponse, RoleFilterResponse
+)
 
 router = APIRouter()
 
@@ -19,12 +31,145 @@ STORAGE_DIR = "file_storage"
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 os.makedirs(STORAGE_DIR, exist_ok=True)
 
-# Store file mappings (file_id -> file_path)
-file_storage: Dict[str, Dict[str, any]] = {}
+# Upload limits and streaming chunk size
+MAX_FILE_SIZE = 50 * 1024 * 1024  # 50MB per file
+MAX_TOTAL_SIZE = 200 * 1024 * 1024  # 200MB total
+UPLOAD_CHUNK_SIZE = 1024 * 1024  # 1MB
 
-async def process_with_progress(file_paths, requirements, progress_queue):
-    """Process CVs and send progress updates via queue"""
-    matcher = CVMatcher()
+# Maximum number of requirement sets accepted by /upload-multi
+MAX_REQUIREMENT_SETS = int(os.getenv("MAX_REQUIREMENT_SETS", "20"))
+
+# Number of best candidates kept in the ranking streamed over SSE
+RANKING_TOP_K = int(os.getenv("RANKING_TOP_K", "10"))
+
+# Persistent file metadata (file_id -> stored path), shared by all worker processes
+file_store = FileStore()
+
+# Background retention/garbage collection for STORAGE_DIR and stranded uploads (started in main.py)
+janitor = StorageJanitor(file_store, STORAGE_DIR, UPLOAD_DIR)
+
+# Durable screening jobs that survive disconnects and restarts (workers started in main.py)
+job_queue = JobQueue()
+job_runner = JobRunner(job_queue)
+janitor.add_reference_source(job_queue.active_file_ids)
+janitor.add_protected_path(job_queue.db_path)
+
+# Searchable index of every stored CV (None if CV_INDEX_ENABLED=false); entries go with their contents
+cv_index = get_cv_index()
+
+def drop_from_index(record: Dict[str, any]):
+    if cv_index and record.get('content_hash'):
+        cv_index.remove(record['content_hash'])
+
+janitor.add_removal_listener(drop_from_index)
+if cv_index:
+    janitor.add_protected_path(cv_index.db_path)
+
+# Concurrent extractions while backfilling the index from stored files
+INDEX_REBUILD_CONCURRENCY = int(os.getenv("INDEX_REBUILD_CONCURRENCY", "4"))
+
+# How often a job stream re-checks the queue when the job runs in another process
+JOB_STREAM_INTERVAL = float(os.getenv("JOB_STREAM_INTERVAL", "1"))
+
+class UploadTooLargeError(ValueError):
+    """Raised while streaming an upload that exceeds the per-file or total size limit"""
+
+async def save_upload(file: UploadFile, total_size: int = 0) -> Dict[str, any]:
+    """
+    Stream an upload to disk in chunks, enforcing size limits and hashing as it goes.
+    Stored contents are deduplicated: the bytes are kept once per content hash under
+    STORAGE_DIR/blobs and every upload of the same contents gets a file_id referencing that blob.
+    A new blob is hardlinked from the upload file, so processing and storage share one copy.
+    total_size: bytes already accepted earlier in the same request
+    Returns file metadata including 'processing_path' and the durable 'stored_path'
+    """
+    upload_id = str(uuid.uuid4())
+    file_id = str(uuid.uuid4())
+    safe_name = os.path.basename(file.filename)
+    file_extension = os.path.splitext(safe_name)[1].lower()
+    upload_path = os.path.join(UPLOAD_DIR, f"{upload_id}_{safe_name}")
+    
+    digest = hashlib.sha256()
+    file_size = 0
+    try:
+        async with aiofiles.open(upload_path, 'wb') as f:
+            while True:
+                chunk = await file.read(UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                file_size += len(chunk)
+                if file_size > MAX_FILE_SIZE:
+                    raise UploadTooLargeError(
+                        f"File '{file.filename}' is too large. Maximum size is 50MB per file."
+                    )
+                if total_size + file_size > MAX_TOTAL_SIZE:
+                    raise UploadTooLargeError(
+                        "Total file size exceeds limit (200MB). Please upload fewer or smaller files."
+                    )
+                digest.update(chunk)
+                await f.write(chunk)
+        
+        content_hash = digest.hexdigest()
+        processing_path = upload_path
+        
+        def materialize(blob_path: str):
+            # Runs inside the reference transaction: the first copy of these contents (or a blob
+            # that went missing) is hardlinked into storage; if the directories are on different
+            # filesystems, the file is moved instead and processed from storage
+            nonlocal processing_path
+            if os.path.exists(blob_path):
+                return
+            os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+            try:
+                os.link(upload_path, blob_path)
+            except OSError:
+                shutil.move(upload_path, blob_path)
+                processing_path = blob_path
+        
+        blob_path = os.path.join(STORAGE_DIR, "blobs", content_hash[:2], f"{content_hash}{file_extension}")
+        blob_path = await asyncio.to_thread(
+            file_store.add_blob_reference,
+            file_id,
+            blob_path,
+            file.filename,
+            content_hash,
+            file_size,
+            materialize=materialize
+        )
+    except BaseException:
+        if os.path.exists(upload_path):
+            os.remove(upload_path)
+        raise
+    
+    return {
+        'file_id': file_id,
+        'processing_path': processing_path,
+        'stored_path': blob_path,
+        'size': file_size,
+        'content_hash': content_hash
+    }
+
+def cleanup_uploads(file_paths: List[tuple]):
+    """Remove temporary upload links (files that live only in storage are kept)"""
+    upload_dir = os.path.abspath(UPLOAD_DIR)
+    for file_path, _, _ in file_paths:
+        try:
+            if os.path.dirname(os.path.abspath(file_path)) == upload_dir and os.path.exists(file_path):
+                os.remove(file_path)
+        except Exception:
+            pass
+
+def screening_options(top_n: Optional[int], threshold: Optional[float], fast_mode: bool = False) -> Dict[str, any]:
+    """Validate the local pre-filter / fast-mode form fields and map them to CVMatcher arguments"""
+    if top_n is not None and top_n < 1:
+        raise HTTPException(status_code=400, detail="prefilter_top_n must be at least 1")
+    if threshold is not None and not 0 <= threshold <= 100:
+        raise HTTPException(status_code=400, detail="prefilter_threshold must be between 0 and 100")
+    return {"prefilter_top_n": top_n, "prefilter_threshold": threshold, "fast_mode": fast_mode}
+
+async def process_with_progress(file_paths, requirements, progress_bus, content_hashes=None, screening=None, matcher=None):
+    """Process CVs and publish progress updates to the progress bus"""
+    matcher = matcher or CVMatcher()
     
     def progress_callback(filename, status, progress, step):
         """Callback to send progress updates"""
@@ -34,13 +179,16 @@ async def process_with_progress(file_paths, requirements, progress_queue):
             progress=progress,
             current_step=step
         )
-        progress_queue.put_nowait(update)
+        progress_bus.publish(update)
     
     try:
         results = await matcher.process_cv_files(
             file_paths, 
             requirements,
-            progress_callback=progress_callback
+            progress_callback=progress_callback,
+            content_hashes=content_hashes,
+            result_callback=progress_bus.publish_result,
+            **(screening or {})
         )
         return results
     except Exception as e:
@@ -49,11 +197,18 @@ async def process_with_progress(file_paths, requirements, progress_queue):
 @router.post("/upload")
 async def upload_and_filter_cvs(
     requirements: str = Form(...),
-    files: List[UploadFile] = File(...)
+    files: List[UploadFile] = File(...),
+    prefilter_top_n: Optional[int] = Form(None),
+    prefilter_threshold: Optional[float] = Form(None),
+    fast_mode: bool = Form(False)
 ):
     """
     Upload multiple CV files and filter them against requirements
-    Returns Server-Sent Events (SSE) stream with progress updates and final results
+    Returns Server-Sent Events (SSE) stream with progress updates, each result as soon as it
+    is scored ('result'), the current top candidates ('ranking') and a final 'complete' event
+    prefilter_top_n / prefilter_threshold: optionally rank CVs locally first and only send the
+    top N and/or those scoring at least the threshold (0-100) to the LLM
+    fast_mode: score CVs with the local skill engine only (no LLM calls)
     """
     if not files:
         raise HTTPException(status_code=400, detail="No files uploaded")
@@ -61,22 +216,23 @@ async def upload_and_filter_cvs(
     if not requirements or not requirements.strip():
         raise HTTPException(status_code=400, detail="Requirements cannot be empty")
     
+    screening = screening_options(prefilter_top_n, prefilter_threshold, fast_mode)
+    
     # Validate file types and sizes
     allowed_extensions = ['.pdf', '.docx']
-    MAX_FILE_SIZE = 50 * 1024 * 1024  # 50MB per file
-    MAX_TOTAL_SIZE = 200 * 1024 * 1024  # 200MB total
     file_paths = []
-    total_size = 0
     
     async def generate():
         """Generate SSE stream with progress updates"""
-        progress_queue = asyncio.Queue()
-        results = None
+        progress_bus = ProgressBus()
         error = None
         file_id_mapping: Dict[str, str] = {}  # filename -> file_id
+        content_hashes: Dict[str, str] = {}  # processing path -> SHA-256 of contents
+        
+        pinned = False
         
         try:
-            # Save uploaded files and store them for download/preview
+            # Stream uploaded files to disk and store them for download/preview
             total_size = 0
             for file in files:
                 file_extension = os.path.splitext(file.filename)[1].lower()
@@ -85,58 +241,21 @@ async def upload_and_filter_cvs(
                     yield f"data: {json.dumps({'type': 'error', 'message': error})}\n\n"
                     return
                 
-                # Read file content to check size
-                content = await file.read()
-                file_size = len(content)
-                total_size += file_size
-                
-                # Validate file size (50MB per file, 200MB total)
-                MAX_FILE_SIZE = 50 * 1024 * 1024  # 50MB
-                MAX_TOTAL_SIZE = 200 * 1024 * 1024  # 200MB
-                
-                if file_size > MAX_FILE_SIZE:
-                    error = f"File '{file.filename}' is too large ({file_size / 1024 / 1024:.1f}MB). Maximum size is 50MB per file."
-                    yield f"data: {json.dumps({'type': 'error', 'message': error})}\n\n"
-                    return
-                
-                if total_size > MAX_TOTAL_SIZE:
-                    error = f"Total file size ({total_size / 1024 / 1024:.1f}MB) exceeds limit (200MB). Please upload fewer or smaller files."
-                    yield f"data: {json.dumps({'type': 'error', 'message': error})}\n\n"
+                # Size limits (50MB per file, 200MB total) are enforced while streaming
+                try:
+                    saved = await save_upload(file, total_size)
+                except UploadTooLargeError as e:
+                    yield f"data: {json.dumps({'type': 'error', 'message': str(e)})}\n\n"
                     return
+                total_size += saved['size']
                 
-                # Generate unique IDs
-                upload_id = str(uuid.uuid4())
-                file_id = str(uuid.uuid4())
-                
-                # Save to upload directory for processing
-                upload_path = os.path.join(UPLOAD_DIR, f"{upload_id}_{file.filename}")
-                
-                async with aiofiles.open(upload_path, 'wb') as f:
-                    await f.write(content)
-                
-                # Copy to storage directory for download/preview
-                storage_path = os.path.join(STORAGE_DIR, f"{file_id}_{file.filename}")
-                shutil.copy2(upload_path, storage_path)
-                
-                # Store file metadata
-                file_storage[file_id] = {
-                    'path': storage_path,
-                    'filename': file.filename,
-                    'uploaded_at': datetime.now(),
-                    'file_id': file_id
-                }
-                
-                file_id_mapping[file.filename] = file_id
-                file_paths.append((upload_path, file.filename, file_extension))
-            
-            # Start processing in background
-            processing_task = asyncio.create_task(
-                process_with_progress(file_paths, requirements, progress_queue)
-            )
+                file_id_mapping[file.filename] = saved['file_id']
+                content_hashes[saved['processing_path']] = saved['content_hash']
+                file_paths.append((saved['processing_path'], file.filename, file_extension))
             
-            # Track completed/errored files to ensure we process all files
-            completed_files = set()
-            total_files = len(file_paths)
+            # Keep these files safe from the janitor while they are processed
+            await janitor.pin(file_id_mapping.values())
+            pinned = True
             
             # Send initial progress for all files (0% - queued)
             for _, filename, _ in file_paths:
@@ -147,78 +266,70 @@ async def upload_and_filter_cvs(
                     current_step=f"Queued for processing: {filename}..."
                 )
                 yield f"data: {json.dumps({'type': 'progress', 'data': initial_update.dict()})}\n\n"
-                await asyncio.sleep(0.05)  # Small delay between initial updates
             
-            # Stream progress updates until all files are processed
-            while True:
-                try:
-                    # Get progress update with timeout
-                    update = await asyncio.wait_for(progress_queue.get(), timeout=0.1)
-                    yield f"data: {json.dumps({'type': 'progress', 'data': update.dict()})}\n\n"
-                    
-                    # Track completed or errored files
-                    if (update.status == "completed" and update.progress >= 100) or update.status == "error":
-                        completed_files.add(update.filename)
-                    
-                    # Check if all files are completed or errored
-                    if len(completed_files) >= total_files:
-                        # Wait a bit more to get any remaining updates
-                        await asyncio.sleep(0.3)
-                        # Try to get any remaining updates
-                        try:
-                            while True:
-                                update = await asyncio.wait_for(progress_queue.get(), timeout=0.05)
-                                yield f"data: {json.dumps({'type': 'progress', 'data': update.dict()})}\n\n"
-                                if (update.status == "completed" and update.progress >= 100) or update.status == "error":
-                                    completed_files.add(update.filename)
-                        except asyncio.TimeoutError:
-                            pass
-                        break
-                except asyncio.TimeoutError:
-                    # Check if processing task is done
-                    if processing_task.done():
-                        # Get any remaining updates
-                        await asyncio.sleep(0.2)
-                        try:
-                            while True:
-                                update = await asyncio.wait_for(progress_queue.get(), timeout=0.05)
-                                yield f"data: {json.dumps({'type': 'progress', 'data': update.dict()})}\n\n"
-                                if (update.status == "completed" and update.progress >= 100) or update.status == "error":
-                                    completed_files.add(update.filename)
-                        except asyncio.TimeoutError:
-                            pass
-                        break
-                    continue
-            
-            # Get final results
-            results = await processing_task
+            # Start processing in background; the progress stream ends as soon as it finishes
+            matcher = CVMatcher()
+            processing_task = asyncio.create_task(
+                process_with_progress(file_paths, requirements, progress_bus, content_hashes, screening, matcher)
+            )
+            processing_task.add_done_callback(lambda _: progress_bus.close())
             
-            # Add file_id to each result
-            for result in results:
-                if result.filename in file_id_mapping:
-                    result.file_id = file_id_mapping[result.filename]
+            # Stream progress updates and results as they are published
+            ranking = TopKRanking(RANKING_TOP_K)
+            completed = 0
+            async for items in progress_bus.stream():
+                if not items:
+                    # Idle (e.g. every file waiting on the LLM): an SSE comment keeps proxies from closing the connection
+                    yield ": keep-alive\n\n"
+                    continue
+                ranking_changed = False
+                for item in items:
+                    if isinstance(item, ProgressUpdate):
+                        yield f"data: {json.dumps({'type': 'progress', 'data': item.dict()})}\n\n"
+                        continue
+                    
+                    item.file_id = file_id_mapping.get(item.filename)
+                    completed += 1
+                    result_data = {
+                        "type": "result",
+                        "data": {
+                            "result": item.dict(),
+                            "completed": completed,
+                            "total": len(file_paths),
+                            "eta_seconds": matcher.batch_eta()
+                        }
+                    }
+                    yield f"data: {json.dumps(result_data)}\n\n"
+                    ranking_changed = ranking.add(item) or ranking_changed
+                
+                if ranking_changed:
+                    ranking_data = {
+                        "type": "ranking",
+                        "data": {
+                            "top": [
+                                {
+                                    "filename": result.filename,
+                                    "file_id": result.file_id,
+                                    "match_percentage": result.match_percentage
+                                }
+                                for result in ranking.top()
+                            ]
+                        }
+                    }
+                    yield f"data: {json.dumps(ranking_data)}\n\n"
             
-            # Send final results
-            response_data = {
-                "type": "results",
-                "data": {
-                    "results": [result.dict() for result in results],
-                    "total_cvs": len(results)
-                }
-            }
-            yield f"data: {json.dumps(response_data)}\n\n"
+            # Surface processing failures; every result has already been sent
+            await processing_task
+            yield f"data: {json.dumps({'type': 'complete', 'data': {'total_cvs': completed}})}\n\n"
             
         except Exception as e:
             error = str(e)
             yield f"data: {json.dumps({'type': 'error', 'message': error})}\n\n"
         finally:
+            if pinned:
+                await janitor.unpin(file_id_mapping.values())
             # Clean up uploaded files (but keep storage files for download/preview)
-            for file_path, _, _ in file_paths:
-                try:
-                    if os.path.exists(file_path):
-                        os.remove(file_path)
-                except Exception:
-                    pass
+            cleanup_uploads(file_paths)
     
     return StreamingResponse(
         generate(),
@@ -233,11 +344,15 @@ async def upload_and_filter_cvs(
 @router.post("/upload-sync", response_model=FilterResponse)
 async def upload_and_filter_cvs_sync(
     requirements: str = Form(...),
-    files: List[UploadFile] = File(...)
+    files: List[UploadFile] = File(...),
+    prefilter_top_n: Optional[int] = Form(None),
+    prefilter_threshold: Optional[float] = Form(None),
+    fast_mode: bool = Form(False)
 ):
     """
     Upload multiple CV files and filter them against requirements (synchronous version)
     Use this endpoint if SSE is not supported
+    prefilter_top_n / prefilter_threshold / fast_mode: same local options as /upload
     """
     if not files:
         raise HTTPException(status_code=400, detail="No files uploaded")
@@ -245,13 +360,17 @@ async def upload_and_filter_cvs_sync(
     if not requirements or not requirements.strip():
         raise HTTPException(status_code=400, detail="Requirements cannot be empty")
     
+    screening = screening_options(prefilter_top_n, prefilter_threshold, fast_mode)
+    
     allowed_extensions = ['.pdf', '.docx']
     file_paths = []
     
     file_id_mapping: Dict[str, str] = {}
+    content_hashes: Dict[str, str] = {}
     
     try:
-        # Save uploaded files and store them for download/preview
+        # Stream uploaded files to disk and store them for download/preview
+        total_size = 0
         for file in files:
             file_extension = os.path.splitext(file.filename)[1].lower()
             if file_extension not in allowed_extensions:
@@ -260,34 +379,28 @@ async def upload_and_filter_cvs_sync(
                     detail=f"Unsupported file type: {file_extension}. Allowed types: {', '.join(allowed_extensions)}"
                 )
             
-            upload_id = str(uuid.uuid4())
-            file_id = str(uuid.uuid4())
-            
-            # Save to upload directory for processing
-            upload_path = os.path.join(UPLOAD_DIR, f"{upload_id}_{file.filename}")
-            
-            async with aiofiles.open(upload_path, 'wb') as f:
-                content = await file.read()
-                await f.write(content)
-            
-            # Copy to storage directory for download/preview
-            storage_path = os.path.join(STORAGE_DIR, f"{file_id}_{file.filename}")
-            shutil.copy2(upload_path, storage_path)
-            
-            # Store file metadata
-            file_storage[file_id] = {
-                'path': storage_path,
-                'filename': file.filename,
-                'uploaded_at': datetime.now(),
-                'file_id': file_id
-            }
+            try:
+                saved = await save_upload(file, total_size)
+            except UploadTooLargeError as e:
+                raise HTTPException(status_code=413, detail=str(e))
+            total_size += saved['size']
             
-            file_id_mapping[file.filename] = file_id
-            file_paths.append((upload_path, file.filename, file_extension))
+            file_id_mapping[file.filename] = saved['file_id']
+            content_hashes[saved['processing_path']] = saved['content_hash']
+            file_paths.append((saved['processing_path'], file.filename, file_extension))
         
         # Process CVs
         matcher = CVMatcher()
-        results = await matcher.process_cv_files(file_paths, requirements)
+        await janitor.pin(file_id_mapping.values())
+        try:
+            results = await matcher.process_cv_files(
+                file_paths,
+                requirements,
+                content_hashes=content_hashes,
+                **screening
+            )
+        finally:
+            await janitor.unpin(file_id_mapping.values())
         
         # Add file_id to each result
         for result in results:
@@ -295,12 +408,7 @@ async def upload_and_filter_cvs_sync(
                 result.file_id = file_id_mapping[result.filename]
         
         # Clean up uploaded files (but keep storage files)
-        for file_path, _, _ in file_paths:
-            try:
-                if os.path.exists(file_path):
-                    os.remove(file_path)
-            except Exception:
-                pass
+        cleanup_uploads(file_paths)
         
         return FilterResponse(
             results=results,
@@ -308,29 +416,99 @@ async def upload_and_filter_cvs_sync(
         )
         
     except HTTPException:
-        for file_path, _, _ in file_paths:
-            try:
-                if os.path.exists(file_path):
-                    os.remove(file_path)
-            except Exception:
-                pass
+        cleanup_uploads(file_paths)
         raise
     except Exception as e:
-        for file_path, _, _ in file_paths:
+        cleanup_uploads(file_paths)
+        raise HTTPException(status_code=500, detail=f"Error processing CVs: {str(e)}")
+
+@router.post("/upload-multi", response_model=MultiFilterResponse)
+async def upload_and_filter_cvs_multi(
+    requirements_sets: str = Form(...),
+    files: List[UploadFile] = File(...)
+):
+    """
+    Score the uploaded CVs against several requirement sets (e.g. open roles) at once
+    requirements_sets: JSON array of requirement strings
+    Each CV is extracted once and its text is shared across roles in multi-role LLM calls
+    """
+    if not files:
+        raise HTTPException(status_code=400, detail="No files uploaded")
+    
+    try:
+        requirements_list = json.loads(requirements_sets)
+    except json.JSONDecodeError:
+        raise HTTPException(status_code=400, detail="requirements_sets must be a JSON array of strings")
+    if (
+        not isinstance(requirements_list, list)
+        or not requirements_list
+        or not all(isinstance(requirements, str) and requirements.strip() for requirements in requirements_list)
+    ):
+        raise HTTPException(status_code=400, detail="requirements_sets must be a non-empty JSON array of non-empty strings")
+    if len(requirements_list) > MAX_REQUIREMENT_SETS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_REQUIREMENT_SETS} requirement sets are allowed")
+    
+    allowed_extensions = ['.pdf', '.docx']
+    file_paths = []
+    file_ids = []
+    content_hashes: Dict[str, str] = {}
+    
+    try:
+        total_size = 0
+        for file in files:
+            file_extension = os.path.splitext(file.filename)[1].lower()
+            if file_extension not in allowed_extensions:
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"Unsupported file type: {file_extension}. Allowed types: {', '.join(allowed_extensions)}"
+                )
+            
             try:
-                if os.path.exists(file_path):
-                    os.remove(file_path)
-            except Exception:
-                pass
+                saved = await save_upload(file, total_size)
+            except UploadTooLargeError as e:
+                raise HTTPException(status_code=413, detail=str(e))
+            total_size += saved['size']
+            
+            file_ids.append(saved['file_id'])
+            content_hashes[saved['processing_path']] = saved['content_hash']
+            file_paths.append((saved['processing_path'], file.filename, file_extension))
+        
+        matcher = CVMatcher()
+        await janitor.pin(file_ids)
+        try:
+            per_role = await matcher.process_cv_files_multi(
+                file_paths,
+                requirements_list,
+                content_hashes=content_hashes,
+                file_ids=file_ids
+            )
+        finally:
+            await janitor.unpin(file_ids)
+        
+        cleanup_uploads(file_paths)
+        
+        return MultiFilterResponse(
+            roles=[
+                RoleFilterResponse(requirements=requirements, results=results, total_cvs=len(results))
+                for requirements, results in zip(requirements_list, per_role)
+            ],
+            total_cvs=len(file_paths)
+        )
+        
+    except HTTPException:
+        cleanup_uploads(file_paths)
+        raise
+    except Exception as e:
+        cleanup_uploads(file_paths)
         raise HTTPException(status_code=500, detail=f"Error processing CVs: {str(e)}")
 
 @router.get("/file/{file_id}")
 async def get_file(file_id: str):
     """Get file for preview or download"""
-    if file_id not in file_storage:
+    file_info = await asyncio.to_thread(file_store.get, file_id)
+    if file_info is None:
         raise HTTPException(status_code=404, detail="File not found")
     
-    file_info = file_storage[file_id]
     file_path = file_info['path']
     
     if not os.path.exists(file_path):
@@ -345,10 +523,10 @@ async def get_file(file_id: str):
 @router.get("/file/{file_id}/preview")
 async def preview_file(file_id: str):
     """Preview file (same as get_file but with inline disposition)"""
-    if file_id not in file_storage:
+    file_info = await asyncio.to_thread(file_store.get, file_id)
+    if file_info is None:
         raise HTTPException(status_code=404, detail="File not found")
     
-    file_info = file_storage[file_id]
     file_path = file_info['path']
     
     if not os.path.exists(file_path):
@@ -364,20 +542,299 @@ async def preview_file(file_id: str):
 @router.delete("/file/{file_id}")
 async def delete_file(file_id: str):
     """Delete stored file"""
-    if file_id not in file_storage:
+    file_info = await asyncio.to_thread(file_store.get, file_id)
+    if file_info is None:
         raise HTTPException(status_code=404, detail="File not found")
     
-    file_info = file_storage[file_id]
-    file_path = file_info['path']
+    def release(path: str):
+        if os.path.exists(path):
+            os.remove(path)
     
     try:
-        if os.path.exists(file_path):
-            os.remove(file_path)
-        del file_storage[file_id]
+        # The stored contents are only removed once no other file_id references them
+        if await asyncio.to_thread(file_store.delete, file_id, release):
+            await asyncio.to_thread(drop_from_index, file_info)
         return {"message": "File deleted successfully"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error deleting file: {str(e)}")
 
+@router.post("/jobs", response_model=JobStatus, status_code=202)
+async def submit_job(
+    requirements: str = Form(...),
+    files: List[UploadFile] = File(...),
+    batch_mode: bool = Form(False)
+):
+    """
+    Upload CVs and queue them as a background screening job
+    The batch keeps running if the client disconnects; poll, stream or cancel it by job_id
+    batch_mode: score through an offline provider batch (cheaper, results may take hours)
+    """
+    if not files:
+        raise HTTPException(status_code=400, detail="No files uploaded")
+    
+    if not requirements or not requirements.strip():
+        raise HTTPException(status_code=400, detail="Requirements cannot be empty")
+    
+    allowed_extensions = ['.pdf', '.docx']
+    for file in files:
+        file_extension = os.path.splitext(file.filename)[1].lower()
+        if file_extension not in allowed_extensions:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Unsupported file type: {file_extension}. Allowed types: {', '.join(allowed_extensions)}"
+            )
+    
+    file_paths = []
+    job_files = []
+    try:
+        total_size = 0
+        for file in files:
+            try:
+                saved = await save_upload(file, total_size)
+            except UploadTooLargeError as e:
+                raise HTTPException(status_code=413, detail=str(e))
+            total_size += saved['size']
+            file_extension = os.path.splitext(file.filename)[1].lower()
+            file_paths.append((saved['processing_path'], file.filename, file_extension))
+            # Jobs outlive this request, so they read from storage rather than the upload temp file
+            job_files.append({
+                'file_id': saved['file_id'],
+                'filename': file.filename,
+                'path': saved['stored_path'],
+                'extension': file_extension,
+                'content_hash': saved['content_hash']
+            })
+        
+        options = {'batch_mode': True} if batch_mode else {}
+        job_id = await asyncio.to_thread(job_queue.submit, requirements, job_files, options)
+    finally:
+        cleanup_uploads(file_paths)
+    
+    job_runner.notify()
+    return JobStatus(**await asyncio.to_thread(job_queue.get, job_id))
+
+async def get_job_or_404(job_id: str) -> Dict[str, any]:
+    job = await asyncio.to_thread(job_queue.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@router.get("/jobs/{job_id}", response_model=JobStatus)
+async def get_job(job_id: str):
+    """Poll a job's status and progress"""
+    return JobStatus(**await get_job_or_404(job_id))
+
+@router.get("/jobs/{job_id}/results", response_model=JobResultsResponse)
+async def get_job_results(job_id: str):
+    """Results checkpointed so far (all of them once the job is completed)"""
+    job = await get_job_or_404(job_id)
+    results = await asyncio.to_thread(job_queue.results, job_id)
+    results.sort(key=lambda x: x.match_percentage, reverse=True)
+    return JobResultsResponse(job=JobStatus(**job), results=results)
+
+@router.get("/jobs/{job_id}/stream")
+async def stream_job(job_id: str, after: int = 0):
+    """
+    Server-Sent Events for a job: 'job' status changes, each 'result' as it is checkpointed and
+    a final 'complete'. Reconnect with after=<results already received> to resume the stream.
+    """
+    await get_job_or_404(job_id)
+    
+    async def generate():
+        sent = max(0, after)
+        last_state = None
+        while True:
+            job = await asyncio.to_thread(job_queue.get, job_id)
+            results = await asyncio.to_thread(job_queue.results, job_id, sent)
+            for result in results:
+                sent += 1
+                result_data = {
+                    "type": "result",
+                    "data": {"result": result.dict(), "completed": sent, "total": job['total']}
+                }
+                yield f"data: {json.dumps(result_data)}\n\n"
+            
+            state = (job['status'], job['completed'])
+            if state != last_state:
+                last_state = state
+                yield f"data: {json.dumps({'type': 'job', 'data': JobStatus(**job).dict()})}\n\n"
+            
+            if job['status'] in FINAL_STATUSES and sent >= job['completed']:
+                yield f"data: {json.dumps({'type': 'complete', 'data': {'status': job['status'], 'total_cvs': sent}})}\n\n"
+                return
+            await job_runner.wait_for_change(JOB_STREAM_INTERVAL)
+    
+    return StreamingResponse(
+        generate(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "Connection": "keep-alive",
+            "X-Accel-Buffering": "no"
+        }
+    )
+
+@router.delete("/jobs/{job_id}", response_model=JobStatus)
+async def cancel_job(job_id: str):
+    """Cancel a queued or running job; results checkpointed before cancellation are kept"""
+    job = await get_job_or_404(job_id)
+    if job['status'] in FINAL_STATUSES:
+        raise HTTPException(status_code=409, detail=f"Job is already {job['status']}")
+    await job_runner.cancel(job_id)
+    return JobStatus(**await get_job_or_404(job_id))
+
+def require_cv_index():
+    if cv_index is None:
+        raise HTTPException(status_code=404, detail="CV index is disabled (CV_INDEX_ENABLED=false)")
+    return cv_index
+
+async def search_stored_cvs(
+    query: str,
+    limit: int,
+    min_years: Optional[float],
+    education_level: Optional[str],
+    language: Optional[str]
+) -> List[Dict[str, any]]:
+    """Index hits that still have a stored file, each with the file_id/path of its latest upload"""
+    index = require_cv_index()
+    if education_level is not None and education_level not in EDUCATION_LEVELS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"education_level must be one of: {', '.join(EDUCATION_LEVELS)}"
+        )
+    # Over-fetch a little: contents whose files were deleted are skipped
+    hits = await asyncio.to_thread(index.search, query, limit * 2, min_years, education_level, language)
+    files = await asyncio.to_thread(file_store.latest_by_content, [hit['content_hash'] for hit in hits])
+    candidates = []
+    for hit in hits:
+        record = files.get(hit['content_hash'])
+        if record is None or not os.path.exists(record['path']):
+            continue
+        candidates.append(dict(hit, file_id=record['file_id'], path=record['path'], filename=record['filename']))
+        if len(candidates) >= limit:
+            break
+    return candidates
+
+@router.get("/index/search")
+async def search_index(
+    q: str,
+    limit: int = 20,
+    min_years: Optional[float] = None,
+    education_level: Optional[str] = None,
+    language: Optional[str] = None
+):
+    """Rank previously uploaded CVs against a query locally (no LLM), with optional field filters"""
+    if not q.strip():
+        raise HTTPException(status_code=400, detail="Query cannot be empty")
+    candidates = await search_stored_cvs(q, max(1, min(limit, 500)), min_years, education_level, language)
+    for candidate in candidates:
+        del candidate['path']
+    return {"results": candidates, "total": len(candidates)}
+
+@router.post("/rescreen", response_model=FilterResponse)
+async def rescreen_stored_cvs(
+    requirements: str = Form(...),
+    top_n: int = Form(20),
+    min_years: Optional[float] = Form(None),
+    education_level: Optional[str] = Form(None),
+    language: Optional[str] = Form(None),
+    fast_mode: bool = Form(False)
+):
+    """
+    Screen previously uploaded CVs against new requirements without re-uploading them
+    The index retrieves the top_n best keyword matches (after field filters), which are then scored as usual
+    from their indexed text (a file is only parsed again if its contents are missing from the index)
+    """
+    if not requirements or not requirements.strip():
+        raise HTTPException(status_code=400, detail="Requirements cannot be empty")
+    if top_n < 1:
+        raise HTTPException(status_code=400, detail="top_n must be at least 1")
+    
+    candidates = await search_stored_cvs(requirements, top_n, min_years, education_level, language)
+    file_paths = [
+        (candidate['path'], candidate['filename'], os.path.splitext(candidate['path'])[1].lower())
+        for candidate in candidates
+    ]
+    file_ids = [candidate['file_id'] for candidate in candidates]
+    
+    matcher = CVMatcher()
+    await janitor.pin(file_ids)
+    try:
+        results = await matcher.process_cv_files(
+            file_paths,
+            requirements,
+            content_hashes={candidate['path']: candidate['content_hash'] for candidate in candidates},
+            file_ids=file_ids,
+            fast_mode=fast_mode
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error processing CVs: {str(e)}")
+    finally:
+        await janitor.unpin(file_ids)
+    
+    return FilterResponse(results=results, total_cvs=len(results))
+
+@router.post("/index/rebuild")
+async def rebuild_index():
+    """Index stored CVs that are missing from the index (e.g. uploaded before it existed)"""
+    index = require_cv_index()
+    stored = await asyncio.to_thread(file_store.latest_by_content)
+    missing = await asyncio.to_thread(index.missing, list(stored))
+    
+    processor = FileProcessor()
+    semaphore = asyncio.Semaphore(INDEX_REBUILD_CONCURRENCY)
+    
+    async def index_one(content_hash: str) -> bool:
+        record = stored[content_hash]
+        extension = os.path.splitext(record['path'])[1].lower()
+        async with semaphore:
+            try:
+                text = await processor.extract_text(record['path'], extension, content_hash)
+            except Exception:
+                return False
+        if not text or len(text.strip()) < 50:
+            return False
+        return await asyncio.to_thread(index.add, content_hash, record['filename'], text)
+    
+    indexed = await asyncio.gather(*[index_one(content_hash) for content_hash in missing])
+    return {"indexed": sum(indexed), "failed": len(missing) - sum(indexed), **(await asyncio.to_thread(index.stats))}
+
+@router.get("/index/stats")
+async def index_stats():
+    """Number of indexed CVs and inverted-index postings"""
+    return await asyncio.to_thread(require_cv_index().stats)
+
+@router.get("/cache/stats")
+async def cache_stats():
+    """Analysis and extracted-text cache hit/miss counts since startup"""
+    analysis_cache = get_analysis_cache()
+    text_cache = get_text_cache()
+    return {
+        "analysis": {"enabled": True, **analysis_cache.stats()} if analysis_cache else {"enabled": False},
+        "text": {"enabled": True, **text_cache.stats()} if text_cache else {"enabled": False}
+    }
+
+@router.get("/storage/stats")
+async def storage_stats():
+    """Stored files, disk usage and what the background janitor has reclaimed"""
+    totals = await asyncio.to_thread(file_store.totals)
+    return {
+        "stored_files": totals["files"],
+        "stored_blobs": totals["blobs"],
+        "stored_bytes": totals["bytes"],
+        "janitor": janitor.stats()
+    }
+
+@router.get("/llm/stats")
+async def llm_stats():
+    """LLM rate limiter state: allowed rate, available budget, throttling, 429s and retries"""
+    return get_rate_limiter().stats()
+
+@router.get("/latency/stats")
+async def latency_stats():
+    """Learned per-phase timings (extraction, LLM, parse) by file type/size and text length: count, mean, p50/p90/p99"""
+    return get_latency_stats().snapshot()
+
 @router.get("/health")
 async def health_check():
     """Health check endpoint"""
@@ -1,8 +1,15 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from app.api.routes import router
+from app.api.routes import router, janitor, job_runner, job_queue, file_store
+from app.services.llm_backends import close_http_client
+from app.services.metrics import CONTENT_TYPE, get_metrics, state_metrics
+from app.services.cache import get_analysis_cache, get_text_cache
+from app.services.rate_limiter import get_rate_limiter
+from app.services.extraction_pool import shutdown_extraction_pool
+from app.services.latency_stats import get_latency_stats
 from dotenv import load_dotenv
 import os
+import asyncio
 
 # Load environment variables
 load_dotenv()
@@ -14,7 +21,7 @@ app = FastAPI(
 )
 
 # Configure file upload limits (50MB per file, 200MB total)
-from fastapi import Request
+from fastapi import Request, Response
 from fastapi.exceptions import RequestValidationError
 from fastapi.responses import JSONResponse
 
@@ -49,6 +56,21 @@ app.add_middleware(
 
 app.include_router(router, prefix="/api")
 
+@app.on_event("startup")
+async def startup():
+    janitor.start()
+    job_runner.start()
+    get_latency_stats().start()
+
+@app.on_event("shutdown")
+async def shutdown():
+    await job_runner.stop()
+    await janitor.stop()
+    await close_http_client()
+    shutdown_extraction_pool()
+    # Keep the learned timings for the next start
+    await get_latency_stats().stop()
+
 @app.get("/")
 async def root():
     return {"message": "CV Filter Tool API is running"}
@@ -57,3 +79,23 @@ async def root():
 async def health():
     return {"status": "healthy"}
 
+@app.get("/metrics")
+async def metrics():
+    """Prometheus metrics: per-phase timings, LLM latency/tokens/parse failures, queue depth, in-flight files, caches, storage"""
+    job_depth, storage_totals = await asyncio.gather(
+        asyncio.to_thread(job_queue.depth),
+        asyncio.to_thread(file_store.totals)
+    )
+    analysis_cache = get_analysis_cache()
+    text_cache = get_text_cache()
+    state = state_metrics(
+        {
+            "analysis": analysis_cache.stats() if analysis_cache else None,
+            "text": text_cache.stats() if text_cache else None
+        },
+        storage_totals,
+        job_depth,
+        get_rate_limiter().stats()
+    )
+    return Response(get_metrics().render(state), media_type=CONTENT_TYPE)
+
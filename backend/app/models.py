@@ -29,6 +29,11 @@ class CVMatchResult(BaseModel):
     soft_skills_score: float = 0.0
     leadership_score: float = 0.0
     communication_score: float = 0.0
+    # Local skill-engine score, and disagreements between it and the AI analysis
+    local_skills_match: Optional[float] = None
+    score_warnings: List[str] = []
+    # Estimated prompt tokens removed by text compaction (None when no LLM call was made)
+    prompt_tokens_saved: Optional[int] = None
 
 class ProgressUpdate(BaseModel):
     filename: str
@@ -44,3 +49,25 @@ class ErrorResponse(BaseModel):
     error: str
     detail: Optional[str] = None
 
+
+class JobStatus(BaseModel):
+    job_id: str
+    status: str  # "queued", "running", "completed", "failed", "cancelled"
+    total: int
+    completed: int
+    error: Optional[str] = None
+    created_at: float
+    updated_at: float
+
+class JobResultsResponse(BaseModel):
+    job: JobStatus
+    results: List[CVMatchResult]  # Checkpointed so far, sorted by match_percentage
+
+class RoleFilterResponse(BaseModel):
+    requirements: str
+    results: List[CVMatchResult]
+    total_cvs: int
+
+class MultiFilterResponse(BaseModel):
+    roles: List[RoleFilterResponse]  # One ranking per requirement set, in request order
+    total_cvs: int
@@ -0,0 +1,225 @@
+import os
+import json
+import uuid
+import time
+import asyncio
+import logging
+from abc import ABC, abstractmethod
+from typing import Any, Awaitable, Callable, Dict, Optional
+from openai import AsyncOpenAI
+from app.services.llm_backends import get_http_client
+from app.services.llm_service import LLMService
+
+logger = logging.getLogger(__name__)
+
+# Provider batch states after which nothing changes any more
+FINAL_BATCH_STATUSES = ("completed", "failed", "expired", "cancelled")
+
+
+class BatchProvider(ABC):
+    """
+    Interface for offline bulk execution of chat completion requests. Input and output are
+    JSONL files in the OpenAI batch format: one {"custom_id", "method", "url", "body"} request per
+    input line, one {"custom_id", "response": {"status_code", "body"}, "error"} result per output line.
+    """
+
+    name = "base"
+
+    @abstractmethod
+    async def submit(self, input_path: str) -> str:
+        """Submit a batch input file; returns the provider's batch id"""
+
+    @abstractmethod
+    async def status(self, batch_id: str) -> Dict[str, Any]:
+        """Batch state: 'status' plus request counts ('total', 'completed', 'failed') when known"""
+
+    @abstractmethod
+    async def download(self, batch_id: str, output_path: str):
+        """Write the results of a finished batch (successes and per-request errors) to output_path"""
+
+
+class OpenAIBatchProvider(BatchProvider):
+    """OpenAI Batch API: discounted, asynchronous execution within a 24h completion window"""
+
+    name = "openai"
+
+    def __init__(self, client: Optional[AsyncOpenAI] = None):
+        self._client = client
+
+    @property
+    def client(self) -> AsyncOpenAI:
+        if self._client is None:
+            api_key = os.getenv("OPENAI_API_KEY")
+            if not api_key or api_key == "your_openai_api_key_here":
+                raise ValueError(
+                    "OPENAI_API_KEY environment variable is not set. "
+                    "Please set it in the backend/.env file"
+                )
+            self._client = AsyncOpenAI(api_key=api_key, http_client=get_http_client())
+        return self._client
+
+    async def submit(self, input_path: str) -> str:
+        data = await asyncio.to_thread(_read_bytes, input_path)
+        uploaded = await self.client.files.create(file=(os.path.basename(input_path), data), purpose="batch")
+        batch = await self.client.batches.create(
+            input_file_id=uploaded.id,
+            endpoint="/v1/chat/completions",
+            completion_window="24h"
+        )
+        return batch.id
+
+    async def status(self, batch_id: str) -> Dict[str, Any]:
+        batch = await self.client.batches.retrieve(batch_id)
+        counts = batch.request_counts
+        return {
+            "status": batch.status,
+            "total": counts.total if counts else None,
+            "completed": counts.completed if counts else None,
+            "failed": counts.failed if counts else None
+        }
+
+    async def download(self, batch_id: str, output_path: str):
+        batch = await self.client.batches.retrieve(batch_id)
+        parts = []
+        for file_id in (batch.output_file_id, batch.error_file_id):
+            if file_id:
+                content = await self.client.files.content(file_id)
+                parts.append(content.text.rstrip("\n"))
+        await asyncio.to_thread(_write_text, output_path, "\n".join(part for part in parts if part) + "\n")
+
+
+class LocalBatchProvider(BatchProvider):
+    """
+    File-based stand-in for a provider batch service. A batch is a directory holding the input,
+    a status file and, once finished, the output; requests run in the background through
+    `complete` (by default the interactive LLM call). Batches interrupted by a restart resume
+    from scratch on the next status poll. Meant for offline testing of the batch flow.
+    """
+
+    name = "local"
+
+    def __init__(
+        self,
+        directory: Optional[str] = None,
+        complete: Optional[Callable[[Dict], Awaitable[str]]] = None,
+        concurrency: Optional[int] = None
+    ):
+        self.directory = directory or os.path.join(os.getenv("BATCH_DIR", os.path.join("cache", "batches")), "local")
+        self.concurrency = max(1, concurrency or int(os.getenv("LOCAL_BATCH_CONCURRENCY", "4")))
+        self._complete = complete
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+    def _path(self, batch_id: str, name: str) -> str:
+        return os.path.join(self.directory, batch_id, name)
+
+    async def _call(self, body: Dict) -> str:
+        if self._complete is None:
+            self._complete = LLMService().complete_request
+        return await self._complete(body)
+
+    async def submit(self, input_path: str) -> str:
+        batch_id = f"local_{uuid.uuid4().hex}"
+        data = await asyncio.to_thread(_read_text, input_path)
+        os.makedirs(os.path.join(self.directory, batch_id), exist_ok=True)
+        await asyncio.to_thread(_write_text, self._path(batch_id, "input.jsonl"), data)
+        await asyncio.to_thread(self._write_status, batch_id, {"status": "in_progress", "created_at": time.time()})
+        self._start(batch_id)
+        return batch_id
+
+    async def status(self, batch_id: str) -> Dict[str, Any]:
+        state = await asyncio.to_thread(self._read_status, batch_id)
+        if state["status"] == "in_progress" and batch_id not in self._tasks:
+            # Nothing in this process is working on it (e.g. after a restart)
+            self._start(batch_id)
+        return state
+
+    async def download(self, batch_id: str, output_path: str):
+        data = await asyncio.to_thread(_read_text, self._path(batch_id, "output.jsonl"))
+        await asyncio.to_thread(_write_text, output_path, data)
+
+    def _start(self, batch_id: str):
+        task = asyncio.create_task(self._run(batch_id))
+        self._tasks[batch_id] = task
+        task.add_done_callback(lambda _: self._tasks.pop(batch_id, None))
+
+    async def _run(self, batch_id: str):
+        data = await asyncio.to_thread(_read_text, self._path(batch_id, "input.jsonl"))
+        requests = [json.loads(line) for line in data.splitlines() if line.strip()]
+        semaphore = asyncio.Semaphore(self.concurrency)
+        progress = {"completed": 0, "failed": 0}
+
+        async def execute(request: Dict) -> Dict:
+            async with semaphore:
+                try:
+                    content = await self._call(request["body"])
+                except Exception as e:
+                    progress["failed"] += 1
+                    return {"id": uuid.uuid4().hex, "custom_id": request["custom_id"], "response": None, "error": {"message": str(e)}}
+            progress["completed"] += 1
+            return {
+                "id": uuid.uuid4().hex,
+                "custom_id": request["custom_id"],
+                "response": {
+                    "status_code": 200,
+                    "body": {"choices": [{"index": 0, "message": {"role": "assistant", "content": content}}]}
+                },
+                "error": None
+            }
+
+        try:
+            outputs = await asyncio.gather(*[execute(request) for request in requests])
+            await asyncio.to_thread(
+                _write_text,
+                self._path(batch_id, "output.jsonl"),
+                "".join(json.dumps(output) + "\n" for output in outputs)
+            )
+            state = {"status": "completed", "total": len(requests), **progress, "completed_at": time.time()}
+        except Exception as e:
+            logger.exception("Local batch %s failed", batch_id)
+            state = {"status": "failed", "error": str(e), "total": len(requests), **progress}
+        await asyncio.to_thread(self._write_status, batch_id, state)
+
+    def _read_status(self, batch_id: str) -> Dict[str, Any]:
+        try:
+            with open(self._path(batch_id, "status.json"), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            raise ValueError(f"Unknown local batch: {batch_id}")
+
+    def _write_status(self, batch_id: str, state: Dict[str, Any]):
+        _write_text(self._path(batch_id, "status.json"), json.dumps(state))
+
+
+def _read_text(path: str) -> str:
+    with open(path, "r", encoding="utf-8") as f:
+        return f.read()
+
+
+def _read_bytes(path: str) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def _write_text(path: str, data: str):
+    """Write a file atomically (readers never see a partial file)"""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    temporary = f"{path}.tmp"
+    with open(temporary, "w", encoding="utf-8") as f:
+        f.write(data)
+    os.replace(temporary, path)
+
+
+_batch_provider: Optional[BatchProvider] = None
+
+def get_batch_provider() -> BatchProvider:
+    """Return the process-wide batch provider selected by BATCH_PROVIDER ('openai' or 'local')"""
+    global _batch_provider
+    if _batch_provider is None:
+        name = os.getenv("BATCH_PROVIDER", "openai").lower()
+        if name == "openai":
+            _batch_provider = OpenAIBatchProvider()
+        elif name == "local":
+            _batch_provider = LocalBatchProvider()
+        else:
+            raise ValueError(f"Unsupported BATCH_PROVIDER: {name}. Supported providers: openai, local")
+    return _batch_provider
@@ -0,0 +1,290 @@
+import os
+import re
+import json
+import time
+import asyncio
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional
+
+class DiskCache:
+    """On-disk key/value store with TTL and size-based eviction"""
+
+    def __init__(self, directory: str, max_entries: int = 10000, ttl_seconds: float = 7 * 24 * 3600):
+        self.directory = directory
+        self.max_entries = max(1, max_entries)
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._count: Optional[int] = None
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        # Shard by key prefix so no single directory grows too large
+        return os.path.join(self.directory, key[:2], key)
+
+    def _is_expired(self, mtime: float, now: float) -> bool:
+        return self.ttl_seconds > 0 and now - mtime > self.ttl_seconds
+
+    def get(self, key: str) -> Optional[bytes]:
+        """Return the stored value, or None if missing or expired"""
+        path = self._path(key)
+        try:
+            if self._is_expired(os.path.getmtime(path), time.time()):
+                self._remove(path)
+                return None
+            with open(path, 'rb') as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def set(self, key: str, value: bytes):
+        """Store a value atomically, evicting old entries when over capacity"""
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        is_new = not os.path.exists(path)
+
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(value)
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            if self._count is None:
+                self._count = self._scan_count()
+            elif is_new:
+                self._count += 1
+            if self._count > self.max_entries:
+                self._evict()
+
+    def _remove(self, path: str):
+        try:
+            os.remove(path)
+            with self._lock:
+                if self._count:
+                    self._count -= 1
+        except FileNotFoundError:
+            pass
+
+    def _entries(self):
+        for shard in os.scandir(self.directory):
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                if entry.is_file() and not entry.name.endswith('.tmp'):
+                    yield entry
+
+    def _scan_count(self) -> int:
+        return sum(1 for _ in self._entries())
+
+    def _evict(self):
+        """Drop expired entries, then the oldest ones down to 90% of capacity (lock held)"""
+        now = time.time()
+        entries = []
+        for entry in self._entries():
+            try:
+                entries.append((entry.stat().st_mtime, entry.path))
+            except FileNotFoundError:
+                continue
+        entries.sort()
+
+        target = int(self.max_entries * 0.9)
+        remaining = len(entries)
+        for mtime, path in entries:
+            if remaining <= target and not self._is_expired(mtime, now):
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            remaining -= 1
+        self._count = remaining
+
+
+class LRUCache:
+    """Bounded in-memory mapping that drops the least recently used entry first"""
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max(1, max_entries)
+        self._data: "OrderedDict[str, str]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[str]:
+        value = self._data.get(key)
+        if value is not None:
+            self._data.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: str):
+        self._data[key] = value
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class AnalysisCache:
+    """Persistent cache of LLM analyses keyed on (CV text, requirements, model, prompt version)"""
+
+    def __init__(
+        self,
+        directory: Optional[str] = None,
+        max_entries: Optional[int] = None,
+        ttl_seconds: Optional[float] = None,
+        model: Optional[str] = None,
+        version: str = "1"
+    ):
+        # Identifies the prompt layout and compaction settings; analyses made with others are never reused
+        self.version = version
+        self.model = model or os.getenv("OPENAI_MODEL", "gpt-4o-mini")
+        backend = os.getenv("LLM_BACKEND", "openai").lower()
+        if not model and backend != "openai":
+            # Analyses from other backends (e.g. the load-testing stub) never mix with real ones
+            self.model = f"{backend}:{self.model}"
+        self.store = DiskCache(
+            directory or os.getenv("ANALYSIS_CACHE_DIR", os.path.join("cache", "analysis")),
+            max_entries=max_entries or int(os.getenv("ANALYSIS_CACHE_MAX_ENTRIES", "10000")),
+            ttl_seconds=ttl_seconds if ttl_seconds is not None else float(os.getenv("ANALYSIS_CACHE_TTL", str(7 * 24 * 3600)))
+        )
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        """Collapse whitespace so extraction noise does not change the key"""
+        return re.sub(r"\s+", " ", text).strip()
+
+    def make_key(self, cv_text: str, requirements: str) -> str:
+        digest = hashlib.sha256()
+        for part in (self.normalize(cv_text), self.normalize(requirements), self.model, self.version):
+            digest.update(part.encode("utf-8"))
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+    async def get(self, cv_text: str, requirements: str) -> Optional[Dict]:
+        """Return the cached analysis dictionary or None on a miss"""
+        key = self.make_key(cv_text, requirements)
+        data = await asyncio.to_thread(self.store.get, key)
+        if data is None:
+            self.misses += 1
+            return None
+        try:
+            analysis = json.loads(data)
+        except json.JSONDecodeError:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return analysis
+
+    async def set(self, cv_text: str, requirements: str, analysis: Dict):
+        key = self.make_key(cv_text, requirements)
+        await asyncio.to_thread(self.store.set, key, json.dumps(analysis).encode("utf-8"))
+
+    def stats(self) -> Dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0
+        }
+
+
+class TextCache:
+    """Extracted document text keyed on the SHA-256 of the file contents (memory LRU + disk)"""
+
+    def __init__(
+        self,
+        directory: Optional[str] = None,
+        memory_entries: Optional[int] = None,
+        max_entries: Optional[int] = None,
+        ttl_seconds: Optional[float] = None,
+        version: str = "1"
+    ):
+        # Bumped whenever extraction output changes so stale text is never reused
+        self.version = version
+        self.memory = LRUCache(memory_entries or int(os.getenv("TEXT_CACHE_MEMORY_ENTRIES", "256")))
+        self.store = DiskCache(
+            directory or os.getenv("TEXT_CACHE_DIR", os.path.join("cache", "text")),
+            max_entries=max_entries or int(os.getenv("TEXT_CACHE_MAX_ENTRIES", "20000")),
+            ttl_seconds=ttl_seconds if ttl_seconds is not None else float(os.getenv("TEXT_CACHE_TTL", str(30 * 24 * 3600)))
+        )
+        self.hits = 0
+        self.misses = 0
+
+    def _key(self, content_hash: str) -> str:
+        return f"{content_hash}.v{self.version}"
+
+    async def get(self, content_hash: str) -> Optional[str]:
+        key = self._key(content_hash)
+        text = self.memory.get(key)
+        if text is None:
+            data = await asyncio.to_thread(self.store.get, key)
+            if data is not None:
+                text = data.decode("utf-8")
+                self.memory.set(key, text)
+        if text is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return text
+
+    async def set(self, content_hash: str, text: str):
+        key = self._key(content_hash)
+        self.memory.set(key, text)
+        await asyncio.to_thread(self.store.set, key, text.encode("utf-8"))
+
+    def stats(self) -> Dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "memory_entries": len(self.memory)
+        }
+
+
+def hash_file(file_path: str, chunk_size: int = 1024 * 1024) -> str:
+    """SHA-256 of a file's contents, read in chunks"""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _cache_enabled(name: str) -> bool:
+    return os.getenv(name, "true").lower() in ("1", "true", "yes")
+
+
+def analysis_cache_version() -> str:
+    """Prompt layout and CV compaction settings (enabled, algorithm version, token budget) that shape an analysis"""
+    from app.services.prompt_builder import PROMPT_VERSION
+    from app.services.text_compactor import COMPACTION_VERSION, default_token_budget
+    if os.getenv("COMPACTION_ENABLED", "true").lower() != "true":
+        return f"prompt{PROMPT_VERSION}:raw"
+    return f"prompt{PROMPT_VERSION}:compact{COMPACTION_VERSION}:{default_token_budget()}"
+
+
+_analysis_cache: Optional[AnalysisCache] = None
+_text_cache: Optional[TextCache] = None
+
+def get_analysis_cache() -> Optional[AnalysisCache]:
+    """Return the process-wide analysis cache, or None if disabled via ANALYSIS_CACHE_ENABLED"""
+    global _analysis_cache
+    if not _cache_enabled("ANALYSIS_CACHE_ENABLED"):
+        return None
+    if _analysis_cache is None:
+        _analysis_cache = AnalysisCache(version=analysis_cache_version())
+    return _analysis_cache
+
+
+def get_text_cache() -> Optional[TextCache]:
+    """Return the process-wide extracted-text cache, or None if disabled via TEXT_CACHE_ENABLED"""
+    global _text_cache
+    if not _cache_enabled("TEXT_CACHE_ENABLED"):
+        return None
+    if _text_cache is None:
+        from app.services.file_processor import EXTRACTION_VERSION
+        _text_cache = TextCache(version=EXTRACTION_VERSION)
+    return _text_cache
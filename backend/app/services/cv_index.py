@@ -0,0 +1,289 @@
+import os
+import re
+import json
+import math
+import time
+import sqlite3
+import threading
+from collections import Counter
+from datetime import datetime
+from typing import Dict, List, Optional, Any
+from app.services.prefilter import tokenize
+
+# Education levels in increasing order; the index stores the rank for range filtering
+EDUCATION_LEVELS = ["none", "associate", "bachelor", "master", "phd"]
+EDUCATION_PATTERNS = [
+    ("phd", re.compile(r"\b(ph\.?\s?d|doctorate|doctoral)\b", re.I)),
+    ("master", re.compile(r"\b(master'?s?|m\.?sc|m\.?s\.|mba|m\.?eng|m\.?a\.)\b", re.I)),
+    ("bachelor", re.compile(r"\b(bachelor'?s?|b\.?sc|b\.?s\.|b\.?eng|b\.?tech|b\.?a\.|undergraduate degree)\b", re.I)),
+    ("associate", re.compile(r"\b(associate'?s? degree|diploma|hnd)\b", re.I)),
+]
+
+LANGUAGES = [
+    "English", "Spanish", "French", "German", "Italian", "Portuguese", "Dutch", "Russian", "Polish",
+    "Arabic", "Hindi", "Bengali", "Urdu", "Chinese", "Mandarin", "Cantonese", "Japanese", "Korean",
+    "Turkish", "Swedish", "Norwegian", "Danish", "Finnish", "Greek", "Hebrew", "Vietnamese", "Thai",
+    "Indonesian", "Malay", "Ukrainian", "Romanian", "Czech", "Hungarian", "Persian", "Swahili"
+]
+LANGUAGE_PATTERN = re.compile(r"\b(" + "|".join(LANGUAGES) + r")\b")
+
+CERTIFICATION_PATTERN = re.compile(
+    r"(?:[^\n.;]*\b(?i:certified|certificate|certification)\b[^\n.;]*)"
+    r"|\b(?:PMP|CISSP|CISM|CISA|CKA|CKAD|CCNA|CCNP|CPA|CFA|ITIL|PRINCE2|CSM|TOEFL|IELTS)\b"
+)
+YEARS_CLAIM_PATTERN = re.compile(r"\b(\d{1,2})\s*\+?\s*(?:years?|yrs?)\b", re.I)
+YEAR_RANGE_PATTERN = re.compile(
+    r"\b((?:19|20)\d{2})\s*(?:-|–|—|to)\s*((?:19|20)\d{2}|present|current|now|today)\b", re.I
+)
+
+
+def extract_fields(text: str) -> Dict[str, Any]:
+    """Heuristic structured fields: years of experience, education level, languages and certifications"""
+    claims = [int(value) for value in YEARS_CLAIM_PATTERN.findall(text) if int(value) <= 50]
+    current_year = datetime.now().year
+    spans = []
+    for start, end in YEAR_RANGE_PATTERN.findall(text):
+        end_year = current_year if not end[:1].isdigit() else int(end)
+        if int(start) <= end_year <= current_year:
+            spans.append((int(start), end_year))
+    # Career span from the earliest start to the latest end of any date range
+    span_years = (max(end for _, end in spans) - min(start for start, _ in spans)) if spans else 0
+    years = max(claims + [span_years]) if claims or spans else None
+
+    education = "none"
+    for level, pattern in EDUCATION_PATTERNS:
+        if pattern.search(text):
+            education = level
+            break
+
+    languages = sorted(set(LANGUAGE_PATTERN.findall(text)))
+    certifications = []
+    for match in CERTIFICATION_PATTERN.findall(text):
+        certification = " ".join(match.split())[:120]
+        if certification and certification not in certifications:
+            certifications.append(certification)
+
+    return {
+        "years_of_experience": float(years) if years is not None else None,
+        "education_level": education,
+        "languages": languages,
+        "certifications": certifications[:20]
+    }
+
+
+class CVIndex:
+    """
+    Searchable index of every stored CV, keyed by content hash: the extracted text, cached
+    structured fields and an inverted index (term -> CV, term frequency) kept in SQLite, so
+    new requirements can be matched against the whole pool with BM25 without re-uploading.
+    """
+
+    def __init__(self, db_path: Optional[str] = None, k1: float = 1.5, b: float = 0.75):
+        # Shares the file metadata database by default (routes.py registers it with the janitor as protected)
+        self.db_path = db_path or os.getenv("CV_INDEX_DB", os.getenv("FILE_STORE_DB", os.path.join("file_storage", "metadata.db")))
+        self.k1 = k1
+        self.b = b
+        os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+        # sqlite3 connections can't be shared between threads, so keep one per thread
+        self._local = threading.local()
+        self._init_schema()
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.db_path, timeout=30.0, isolation_level=None)
+            connection.row_factory = sqlite3.Row
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    def _init_schema(self):
+        connection = self._connect()
+        connection.execute("""
+            CREATE TABLE IF NOT EXISTS cv_documents (
+                content_hash TEXT PRIMARY KEY,
+                filename TEXT NOT NULL,
+                text TEXT NOT NULL,
+                length INTEGER NOT NULL,
+                years_of_experience REAL,
+                education_rank INTEGER NOT NULL DEFAULT 0,
+                languages TEXT NOT NULL DEFAULT '[]',
+                certifications TEXT NOT NULL DEFAULT '[]',
+                indexed_at REAL NOT NULL
+            )
+        """)
+        connection.execute("""
+            CREATE TABLE IF NOT EXISTS cv_postings (
+                term TEXT NOT NULL,
+                content_hash TEXT NOT NULL,
+                tf INTEGER NOT NULL,
+                PRIMARY KEY (term, content_hash)
+            ) WITHOUT ROWID
+        """)
+        connection.execute("CREATE INDEX IF NOT EXISTS idx_cv_postings_hash ON cv_postings (content_hash)")
+
+    def __contains__(self, content_hash: str) -> bool:
+        return self._connect().execute(
+            "SELECT 1 FROM cv_documents WHERE content_hash = ?", (content_hash,)
+        ).fetchone() is not None
+
+    def add(self, content_hash: str, filename: str, text: str) -> bool:
+        """Index a CV's text (no-op if these contents are already indexed); returns True if added"""
+        if content_hash in self:
+            return False
+        terms = Counter(tokenize(text))
+        fields = extract_fields(text)
+        connection = self._connect()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            cursor = connection.execute("""
+                INSERT OR IGNORE INTO cv_documents
+                    (content_hash, filename, text, length, years_of_experience, education_rank, languages, certifications, indexed_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, (
+                content_hash,
+                filename,
+                text,
+                sum(terms.values()),
+                fields["years_of_experience"],
+                EDUCATION_LEVELS.index(fields["education_level"]),
+                json.dumps(fields["languages"]),
+                json.dumps(fields["certifications"]),
+                time.time()
+            ))
+            if cursor.rowcount:
+                connection.executemany(
+                    "INSERT OR REPLACE INTO cv_postings (term, content_hash, tf) VALUES (?, ?, ?)",
+                    [(term, content_hash, count) for term, count in terms.items()]
+                )
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        return bool(cursor.rowcount)
+
+    def remove(self, content_hash: str):
+        connection = self._connect()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            connection.execute("DELETE FROM cv_postings WHERE content_hash = ?", (content_hash,))
+            connection.execute("DELETE FROM cv_documents WHERE content_hash = ?", (content_hash,))
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+
+    def get(self, content_hash: str) -> Optional[Dict[str, Any]]:
+        """Indexed document including its text"""
+        row = self._connect().execute("SELECT * FROM cv_documents WHERE content_hash = ?", (content_hash,)).fetchone()
+        if row is None:
+            return None
+        return dict(self._fields(row), text=row['text'])
+
+    @staticmethod
+    def _fields(row: sqlite3.Row) -> Dict[str, Any]:
+        return {
+            'content_hash': row['content_hash'],
+            'filename': row['filename'],
+            'years_of_experience': row['years_of_experience'],
+            'education_level': EDUCATION_LEVELS[row['education_rank']],
+            'languages': json.loads(row['languages']),
+            'certifications': json.loads(row['certifications'])
+        }
+
+    def search(
+        self,
+        query: str,
+        limit: int = 20,
+        min_years: Optional[float] = None,
+        education_level: Optional[str] = None,
+        language: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        BM25-ranked CVs for the query, optionally filtered on the cached structured fields.
+        Returns the structured fields of each hit with its 'score', best first.
+        """
+        connection = self._connect()
+        conditions = []
+        parameters: List[Any] = []
+        if min_years is not None:
+            conditions.append("d.years_of_experience >= ?")
+            parameters.append(min_years)
+        if education_level is not None:
+            conditions.append("d.education_rank >= ?")
+            parameters.append(EDUCATION_LEVELS.index(education_level))
+        if language is not None:
+            # languages is a JSON array of capitalized names
+            conditions.append("d.languages LIKE ?")
+            parameters.append(f'%"{language.capitalize()}"%')
+        where = "".join(f" AND {condition}" for condition in conditions)
+
+        total, average_length = connection.execute(
+            "SELECT COUNT(*), COALESCE(AVG(length), 0) FROM cv_documents"
+        ).fetchone()
+        terms = sorted(set(tokenize(query)))
+        if not total or not terms:
+            return []
+
+        placeholders = ",".join("?" * len(terms))
+        document_frequency = dict(connection.execute(
+            f"SELECT term, COUNT(*) FROM cv_postings WHERE term IN ({placeholders}) GROUP BY term", terms
+        ).fetchall())
+        idf = {
+            term: math.log(1 + (total - frequency + 0.5) / (frequency + 0.5))
+            for term, frequency in document_frequency.items()
+        }
+
+        scores: Dict[str, float] = {}
+        rows = connection.execute(f"""
+            SELECT p.term, p.content_hash, p.tf, d.length FROM cv_postings p
+            JOIN cv_documents d ON d.content_hash = p.content_hash
+            WHERE p.term IN ({placeholders}){where}
+        """, terms + parameters)
+        for term, content_hash, frequency, length in rows:
+            norm = self.k1 * (1 - self.b + self.b * length / average_length) if average_length else self.k1
+            scores[content_hash] = scores.get(content_hash, 0.0) + idf[term] * frequency * (self.k1 + 1) / (frequency + norm)
+
+        best = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:limit]
+        if not best:
+            return []
+        documents = {
+            row['content_hash']: self._fields(row)
+            for row in connection.execute(
+                f"SELECT * FROM cv_documents WHERE content_hash IN ({','.join('?' * len(best))})",
+                [content_hash for content_hash, _ in best]
+            )
+        }
+        return [dict(documents[content_hash], score=round(score, 3)) for content_hash, score in best]
+
+    def missing(self, content_hashes: List[str]) -> List[str]:
+        """Which of these content hashes are not indexed yet"""
+        connection = self._connect()
+        indexed = set()
+        for start in range(0, len(content_hashes), 500):
+            chunk = content_hashes[start:start + 500]
+            indexed.update(
+                row[0] for row in connection.execute(
+                    f"SELECT content_hash FROM cv_documents WHERE content_hash IN ({','.join('?' * len(chunk))})", chunk
+                )
+            )
+        return [content_hash for content_hash in content_hashes if content_hash not in indexed]
+
+    def stats(self) -> Dict[str, Any]:
+        connection = self._connect()
+        documents = connection.execute("SELECT COUNT(*) FROM cv_documents").fetchone()[0]
+        postings = connection.execute("SELECT COUNT(*) FROM cv_postings").fetchone()[0]
+        return {"documents": documents, "postings": postings}
+
+
+_cv_index: Optional[CVIndex] = None
+
+def get_cv_index() -> Optional[CVIndex]:
+    """Return the process-wide CV index, or None if disabled via CV_INDEX_ENABLED"""
+    global _cv_index
+    if os.getenv("CV_INDEX_ENABLED", "true").lower() not in ("1", "true", "yes"):
+        return None
+    if _cv_index is None:
+        _cv_index = CVIndex()
+    return _cv_index
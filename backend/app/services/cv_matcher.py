@@ -1,17 +1,102 @@
-from typing import List, Dict, Callable, Optional
+from typing import Any, List, Dict, Callable, Optional, Tuple, Union
 from app.services.file_processor import FileProcessor
-from app.services.llm_service import LLMService
+from app.services.llm_service import LLMService, PARSE_ERROR_SUMMARY
+from app.services.batch_provider import BatchProvider, FINAL_BATCH_STATUSES, get_batch_provider
+from app.services.cache import get_analysis_cache
+from app.services.prefilter import BM25Ranker, select_candidates
+from app.services.skill_engine import SkillEngine
+from app.services.prompt_builder import CompiledRequirements, compile_requirements
+from app.services.cv_index import get_cv_index
+from app.services.text_compactor import compact_text
+from app.services.latency_stats import BatchTracker, get_latency_stats, length_key, longest_first
+from app.services.metrics import get_metrics
 from app.models import CVMatchResult, SkillMatch
 import os
+import json
 import asyncio
+import hashlib
+import logging
 import time
+from contextlib import asynccontextmanager
+
+logger = logging.getLogger(__name__)
 
 class CVMatcher:
-    """Service for matching CVs against requirements with time-based progress tracking"""
+    """Service for matching CVs against requirements with per-file progress reporting"""
     
-    def __init__(self):
+    def __init__(self, max_concurrency: Optional[int] = None, file_timeout: Optional[float] = None):
         self.file_processor = FileProcessor()
         self._llm_service = None
+        # Maximum number of files scored at the same time, and per-file time limit in seconds
+        self.max_concurrency = max(1, max_concurrency or int(os.getenv("CV_MAX_CONCURRENCY", "4")))
+        self.file_timeout = file_timeout or float(os.getenv("CV_FILE_TIMEOUT", "300"))
+        self.analysis_cache = get_analysis_cache()
+        # Analysis cache hits/misses for the files processed by this matcher
+        self.cache_hits = 0
+        self.cache_misses = 0
+        # Compare AI skill scores with the local skill engine and flag large disagreements
+        self.skill_check = os.getenv("SKILL_SANITY_CHECK", "true").lower() == "true"
+        self.skill_check_tolerance = float(os.getenv("SKILL_SANITY_TOLERANCE", "35"))
+        self._skill_engines: Dict[str, SkillEngine] = {}
+        self._compiled_requirements: Dict[str, CompiledRequirements] = {}
+        # Every extracted CV is added to the persistent index for later re-screening
+        self.cv_index = get_cv_index()
+        # Normalize and trim CV text to PROMPT_TOKEN_BUDGET before it is sent to the LLM
+        self.compaction = os.getenv("COMPACTION_ENABLED", "true").lower() == "true"
+        self.tokens_saved = 0
+        # Learned per-phase timings drive progress, the batch ETA and longest-first scheduling
+        self.latency_stats = get_latency_stats()
+        self.metrics = get_metrics()
+        self._batch: Optional[BatchTracker] = None
+        # Offline provider-batch mode: where batch files are kept and how often the provider is polled
+        self.batch_provider: Optional[BatchProvider] = None
+        self.batch_dir = os.getenv("BATCH_DIR", os.path.join("cache", "batches"))
+        self.batch_poll_interval = float(os.getenv("BATCH_POLL_INTERVAL", "30"))
+    
+    def skill_engine(self, requirements: str) -> SkillEngine:
+        """Skill engine compiled once per requirements string"""
+        engine = self._skill_engines.get(requirements)
+        if engine is None:
+            engine = self._skill_engines[requirements] = SkillEngine(requirements)
+        return engine
+    
+    def compiled_requirements(self, requirements: str) -> CompiledRequirements:
+        """Requirements normalized and skill-listed once per batch, shared by every file's prompt"""
+        compiled = self._compiled_requirements.get(requirements)
+        if compiled is None:
+            compiled = compile_requirements(requirements, self.skill_engine(requirements))
+            self._compiled_requirements[requirements] = compiled
+        return compiled
+    
+    def batch_eta(self) -> Optional[float]:
+        """Estimated seconds until the current batch finishes (None before a batch starts)"""
+        return self._batch.eta() if self._batch else None
+    
+    def _expected(self, file_path: Optional[str] = None, extension: Optional[str] = None, text_length: Optional[int] = None) -> Dict[str, float]:
+        """Expected seconds per phase for a file, from the learned latency statistics"""
+        size = 0
+        if file_path:
+            try:
+                size = os.path.getsize(file_path)
+            except OSError:
+                pass
+        return self.latency_stats.expected(extension, size, text_length)
+    
+    @staticmethod
+    def _llm_progress_range(expected: Dict[str, float]) -> tuple:
+        """Progress (%) at which the LLM phase starts and ends, in proportion to the expected phase times"""
+        total = sum(expected.values()) or 1.0
+        start = min(90.0, max(5.0, 100 * expected["extraction"] / total))
+        end = min(99.0, max(start + 1, 100 * (expected["extraction"] + expected["llm"]) / total))
+        return round(start, 1), round(end, 1)
+    
+    def _schedule(self, file_paths: List[tuple]) -> List[int]:
+        """Start ETA tracking for a batch and return its file indices, longest expected first"""
+        expected = [sum(self._expected(file_path, extension).values()) for file_path, _, extension in file_paths]
+        self._batch = BatchTracker(self.max_concurrency)
+        for index, seconds in enumerate(expected):
+            self._batch.add(index, seconds)
+        return longest_first(expected)
     
     @property
     def llm_service(self):
@@ -27,286 +112,877 @@ class CVMatcher:
         extension: str,
         requirements: str,
         progress_callback: Optional[Callable[[str, str, float, str], None]] = None,
-        estimated_time: float = 30.0
+        content_hash: Optional[str] = None
     ) -> CVMatchResult:
         """
-        Process a single CV file with time-based progress tracking
-        estimated_time: Estimated total processing time in seconds (default 30s)
+        Process a single CV file, reporting progress at each real state change
+        content_hash: SHA-256 of the file contents, used to reuse previously extracted text
         """
         start_time = time.time()
         
-        # Helper function to calculate progress based on elapsed time
-        def calculate_progress(elapsed: float, max_progress: float = 99.0) -> float:
-            """Calculate progress percentage based on elapsed time"""
-            progress = min((elapsed / estimated_time) * 100, max_progress)
-            return max(0.0, progress)
-        
         try:
-            # Initialize progress
-            if progress_callback:
-                progress_callback(filename, "processing", 0, f"Initializing {filename}...")
+            # Phase 1: File processing and text extraction
+            cv_text = await self._extract_cv_text(file_path, filename, extension, progress_callback, content_hash)
+            if isinstance(cv_text, CVMatchResult):
+                return cv_text
             
-            # Phase 1: File processing and text extraction (0-30% of estimated time)
-            text_extraction_start = time.time()
+            return await self._analyze_text(filename, cv_text, requirements, progress_callback, start_time)
             
-            # Extract text from CV
+        except Exception as e:
+            # Handle errors
             if progress_callback:
-                elapsed = time.time() - start_time
-                progress = calculate_progress(elapsed, 25.0)
-                progress_callback(filename, "processing", progress, f"Extracting text from {filename}...")
-            
-            cv_text = await self.file_processor.extract_text(file_path, extension)
-            
-            text_extraction_time = time.time() - text_extraction_start
-            # Update estimated time if text extraction took longer than expected
-            if text_extraction_time > estimated_time * 0.3:
-                estimated_time = text_extraction_time * 3.5  # Adjust estimate
+                progress_callback(filename, "error", 100, f"Error processing {filename}: {str(e)}")
             
+            return self._error_result(
+                filename,
+                f"Error processing CV: {str(e)}",
+                f"Processing error: {str(e)}"
+            )
+    
+    async def _extract_cv_text(
+        self,
+        file_path: str,
+        filename: str,
+        extension: str,
+        progress_callback: Optional[Callable[[str, str, float, str], None]] = None,
+        content_hash: Optional[str] = None
+    ) -> Union[str, CVMatchResult]:
+        """
+        Extract a CV's text, or return an error result if there is not enough of it. Contents
+        already in the CV index (stored CVs being re-screened, repeat uploads) reuse the indexed
+        text instead of parsing the file again.
+        """
+        indexed = await self._indexed_text(filename, content_hash)
+        if indexed is not None:
             if progress_callback:
-                elapsed = time.time() - start_time
-                progress = calculate_progress(elapsed, 30.0)
-                progress_callback(filename, "processing", progress, f"Text extraction complete for {filename}")
-            
-            if not cv_text or len(cv_text.strip()) < 50:
-                # If text extraction failed
-                if progress_callback:
-                    progress_callback(filename, "error", 100, "Text extraction failed - insufficient content")
-                
-                return CVMatchResult(
-                    filename=filename,
-                    match_percentage=0,
-                    skills_match=0,
-                    experience_match=0,
-                    education_match=0,
-                    overall_match=0,
-                    summary="Could not extract sufficient text from CV",
-                    strengths=[],
-                    weaknesses=["Text extraction failed or insufficient content"],
-                    skill_breakdown=[],
-                    required_skills_missing=[],
-                    technical_skills_score=0.0,
-                    soft_skills_score=0.0,
-                    leadership_score=0.0,
-                    communication_score=0.0
-                )
-            
-            # Phase 2: AI Analysis (30-95% of estimated time)
-            analysis_start = time.time()
-            
+                progress = self._llm_progress_range(self._expected(file_path, extension))[0]
+                progress_callback(filename, "processing", progress, f"Loaded indexed text for {filename}")
+            return indexed
+        
+        if progress_callback:
+            progress_callback(filename, "processing", 1.0, f"Extracting text from {filename}...")
+        
+        cv_text = await self.file_processor.extract_text(file_path, extension, content_hash)
+        
+        if not cv_text or len(cv_text.strip()) < 50:
+            # If text extraction failed
             if progress_callback:
-                elapsed = time.time() - start_time
-                progress = calculate_progress(elapsed, 35.0)
-                progress_callback(filename, "analyzing", progress, f"Sending {filename} to AI for analysis...")
+                progress_callback(filename, "error", 100, "Text extraction failed - insufficient content")
             
-            # Start AI analysis task
-            analysis_task = asyncio.create_task(
-                self.llm_service.analyze_cv_match(cv_text, requirements)
+            return self._error_result(
+                filename,
+                "Could not extract sufficient text from CV",
+                "Text extraction failed or insufficient content"
             )
-            
-            # Monitor progress during AI analysis with smooth time-based updates
-            last_progress_update = 30.0
-            progress_update_interval = 0.2  # Update every 0.2 seconds for smoother progress
-            last_update_time = time.time()
-            
-            while not analysis_task.done():
-                elapsed = time.time() - start_time
-                analysis_elapsed = time.time() - analysis_start
-                
-                # Estimate AI will take 70% of total estimated time
-                ai_estimated_time = estimated_time * 0.7
-                
-                # Calculate progress based on elapsed time vs estimated time
-                # Text extraction: 0-30% (takes ~10% of time)
-                # AI analysis: 30-95% (takes ~70% of time)
-                # Result processing: 95-99% (takes ~20% of time)
-                
-                if ai_estimated_time > 0 and analysis_elapsed < ai_estimated_time:
-                    # Progress during AI analysis: 30% + (elapsed/estimated) * 65%
-                    ai_progress_ratio = min(analysis_elapsed / ai_estimated_time, 1.0)
-                    current_progress = 30.0 + (ai_progress_ratio * 65.0)
-                elif analysis_elapsed >= ai_estimated_time:
-                    # If AI is taking longer than estimated, continue progress smoothly
-                    # Use exponential slowdown to approach 95%
-                    extra_time = analysis_elapsed - ai_estimated_time
-                    # Slow progress as we approach 95%
-                    remaining_progress = 65.0 * (1.0 - (1.0 / (1.0 + extra_time / 5.0)))
-                    current_progress = min(30.0 + remaining_progress, 95.0)
-                else:
-                    # Fallback: linear progress
-                    current_progress = min(30.0 + (analysis_elapsed / max(ai_estimated_time, 20.0)) * 65, 95.0)
-                
-                # Update progress smoothly (every 0.2 seconds or if significant change)
-                current_time = time.time()
-                time_since_update = current_time - last_update_time
-                
-                if time_since_update >= progress_update_interval or current_progress - last_progress_update >= 0.5:
-                    if progress_callback:
-                        progress_callback(
-                            filename,
-                            "analyzing",
-                            min(current_progress, 95.0),
-                            f"AI is analyzing {filename}... ({int(min(current_progress, 95.0))}%)"
-                        )
-                    last_progress_update = current_progress
-                    last_update_time = current_time
-                
-                await asyncio.sleep(0.1)  # Check more frequently for responsiveness
-            
-            # Get analysis result
-            analysis = await analysis_task
-            
-            # Update estimated time based on actual AI analysis time
-            actual_ai_time = time.time() - analysis_start
-            if actual_ai_time > estimated_time * 0.7:
-                # If AI took longer, adjust our understanding
-                estimated_time = (time.time() - start_time) * 1.1
-            
-            # Phase 3: Result processing (95-99%)
+        
+        if self.cv_index and content_hash:
+            try:
+                await asyncio.to_thread(self.cv_index.add, content_hash, filename, cv_text)
+            except Exception:
+                logger.exception("Failed to index %s", filename)
+        return cv_text
+    
+    async def _indexed_text(self, filename: str, content_hash: Optional[str]) -> Optional[str]:
+        """Text of these contents from the CV index (None if not indexed or the index is disabled)"""
+        if not self.cv_index or not content_hash:
+            return None
+        try:
+            document = await asyncio.to_thread(self.cv_index.get, content_hash)
+        except Exception:
+            logger.exception("Failed to read %s from the index", filename)
+            return None
+        return document['text'] if document else None
+    
+    async def _analyze_text(
+        self,
+        filename: str,
+        cv_text: str,
+        requirements: str,
+        progress_callback: Optional[Callable[[str, str, float, str], None]] = None,
+        start_time: Optional[float] = None
+    ) -> CVMatchResult:
+        """Score extracted CV text against the requirements (analysis cache first, then the LLM)"""
+        start_time = start_time or time.time()
+        
+        # Phase 2: AI Analysis, reusing a previous analysis of the same CV text against the same requirements
+        analysis = None
+        tokens_saved = None
+        if self.analysis_cache:
+            analysis = await self.analysis_cache.get(cv_text, requirements)
+            if analysis is not None:
+                self.cache_hits += 1
+            else:
+                self.cache_misses += 1
+        
+        if analysis is not None:
             if progress_callback:
-                elapsed = time.time() - start_time
-                progress = calculate_progress(elapsed, 97.0)
-                progress_callback(filename, "analyzing", progress, f"Processing analysis results for {filename}...")
-            
-            # Convert skill_breakdown to SkillMatch objects
-            skill_breakdown = []
-            for skill in analysis.get("skill_breakdown", []):
-                if isinstance(skill, dict):
-                    skill_breakdown.append(SkillMatch(
-                        skill_name=skill.get("skill_name", "Unknown"),
-                        match_percentage=float(skill.get("match_percentage", 0)),
-                        level=skill.get("level", "missing"),
-                        relevance=skill.get("relevance", "low")
-                    ))
-            
+                progress_callback(filename, "analyzing", 99.0, f"Loaded cached analysis for {filename}")
+        else:
+            prompt_text, tokens_saved = await self._compact(cv_text)
+            expected = self._expected(text_length=len(prompt_text))
+            progress_range = self._llm_progress_range(expected)
+            step = f"AI is analyzing {filename}...{self._saved_note(tokens_saved)}"
             if progress_callback:
-                elapsed = time.time() - start_time
-                progress = calculate_progress(elapsed, 99.0)
-                progress_callback(filename, "analyzing", progress, f"Finalizing results for {filename}...")
-            
-            # Create result object
-            result = CVMatchResult(
-                filename=filename,
-                file_id=None,  # Will be set by the route handler
-                match_percentage=analysis.get("match_percentage", 0),
-                skills_match=analysis.get("skills_match", 0),
-                experience_match=analysis.get("experience_match", 0),
-                education_match=analysis.get("education_match", 0),
-                overall_match=analysis.get("overall_match", 0),
-                summary=analysis.get("summary", "No summary available"),
-                strengths=analysis.get("strengths", []),
-                weaknesses=analysis.get("weaknesses", []),
-                skill_breakdown=skill_breakdown,
-                required_skills_missing=analysis.get("required_skills_missing", []),
-                years_of_experience=analysis.get("years_of_experience"),
-                education_level=analysis.get("education_level"),
-                certifications=analysis.get("certifications", []),
-                languages=analysis.get("languages", []),
-                technical_skills_score=analysis.get("technical_skills_score", 0.0),
-                soft_skills_score=analysis.get("soft_skills_score", 0.0),
-                leadership_score=analysis.get("leadership_score", 0.0),
-                communication_score=analysis.get("communication_score", 0.0)
-            )
+                progress_callback(filename, "analyzing", progress_range[0], step)
             
-            # Complete (100%)
-            if progress_callback:
-                total_time = time.time() - start_time
-                progress_callback(
-                    filename,
-                    "completed",
-                    100,
-                    f"Successfully completed analysis of {filename} (took {total_time:.1f}s)"
-                )
+            llm_start = time.perf_counter()
+            analysis = await self.llm_service.analyze_cv_match(prompt_text, self.compiled_requirements(requirements))
+            llm_seconds = time.perf_counter() - llm_start
+            self.latency_stats.record("llm", length_key(len(prompt_text)), llm_seconds)
+            self.metrics.analysis_seconds.observe(llm_seconds)
             
-            return result
+            if self.analysis_cache and analysis.get("summary") != PARSE_ERROR_SUMMARY:
+                await self.analysis_cache.set(cv_text, requirements, analysis)
             
-        except Exception as e:
-            # Handle errors
             if progress_callback:
-                elapsed = time.time() - start_time
-                progress_callback(filename, "error", 100, f"Error processing {filename}: {str(e)}")
-            
-            return CVMatchResult(
-                filename=filename,
-                match_percentage=0,
-                skills_match=0,
-                experience_match=0,
-                education_match=0,
-                overall_match=0,
-                summary=f"Error processing CV: {str(e)}",
-                strengths=[],
-                weaknesses=[f"Processing error: {str(e)}"],
-                skill_breakdown=[],
-                required_skills_missing=[],
-                technical_skills_score=0.0,
-                soft_skills_score=0.0,
-                leadership_score=0.0,
-                communication_score=0.0
+                progress_callback(filename, "analyzing", progress_range[1], f"Processing analysis results for {filename}...")
+        
+        # Phase 3: Result processing
+        parse_start = time.perf_counter()
+        result = self._finalize(filename, cv_text, requirements, analysis, tokens_saved)
+        parse_seconds = time.perf_counter() - parse_start
+        self.latency_stats.record("parse", length_key(len(cv_text)), parse_seconds)
+        self.metrics.result_seconds.observe(parse_seconds)
+        
+        # Complete (100%)
+        if progress_callback:
+            total_time = time.time() - start_time
+            progress_callback(
+                filename,
+                "completed",
+                100,
+                f"Successfully completed analysis of {filename} (took {total_time:.1f}s)"
+            )
+        
+        return result
+    
+    def _finalize(self, filename: str, cv_text: str, requirements: str, analysis: Dict, tokens_saved: Optional[int]) -> CVMatchResult:
+        """Result for an analysis, with compaction savings and the local skill sanity check"""
+        result = self._build_result(filename, analysis)
+        result.prompt_tokens_saved = tokens_saved
+        if self.skill_check:
+            self._check_skills(result, cv_text, requirements)
+        return result
+    
+    async def _compact(self, cv_text: str) -> tuple:
+        """Text to put in the prompt and the estimated tokens saved by compaction (None if disabled)"""
+        if not self.compaction:
+            return cv_text, None
+        # CPU-bound on long CVs, so it runs off the event loop
+        compacted = await asyncio.to_thread(compact_text, cv_text)
+        self.tokens_saved += compacted.tokens_saved
+        return compacted.text, compacted.tokens_saved
+    
+    @staticmethod
+    def _saved_note(tokens_saved: Optional[int]) -> str:
+        return f" (compacted, ~{tokens_saved} tokens saved)" if tokens_saved else ""
+    
+    def _check_skills(self, result: CVMatchResult, cv_text: str, requirements: str):
+        """Attach the local skill score and warn when the AI's skills_match disagrees with it"""
+        engine = self.skill_engine(requirements)
+        if not engine.skills:
+            return
+        local = float(engine.score([cv_text])["skills_match"][0])
+        result.local_skills_match = local
+        if abs(result.skills_match - local) > self.skill_check_tolerance:
+            result.score_warnings.append(
+                f"AI skills match ({result.skills_match:.0f}%) differs from local skill matching ({local:.0f}%); manual review recommended"
             )
     
+    @staticmethod
+    def _build_result(filename: str, analysis: Dict) -> CVMatchResult:
+        """Convert an analysis dictionary from the LLM into a CVMatchResult"""
+        # Convert skill_breakdown to SkillMatch objects
+        skill_breakdown = []
+        for skill in analysis.get("skill_breakdown", []):
+            if isinstance(skill, dict):
+                skill_breakdown.append(SkillMatch(
+                    skill_name=skill.get("skill_name", "Unknown"),
+                    match_percentage=float(skill.get("match_percentage", 0)),
+                    level=skill.get("level", "missing"),
+                    relevance=skill.get("relevance", "low")
+                ))
+        
+        return CVMatchResult(
+            filename=filename,
+            file_id=None,  # Will be set by the route handler
+            match_percentage=analysis.get("match_percentage", 0),
+            skills_match=analysis.get("skills_match", 0),
+            experience_match=analysis.get("experience_match", 0),
+            education_match=analysis.get("education_match", 0),
+            overall_match=analysis.get("overall_match", 0),
+            summary=analysis.get("summary", "No summary available"),
+            strengths=analysis.get("strengths", []),
+            weaknesses=analysis.get("weaknesses", []),
+            skill_breakdown=skill_breakdown,
+            required_skills_missing=analysis.get("required_skills_missing", []),
+            years_of_experience=analysis.get("years_of_experience"),
+            education_level=analysis.get("education_level"),
+            certifications=analysis.get("certifications", []),
+            languages=analysis.get("languages", []),
+            technical_skills_score=analysis.get("technical_skills_score", 0.0),
+            soft_skills_score=analysis.get("soft_skills_score", 0.0),
+            leadership_score=analysis.get("leadership_score", 0.0),
+            communication_score=analysis.get("communication_score", 0.0)
+        )
+    
+    @property
+    def cache_stats(self) -> Dict[str, int]:
+        """Analysis cache hit/miss counts for this matcher"""
+        return {"hits": self.cache_hits, "misses": self.cache_misses}
+    
     async def process_cv_files(
         self, 
         file_paths: List[tuple], 
         requirements: str,
-        progress_callback: Optional[Callable[[str, str, float, str], None]] = None
+        progress_callback: Optional[Callable[[str, str, float, str], None]] = None,
+        content_hashes: Optional[Dict[str, str]] = None,
+        result_callback: Optional[Callable[[CVMatchResult], None]] = None,
+        file_ids: Optional[List[str]] = None,
+        prefilter_top_n: Optional[int] = None,
+        prefilter_threshold: Optional[float] = None,
+        fast_mode: bool = False,
+        batch_mode: bool = False
     ) -> List[CVMatchResult]:
         """
-        Process multiple CV files with time-based progress tracking
+        Process multiple CV files concurrently with per-file progress reporting
         file_paths: List of tuples (file_path, filename, extension)
         progress_callback: Optional callback function (filename, status, progress, step)
+        content_hashes: Optional mapping of file_path -> SHA-256 of the file contents
+        result_callback: Optional callback invoked with each CVMatchResult as soon as it is ready
+        file_ids: Optional file ids aligned with file_paths, set on each result before callbacks run
+        prefilter_top_n / prefilter_threshold: if either is set, rank all CVs locally with BM25 first
+        and send only the top N and/or those whose local skill match is at least the threshold (0-100)
+        to the LLM
+        fast_mode: score the whole batch with the local skill engine only, without any LLM call
+        batch_mode: score through an offline provider batch (cheaper, may take hours) instead of interactive calls
+        At most max_concurrency files are in flight at once; results are sorted by match_percentage
         """
-        results = []
-        total_files = len(file_paths)
+        if fast_mode:
+            return await self._process_fast(
+                file_paths,
+                requirements,
+                progress_callback,
+                content_hashes,
+                result_callback,
+                file_ids
+            )
         
-        # Estimate processing time per file (default 30 seconds, can adjust based on file size)
-        base_estimated_time = 30.0
+        if batch_mode:
+            return await self._process_batch(
+                file_paths,
+                requirements,
+                progress_callback,
+                content_hashes,
+                result_callback,
+                file_ids
+            )
         
-        # Process files sequentially (one at a time) with individual time tracking
-        for index, (file_path, filename, extension) in enumerate(file_paths):
-            try:
-                # Estimate time based on file size (larger files might take longer)
-                file_size = os.path.getsize(file_path) if os.path.exists(file_path) else 0
-                # Adjust estimate: 20s base + 10s per MB (capped at 60s)
-                estimated_time = min(base_estimated_time + (file_size / 1024 / 1024) * 10, 60.0)
-                
-                # Process single file with time-based progress
-                result = await self._process_single_file(
+        if prefilter_top_n is not None or prefilter_threshold is not None:
+            return await self._process_with_prefilter(
+                file_paths,
+                requirements,
+                progress_callback,
+                content_hashes,
+                result_callback,
+                file_ids,
+                prefilter_top_n,
+                prefilter_threshold
+            )
+        
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        order = self._schedule(file_paths)
+        batch = self._batch
+        
+        async def run(index: int) -> CVMatchResult:
+            file_path, filename, extension = file_paths[index]
+            async with self._slot(semaphore):
+                batch.start(index)
+                result = await self._process_with_timeout(
                     file_path,
                     filename,
                     extension,
                     requirements,
                     progress_callback,
-                    estimated_time
+                    (content_hashes or {}).get(file_path)
                 )
-                
-                results.append(result)
-                
-                # Small delay before next file
-                await asyncio.sleep(0.1)
-                
-            except Exception as e:
-                # Handle file-level errors
+                batch.finish(index)
+            if file_ids:
+                result.file_id = file_ids[index]
+            if result_callback:
+                result_callback(result)
+            return result
+        
+        # Files expected to take longest start first so they don't stretch the end of the batch
+        results = await asyncio.gather(*[run(index) for index in order])
+        
+        # Sort results by match_percentage (descending)
+        results = list(results)
+        results.sort(key=lambda x: x.match_percentage, reverse=True)
+        
+        return results
+    
+    async def _process_with_prefilter(
+        self,
+        file_paths: List[tuple],
+        requirements: str,
+        progress_callback: Optional[Callable[[str, str, float, str], None]],
+        content_hashes: Optional[Dict[str, str]],
+        result_callback: Optional[Callable[[CVMatchResult], None]],
+        file_ids: Optional[List[str]],
+        top_n: Optional[int],
+        threshold: Optional[float]
+    ) -> List[CVMatchResult]:
+        """Extract every CV, rank the batch locally and only analyze the shortlisted CVs with the LLM"""
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        results: List[Optional[CVMatchResult]] = [None] * len(file_paths)
+        finish = self._result_collector(results, result_callback, file_ids)
+        texts = await self._extract_batch(file_paths, progress_callback, content_hashes, semaphore)
+        
+        extracted = []
+        for index, text in enumerate(texts):
+            if isinstance(text, CVMatchResult):
+                finish(index, text)
+            else:
+                extracted.append(index)
+        
+        # Rank the extracted CVs against the requirements in-process. BM25 orders the batch; the
+        # threshold and the scores shown for CVs that are not shortlisted come from the skill
+        # engine, whose scale does not depend on the rest of the batch
+        documents = [texts[index] for index in extracted]
+        ranker = BM25Ranker(documents)
+        engine = self.skill_engine(requirements)
+        if engine.skills:
+            scores = engine.score(documents)
+            percentages = [float(score) for score in scores["skills_match"]]
+        else:
+            coverage = ranker.coverage(requirements)
+            percentages = [entry["percentage"] for entry in coverage]
+        shortlisted = {
+            extracted[position]
+            for position in select_candidates(ranker.scores(requirements), percentages, top_n, threshold)
+        }
+        
+        for position, index in enumerate(extracted):
+            if index not in shortlisted:
+                filename = file_paths[index][1]
                 if progress_callback:
-                    progress_callback(filename, "error", 100, f"Error processing {filename}: {str(e)}")
+                    progress_callback(filename, "completed", 100, f"Scored {filename} locally (not shortlisted for AI analysis)")
+                if engine.skills:
+                    result = self._local_result(filename, engine, scores, position, "not shortlisted for AI analysis")
+                else:
+                    result = self._keyword_result(filename, coverage[position], "not shortlisted for AI analysis")
+                finish(index, result)
+        
+        async def analyze(index: int):
+            filename = file_paths[index][1]
+            async with self._slot(semaphore):
+                result = await self._run_guarded(
+                    self._analyze_text(filename, texts[index], requirements, progress_callback),
+                    filename,
+                    progress_callback,
+                    lambda summary, weakness: self._error_result(filename, summary, weakness)
+                )
+            finish(index, result)
+        
+        await asyncio.gather(*[analyze(index) for index in extracted if index in shortlisted])
+        
+        results.sort(key=lambda x: x.match_percentage, reverse=True)
+        return results
+    
+    async def _process_fast(
+        self,
+        file_paths: List[tuple],
+        requirements: str,
+        progress_callback: Optional[Callable[[str, str, float, str], None]],
+        content_hashes: Optional[Dict[str, str]],
+        result_callback: Optional[Callable[[CVMatchResult], None]],
+        file_ids: Optional[List[str]]
+    ) -> List[CVMatchResult]:
+        """Extract every CV and score the whole batch with the local skill engine in one pass"""
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        results: List[Optional[CVMatchResult]] = [None] * len(file_paths)
+        finish = self._result_collector(results, result_callback, file_ids)
+        texts = await self._extract_batch(file_paths, progress_callback, content_hashes, semaphore)
+        
+        extracted = []
+        for index, text in enumerate(texts):
+            if isinstance(text, CVMatchResult):
+                finish(index, text)
+            else:
+                extracted.append(index)
+        
+        # Requirements naming no known skill fall back to keyword coverage, as in the pre-filter
+        documents = [texts[index] for index in extracted]
+        engine = self.skill_engine(requirements)
+        if engine.skills:
+            scores = engine.score(documents)
+        else:
+            coverage = BM25Ranker(documents).coverage(requirements)
+        for row, index in enumerate(extracted):
+            filename = file_paths[index][1]
+            if engine.skills:
+                result = self._local_result(filename, engine, scores, row, "not analyzed by AI (fast mode)")
+            else:
+                result = self._keyword_result(filename, coverage[row], "not analyzed by AI (fast mode)")
+            if progress_callback:
+                progress_callback(filename, "completed", 100, f"Scored {filename} in fast mode")
+            finish(index, result)
+        
+        results.sort(key=lambda x: x.match_percentage, reverse=True)
+        return results
+    
+    async def _process_batch(
+        self,
+        file_paths: List[tuple],
+        requirements: str,
+        progress_callback: Optional[Callable[[str, str, float, str], None]],
+        content_hashes: Optional[Dict[str, str]],
+        result_callback: Optional[Callable[[CVMatchResult], None]],
+        file_ids: Optional[List[str]]
+    ) -> List[CVMatchResult]:
+        """
+        Extract every CV, then score those without a cached analysis through one offline provider
+        batch: the requests are written to a JSONL file, submitted, polled until the provider is
+        done and the responses ingested as results
+        """
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        results: List[Optional[CVMatchResult]] = [None] * len(file_paths)
+        finish = self._result_collector(results, result_callback, file_ids)
+        texts = await self._extract_batch(file_paths, progress_callback, content_hashes, semaphore)
+        
+        compiled = self.compiled_requirements(requirements)
+        pending: Dict[str, tuple] = {}  # custom_id -> (index, tokens_saved)
+        requests = []
+        for index, text in enumerate(texts):
+            filename = file_paths[index][1]
+            if isinstance(text, CVMatchResult):
+                finish(index, text)
+                continue
+            
+            analysis = None
+            if self.analysis_cache:
+                analysis = await self.analysis_cache.get(text, requirements)
+                if analysis is not None:
+                    self.cache_hits += 1
+                else:
+                    self.cache_misses += 1
+            if analysis is not None:
+                if progress_callback:
+                    progress_callback(filename, "completed", 100, f"Loaded cached analysis for {filename}")
+                finish(index, self._finalize(filename, text, requirements, analysis, None))
+                continue
+            
+            prompt_text, tokens_saved = await self._compact(text)
+            custom_id = f"cv-{index}"
+            pending[custom_id] = (index, tokens_saved)
+            requests.append(self.llm_service.batch_request(custom_id, prompt_text, compiled))
+        
+        if pending:
+            filenames = [file_paths[index][1] for index, _ in pending.values()]
+            outputs = await self._run_provider_batch(requests, filenames, progress_callback)
+            for custom_id, (index, tokens_saved) in pending.items():
+                filename = file_paths[index][1]
+                content, error = outputs.get(custom_id, (None, "No response in the provider batch output"))
+                if error is not None:
+                    if progress_callback:
+                        progress_callback(filename, "error", 100, f"Error processing {filename}: {error}")
+                    finish(index, self._error_result(filename, f"Error processing CV: {error}", f"Processing error: {error}"))
+                    continue
                 
-                results.append(CVMatchResult(
-                    filename=filename,
-                    match_percentage=0,
-                    skills_match=0,
-                    experience_match=0,
-                    education_match=0,
-                    overall_match=0,
-                    summary=f"Error processing CV: {str(e)}",
-                    strengths=[],
-                    weaknesses=[f"Processing error: {str(e)}"],
-                    skill_breakdown=[],
-                    required_skills_missing=[],
-                    technical_skills_score=0.0,
-                    soft_skills_score=0.0,
-                    leadership_score=0.0,
-                    communication_score=0.0
-                ))
+                analysis = LLMService.parse_analysis(content)
+                if self.analysis_cache and analysis.get("summary") != PARSE_ERROR_SUMMARY:
+                    await self.analysis_cache.set(texts[index], requirements, analysis)
+                if progress_callback:
+                    progress_callback(filename, "completed", 100, f"Successfully completed batch analysis of {filename}")
+                finish(index, self._finalize(filename, texts[index], requirements, analysis, tokens_saved))
         
-        # Sort results by match_percentage (descending)
         results.sort(key=lambda x: x.match_percentage, reverse=True)
+        return results
+    
+    async def _run_provider_batch(
+        self,
+        requests: List[Dict],
+        filenames: List[str],
+        progress_callback: Optional[Callable[[str, str, float, str], None]]
+    ) -> Dict[str, tuple]:
+        """
+        Submit batch requests and wait for the provider. Returns custom_id -> (content, error).
+        The submission is recorded next to its input file (named by a hash of the requests), so
+        a re-run of the same batch after a restart resumes polling instead of submitting again.
+        """
+        provider = self.batch_provider or get_batch_provider()
+        payload = "".join(json.dumps(request) + "\n" for request in requests)
+        key = hashlib.sha256(payload.encode("utf-8")).hexdigest()[:32]
+        input_path = os.path.join(self.batch_dir, f"{key}.input.jsonl")
+        output_path = os.path.join(self.batch_dir, f"{key}.output.jsonl")
+        marker_path = os.path.join(self.batch_dir, f"{key}.batch.json")
+        
+        submission = await asyncio.to_thread(_read_json, marker_path)
+        if submission and submission.get("provider") == provider.name:
+            batch_id = submission["batch_id"]
+            logger.info("Resuming provider batch %s", batch_id)
+        else:
+            await asyncio.to_thread(_write_file, input_path, payload)
+            batch_id = await provider.submit(input_path)
+            await asyncio.to_thread(_write_file, marker_path, json.dumps({"provider": provider.name, "batch_id": batch_id}))
+        
+        def report(progress: float, step: str):
+            if progress_callback:
+                for filename in filenames:
+                    progress_callback(filename, "analyzing", progress, step)
+        
+        report(10.0, f"Queued in {provider.name} batch {batch_id} ({len(requests)} requests)...")
+        reported = None
+        while True:
+            state = await provider.status(batch_id)
+            if state["status"] in FINAL_BATCH_STATUSES:
+                break
+            done = state.get("completed")
+            total = state.get("total")
+            if total and (state["status"], done) != reported:
+                reported = (state["status"], done)
+                report(round(10.0 + 85.0 * (done or 0) / total, 1), f"Provider batch {batch_id} {state['status']}: {done or 0}/{total} analyzed")
+            await asyncio.sleep(self.batch_poll_interval)
+        
+        if state["status"] == "failed":
+            await asyncio.to_thread(_remove_files, [marker_path, input_path])
+            raise Exception(f"Provider batch {batch_id} failed: {state.get('error') or 'no details from provider'}")
+        
+        await provider.download(batch_id, output_path)
+        outputs = await asyncio.to_thread(_read_batch_output, output_path)
+        await asyncio.to_thread(_remove_files, [marker_path, input_path, output_path])
+        if state["status"] != "completed":
+            # Expired or cancelled batches return what was finished; the rest become errors
+            for request in requests:
+                outputs.setdefault(request["custom_id"], (None, f"Provider batch {batch_id} {state['status']} before this CV was analyzed"))
+        return outputs
+    
+    @staticmethod
+    def _result_collector(
+        results: List[Optional[CVMatchResult]],
+        result_callback: Optional[Callable[[CVMatchResult], None]],
+        file_ids: Optional[List[str]]
+    ) -> Callable[[int, CVMatchResult], None]:
+        """Return finish(index, result): stores a result in its slot and reports it"""
+        def finish(index: int, result: CVMatchResult):
+            if file_ids:
+                result.file_id = file_ids[index]
+            results[index] = result
+            if result_callback:
+                result_callback(result)
+        return finish
+    
+    async def _extract_batch(
+        self,
+        file_paths: List[tuple],
+        progress_callback: Optional[Callable[[str, str, float, str], None]],
+        content_hashes: Optional[Dict[str, str]],
+        semaphore: asyncio.Semaphore
+    ) -> List[Union[str, CVMatchResult]]:
+        """Extract every CV's text concurrently; files that fail become error results"""
+        async def extract(file_path: str, filename: str, extension: str) -> Union[str, CVMatchResult]:
+            async with self._slot(semaphore):
+                return await self._run_guarded(
+                    self._extract_cv_text(
+                        file_path,
+                        filename,
+                        extension,
+                        progress_callback,
+                        (content_hashes or {}).get(file_path)
+                    ),
+                    filename,
+                    progress_callback,
+                    lambda summary, weakness: self._error_result(filename, summary, weakness)
+                )
+        
+        order = longest_first(self._expected(file_path, extension)["extraction"] for file_path, _, extension in file_paths)
+        extracted = await asyncio.gather(*[extract(*file_paths[index]) for index in order])
+        texts: List[Union[str, CVMatchResult]] = [None] * len(file_paths)
+        for index, text in zip(order, extracted):
+            texts[index] = text
+        return texts
+    
+    def _local_result(self, filename: str, engine: SkillEngine, scores: Dict[str, Any], row: int, outcome: str) -> CVMatchResult:
+        """Result for a CV scored only by the local skill engine (row of a SkillEngine.score batch)"""
+        skills_match = float(scores["skills_match"][row])
+        breakdown = engine.breakdown(scores["counts"][row], scores["strength"][row])
+        missing = engine.missing(scores["counts"][row])
+        found = [match.skill_name for match in breakdown if match.level != "missing"]
+        return CVMatchResult(
+            filename=filename,
+            match_percentage=skills_match,
+            skills_match=skills_match,
+            experience_match=0,
+            education_match=0,
+            overall_match=skills_match,
+            summary=(
+                f"Scored locally by skill matching ({len(found)} of {len(engine.skills)} "
+                f"requested skills mentioned); {outcome}."
+            ),
+            strengths=[f"Mentions {skill}" for skill in found[:5]],
+            weaknesses=[f"No mention of {skill}" for skill in missing[:5]],
+            skill_breakdown=breakdown,
+            required_skills_missing=missing,
+            technical_skills_score=float(scores["technical_skills_score"][row]),
+            soft_skills_score=float(scores["soft_skills_score"][row]),
+            local_skills_match=skills_match
+        )
+    
+    @staticmethod
+    def _keyword_result(filename: str, coverage: Dict, outcome: str) -> CVMatchResult:
+        """
+        Result for a CV scored locally when the requirements name no recognisable skills: the
+        share of requirement terms it mentions. Unmatched terms are ordinary words rather than
+        skills, so none are reported as missing.
+        """
+        score = coverage["percentage"]
+        return CVMatchResult(
+            filename=filename,
+            match_percentage=score,
+            skills_match=score,
+            experience_match=0,
+            education_match=0,
+            overall_match=score,
+            summary=(
+                f"Scored locally by keyword match ({score:.0f}% of requirement terms, weighted by rarity); "
+                f"{outcome}."
+            ),
+            strengths=[f"Mentions: {', '.join(coverage['matched'][:10])}"] if coverage["matched"] else [],
+            weaknesses=["Not analyzed by AI (no recognised skills in the requirements to match locally)"],
+            skill_breakdown=[],
+            required_skills_missing=[]
+        )
+    
+    async def _process_with_timeout(
+        self,
+        file_path: str,
+        filename: str,
+        extension: str,
+        requirements: str,
+        progress_callback: Optional[Callable[[str, str, float, str], None]] = None,
+        content_hash: Optional[str] = None
+    ) -> CVMatchResult:
+        """Process a single file, bounded by the per-file timeout"""
+        return await self._run_guarded(
+            self._process_single_file(
+                file_path,
+                filename,
+                extension,
+                requirements,
+                progress_callback,
+                content_hash
+            ),
+            filename,
+            progress_callback,
+            lambda summary, weakness: self._error_result(filename, summary, weakness)
+        )
+    
+    @asynccontextmanager
+    async def _slot(self, semaphore: asyncio.Semaphore):
+        """Hold one of the batch's concurrency slots, counting the file as queued, then in flight"""
+        self.metrics.files_queued.inc()
+        try:
+            await semaphore.acquire()
+        finally:
+            self.metrics.files_queued.dec()
+        self.metrics.files_in_flight.inc()
+        try:
+            yield
+        finally:
+            self.metrics.files_in_flight.dec()
+            semaphore.release()
+    
+    async def _run_guarded(self, coroutine, filename: str, progress_callback, on_error: Callable[[str, str], Any]):
+        """Await a file's processing within the per-file timeout; failures become on_error(summary, weakness)"""
+        try:
+            return await asyncio.wait_for(coroutine, timeout=self.file_timeout)
+        except asyncio.TimeoutError:
+            message = f"Timed out after {self.file_timeout:.0f}s"
+        except Exception as e:
+            # Handle file-level errors
+            message = str(e)
+        if progress_callback:
+            progress_callback(filename, "error", 100, f"Error processing {filename}: {message}")
+        return on_error(f"Error processing CV: {message}", f"Processing error: {message}")
+    
+    async def process_cv_files_multi(
+        self,
+        file_paths: List[tuple],
+        requirements_list: List[str],
+        progress_callback: Optional[Callable[[str, str, float, str], None]] = None,
+        content_hashes: Optional[Dict[str, str]] = None,
+        file_ids: Optional[List[str]] = None
+    ) -> List[List[CVMatchResult]]:
+        """
+        Score every CV against several requirement sets, extracting each CV once and sharing its
+        text across roles in multi-role LLM calls
+        Returns one result list per requirement set (in order), each sorted by match_percentage
+        """
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        order = self._schedule(file_paths)
+        batch = self._batch
+        
+        async def run(index: int) -> Tuple[int, List[CVMatchResult]]:
+            file_path, filename, extension = file_paths[index]
+            async with self._slot(semaphore):
+                batch.start(index)
+                results = await self._run_guarded(
+                    self._process_single_file_multi(
+                        file_path,
+                        filename,
+                        extension,
+                        requirements_list,
+                        progress_callback,
+                        (content_hashes or {}).get(file_path)
+                    ),
+                    filename,
+                    progress_callback,
+                    lambda summary, weakness: [
+                        self._error_result(filename, summary, weakness) for _ in requirements_list
+                    ]
+                )
+                batch.finish(index)
+            for result in results:
+                result.file_id = file_ids[index] if file_ids else None
+            return index, results
+        
+        per_file: List[List[CVMatchResult]] = [None] * len(file_paths)
+        for index, results in await asyncio.gather(*[run(index) for index in order]):
+            per_file[index] = results
+        
+        # Fan the per-CV results out into one ranking per requirement set
+        per_role = []
+        for role_index in range(len(requirements_list)):
+            results = [results[role_index] for results in per_file]
+            results.sort(key=lambda x: x.match_percentage, reverse=True)
+            per_role.append(results)
+        return per_role
+    
+    async def _process_single_file_multi(
+        self,
+        file_path: str,
+        filename: str,
+        extension: str,
+        requirements_list: List[str],
+        progress_callback: Optional[Callable[[str, str, float, str], None]] = None,
+        content_hash: Optional[str] = None
+    ) -> List[CVMatchResult]:
+        """Process one CV against every requirement set; only roles missing from the analysis cache go to the LLM"""
+        start_time = time.time()
+        
+        cv_text = await self._extract_cv_text(file_path, filename, extension, progress_callback, content_hash)
+        if isinstance(cv_text, CVMatchResult):
+            return [cv_text] + [cv_text.copy(deep=True) for _ in requirements_list[1:]]
+        
+        analyses: List[Optional[Dict]] = [None] * len(requirements_list)
+        if self.analysis_cache:
+            for index, requirements in enumerate(requirements_list):
+                analyses[index] = await self.analysis_cache.get(cv_text, requirements)
+                if analyses[index] is not None:
+                    self.cache_hits += 1
+                else:
+                    self.cache_misses += 1
+        
+        missing = [index for index, analysis in enumerate(analyses) if analysis is None]
+        tokens_saved = None
+        if missing:
+            prompt_text, tokens_saved = await self._compact(cv_text)
+            # Role groups run in parallel, so the single-role LLM timings are a fair estimate
+            expected = self._expected(text_length=len(prompt_text))
+            progress_range = self._llm_progress_range(expected)
+            step = f"AI is analyzing {filename} against {len(missing)} requirement set(s)...{self._saved_note(tokens_saved)}"
+            if progress_callback:
+                progress_callback(filename, "analyzing", progress_range[0], step)
+            
+            fresh = await self.llm_service.analyze_cv_match_multi(
+                prompt_text,
+                [self.compiled_requirements(requirements_list[index]) for index in missing]
+            )
+            for index, analysis in zip(missing, fresh):
+                analyses[index] = analysis
+                if self.analysis_cache and analysis.get("summary") != PARSE_ERROR_SUMMARY:
+                    await self.analysis_cache.set(cv_text, requirements_list[index], analysis)
+        
+        results = [self._build_result(filename, analysis) for analysis in analyses]
+        for index in missing:
+            results[index].prompt_tokens_saved = tokens_saved
+        if self.skill_check:
+            for result, requirements in zip(results, requirements_list):
+                self._check_skills(result, cv_text, requirements)
+        
+        if progress_callback:
+            total_time = time.time() - start_time
+            progress_callback(
+                filename,
+                "completed",
+                100,
+                f"Successfully completed analysis of {filename} against {len(requirements_list)} requirement sets (took {total_time:.1f}s)"
+            )
         
         return results
+    
+    @staticmethod
+    def _error_result(filename: str, summary: str, weakness: str) -> CVMatchResult:
+        """Build a zero-score result for a file that could not be analyzed"""
+        return CVMatchResult(
+            filename=filename,
+            match_percentage=0,
+            skills_match=0,
+            experience_match=0,
+            education_match=0,
+            overall_match=0,
+            summary=summary,
+            strengths=[],
+            weaknesses=[weakness],
+            skill_breakdown=[],
+            required_skills_missing=[],
+            technical_skills_score=0.0,
+            soft_skills_score=0.0,
+            leadership_score=0.0,
+            communication_score=0.0
+        )
+
+
+def _read_json(path: str) -> Optional[Dict]:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def _write_file(path: str, data: str):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(data)
+
+
+def _remove_files(paths: List[str]):
+    for path in paths:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def _read_batch_output(path: str) -> Dict[str, tuple]:
+    """Provider batch output lines as custom_id -> (message content, None) or (None, error message)"""
+    outputs = {}
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            item = json.loads(line)
+            response = item.get("response") or {}
+            error = item.get("error")
+            if error or response.get("status_code") != 200:
+                body_error = (response.get("body") or {}).get("error") or {}
+                message = (error or {}).get("message") or body_error.get("message") or f"Provider returned status {response.get('status_code')}"
+                outputs[item["custom_id"]] = (None, message)
+                continue
+            try:
+                outputs[item["custom_id"]] = (response["body"]["choices"][0]["message"]["content"], None)
+            except (KeyError, IndexError, TypeError):
+                outputs[item["custom_id"]] = (None, "Malformed response in the provider batch output")
+    return outputs
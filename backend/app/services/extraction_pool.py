@@ -0,0 +1,114 @@
+import os
+import sys
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, Optional
+
+class ExtractionPool:
+    """Runs CPU-bound document parsing in worker processes with per-task timeouts"""
+
+    def __init__(self, max_workers: Optional[int] = None, timeout: Optional[float] = None):
+        if max_workers is None:
+            max_workers = int(os.getenv("EXTRACTION_WORKERS", str(min(4, os.cpu_count() or 1))))
+        # 0 workers runs parsing in a thread instead (no process isolation)
+        self.max_workers = max(0, max_workers)
+        self.timeout = timeout or float(os.getenv("EXTRACTION_TIMEOUT", "60"))
+        self.max_tasks_per_child = int(os.getenv("EXTRACTION_MAX_TASKS_PER_CHILD", "100"))
+        self._executor: Optional[ProcessPoolExecutor] = None
+        # Tasks still awaited per executor; a retired pool is killed once its count drops to zero
+        self._active: Dict[ProcessPoolExecutor, int] = {}
+
+    def _new_executor(self, max_workers: int, recycle: bool = True) -> ProcessPoolExecutor:
+        kwargs = {}
+        if recycle and sys.version_info >= (3, 11) and self.max_tasks_per_child > 0:
+            # Recycle workers periodically so parser memory leaks can't accumulate
+            kwargs["max_tasks_per_child"] = self.max_tasks_per_child
+        # Spawned (not forked) workers don't inherit the event loop or its threads
+        return ProcessPoolExecutor(
+            max_workers=max_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            **kwargs
+        )
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = self._new_executor(self.max_workers)
+        return self._executor
+
+    def _discard(self, executor: ProcessPoolExecutor):
+        """Kill a pool's workers and stop using it (a fresh pool is created on next use)"""
+        if self._executor is executor:
+            self._executor = None
+        # A hung worker never returns, so terminate processes instead of waiting for them
+        for process in list((getattr(executor, "_processes", None) or {}).values()):
+            try:
+                process.kill()
+            except Exception:
+                pass
+        # Pending work fails with BrokenProcessPool and is retried by its caller
+        executor.shutdown(wait=False)
+
+    async def _run_in(self, executor: ProcessPoolExecutor, func: Callable[..., Any], args: tuple) -> Any:
+        future = asyncio.get_running_loop().run_in_executor(executor, func, *args)
+        self._active[executor] = self._active.get(executor, 0) + 1
+        try:
+            return await asyncio.wait_for(future, timeout=self.timeout)
+        except asyncio.TimeoutError:
+            if self._executor is executor:
+                # A worker is stuck on this task and can't be killed on its own without breaking
+                # the pool, so the pool is retired instead: new work goes to a fresh pool while the
+                # other extractions already running here finish, then the old workers are killed
+                self._executor = None
+            raise TimeoutError(f"Text extraction timed out after {self.timeout:.0f}s")
+        finally:
+            self._active[executor] -= 1
+            if self._active[executor] == 0:
+                del self._active[executor]
+                if self._executor is not executor:
+                    self._discard(executor)
+
+    async def run(self, func: Callable[..., Any], *args: Any) -> Any:
+        """Run func(*args) in a worker process, raising TimeoutError if it exceeds the timeout"""
+        if self.max_workers == 0:
+            return await asyncio.wait_for(asyncio.to_thread(func, *args), timeout=self.timeout)
+
+        executor = self._get_executor()
+        try:
+            return await self._run_in(executor, func, args)
+        except BrokenProcessPool:
+            self._discard(executor)
+
+        # A crash in any worker breaks the whole shared pool. Retry in a private single-worker
+        # process (discarded once done) so a pathological file can only take itself down.
+        isolated = self._new_executor(1, recycle=False)
+        try:
+            return await self._run_in(isolated, func, args)
+        except BrokenProcessPool:
+            raise Exception("Text extraction worker crashed")
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+        # Retired pools may still hold a hung worker
+        for executor in list(self._active):
+            self._discard(executor)
+        self._active.clear()
+
+
+_extraction_pool: Optional[ExtractionPool] = None
+
+def get_extraction_pool() -> ExtractionPool:
+    """Return the process-wide extraction pool"""
+    global _extraction_pool
+    if _extraction_pool is None:
+        _extraction_pool = ExtractionPool()
+    return _extraction_pool
+
+def shutdown_extraction_pool():
+    global _extraction_pool
+    if _extraction_pool is not None:
+        _extraction_pool.shutdown()
+        _extraction_pool = None
@@ -1,54 +1,129 @@
-import io
-from typing import Optional
+from typing import Iterable, Iterator, List, Optional
 import PyPDF2
 from docx import Document
-import aiofiles
+import asyncio
 import os
+import time
+from app.services.cache import get_text_cache, hash_file
+from app.services.extraction_pool import get_extraction_pool
+from app.services.latency_stats import get_latency_stats, extraction_key
+from app.services.metrics import get_metrics
+
+# Version of the extraction output format; cached text from other versions is ignored
+EXTRACTION_VERSION = "3"
+
+def iter_pdf_chunks(file_path: str) -> Iterator[str]:
+    """Yield the text of each PDF page in order, parsing pages lazily"""
+    with open(file_path, 'rb') as file:
+        pdf_reader = PyPDF2.PdfReader(file)
+        for page in pdf_reader.pages:
+            yield page.extract_text() or ""
+
+def iter_docx_chunks(file_path: str) -> Iterator[str]:
+    """Yield each paragraph, then each table row, of a .docx document"""
+    doc = Document(file_path)
+    
+    for paragraph in doc.paragraphs:
+        yield paragraph.text
+    
+    # Also extract text from tables. row.cells rebuilds the whole table grid on every
+    # call (quadratic in row count), so resolve the grid once per table and slice it.
+    for table in doc.tables:
+        column_count = len(table.columns)
+        cells = table._cells
+        for start in range(0, len(cells), column_count):
+            # A merged cell appears once per grid column it spans; emit its text only once
+            row = []
+            for cell in cells[start:start + column_count]:
+                if not row or cell._tc is not row[-1]._tc:
+                    row.append(cell)
+            yield " ".join(cell.text for cell in row)
+
+def assemble_text(chunks: Iterable[str], max_chars: int = 0) -> str:
+    """
+    Join text chunks with newlines in linear time
+    max_chars: stop consuming chunks once this much text is collected (0 = no limit)
+    """
+    parts: List[str] = []
+    total = 0
+    for chunk in chunks:
+        parts.append(chunk)
+        total += len(chunk) + 1
+        if max_chars and total >= max_chars:
+            # Closing the generator stops parsing of the remaining pages/paragraphs
+            break
+    text = "\n".join(parts)
+    if max_chars:
+        text = text[:max_chars]
+    return text.strip()
+
+def _max_chars() -> int:
+    return int(os.getenv("EXTRACTION_MAX_CHARS", "100000"))
+
+def _parse_pdf(file_path: str) -> str:
+    """Extract text from a PDF (runs in an extraction worker process)"""
+    return assemble_text(iter_pdf_chunks(file_path), _max_chars())
+
+def _parse_docx(file_path: str) -> str:
+    """Extract text from a .docx document (runs in an extraction worker process)"""
+    return assemble_text(iter_docx_chunks(file_path), _max_chars())
 
 class FileProcessor:
     """Service for extracting text from PDF and Word documents"""
     
     @staticmethod
     async def extract_text_from_pdf(file_path: str) -> str:
-        """Extract text from PDF file"""
+        """Extract text from PDF file in the extraction worker pool"""
         try:
-            async with aiofiles.open(file_path, 'rb') as file:
-                file_data = await file.read()
-            
-            pdf_reader = PyPDF2.PdfReader(io.BytesIO(file_data))
-            text = ""
-            
-            for page in pdf_reader.pages:
-                text += page.extract_text() + "\n"
-            
-            return text.strip()
+            return await get_extraction_pool().run(_parse_pdf, os.path.abspath(file_path))
         except Exception as e:
             raise Exception(f"Error extracting text from PDF: {str(e)}")
     
     @staticmethod
     async def extract_text_from_docx(file_path: str) -> str:
-        """Extract text from Word document (.docx format)"""
+        """Extract text from Word document (.docx format) in the extraction worker pool"""
         try:
-            doc = Document(file_path)
-            text = ""
-            
-            for paragraph in doc.paragraphs:
-                text += paragraph.text + "\n"
-            
-            # Also extract text from tables
-            for table in doc.tables:
-                for row in table.rows:
-                    for cell in row.cells:
-                        text += cell.text + " "
-                text += "\n"
-            
-            return text.strip()
+            return await get_extraction_pool().run(_parse_docx, os.path.abspath(file_path))
         except Exception as e:
             raise Exception(f"Error extracting text from DOCX: {str(e)}. Note: Legacy .doc files are not supported. Please convert to .docx format.")
     
     @staticmethod
-    async def extract_text(file_path: str, file_extension: str) -> str:
-        """Extract text from file based on extension"""
+    async def extract_text(file_path: str, file_extension: str, content_hash: Optional[str] = None) -> str:
+        """
+        Extract text from file based on extension
+        content_hash: SHA-256 of the file contents if already known; text is cached under this hash
+        """
+        text_cache = get_text_cache()
+        if text_cache is None:
+            return await FileProcessor._extract_text_uncached(file_path, file_extension)
+        
+        if content_hash is None:
+            content_hash = await asyncio.to_thread(hash_file, file_path)
+        
+        text = await text_cache.get(content_hash)
+        if text is None:
+            text = await FileProcessor._extract_text_uncached(file_path, file_extension)
+            await text_cache.set(content_hash, text)
+        return text
+    
+    @staticmethod
+    async def _extract_text_uncached(file_path: str, file_extension: str) -> str:
+        """Parse the document, recording the parse time in the latency statistics and metrics"""
+        file_format = file_extension.lower().lstrip(".")
+        start = time.perf_counter()
+        try:
+            text = await FileProcessor._parse_document(file_path, file_extension)
+        except Exception:
+            get_metrics().extraction_failures.inc(format=file_format)
+            raise
+        elapsed = time.perf_counter() - start
+        get_latency_stats().record("extraction", extraction_key(file_extension, os.path.getsize(file_path)), elapsed)
+        get_metrics().extraction_seconds.observe(elapsed, format=file_format)
+        return text
+    
+    @staticmethod
+    async def _parse_document(file_path: str, file_extension: str) -> str:
+        """Parse the document with the extractor matching its extension"""
         extension = file_extension.lower()
         
         if extension == '.pdf':
@@ -0,0 +1,246 @@
+import os
+import time
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional, Set, Any
+
+class FileStore:
+    """Persistent metadata for stored CV files, backed by SQLite in WAL mode"""
+
+    def __init__(self, db_path: Optional[str] = None):
+        self.db_path = db_path or os.getenv("FILE_STORE_DB", os.path.join("file_storage", "metadata.db"))
+        os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+        # sqlite3 connections can't be shared between threads, so keep one per thread
+        self._local = threading.local()
+        self._init_schema()
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.db_path, timeout=30.0, isolation_level=None)
+            connection.row_factory = sqlite3.Row
+            # WAL lets readers in other worker processes proceed while one process writes
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    def _init_schema(self):
+        connection = self._connect()
+        connection.execute("""
+            CREATE TABLE IF NOT EXISTS files (
+                file_id TEXT PRIMARY KEY,
+                path TEXT NOT NULL,
+                filename TEXT NOT NULL,
+                content_hash TEXT,
+                size INTEGER NOT NULL DEFAULT 0,
+                uploaded_at REAL NOT NULL
+            )
+        """)
+        connection.execute("CREATE INDEX IF NOT EXISTS idx_files_uploaded_at ON files (uploaded_at)")
+        connection.execute("CREATE INDEX IF NOT EXISTS idx_files_content_hash ON files (content_hash)")
+        connection.execute("CREATE INDEX IF NOT EXISTS idx_files_path ON files (path)")
+        # Content-addressed blobs: many file ids can reference one physical file
+        connection.execute("""
+            CREATE TABLE IF NOT EXISTS blobs (
+                content_hash TEXT PRIMARY KEY,
+                path TEXT NOT NULL,
+                size INTEGER NOT NULL DEFAULT 0,
+                refcount INTEGER NOT NULL DEFAULT 0,
+                created_at REAL NOT NULL
+            )
+        """)
+        # Files in use by a request in some worker process (owner), safe from the janitor until the lease expires
+        connection.execute("""
+            CREATE TABLE IF NOT EXISTS pins (
+                owner TEXT NOT NULL,
+                file_id TEXT NOT NULL,
+                expires_at REAL NOT NULL,
+                PRIMARY KEY (owner, file_id)
+            )
+        """)
+
+    def _transaction(self, func):
+        connection = self._connect()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            value = func(connection)
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        return value
+
+    @staticmethod
+    def _to_dict(row: sqlite3.Row) -> Dict[str, Any]:
+        return {
+            'file_id': row['file_id'],
+            'path': row['path'],
+            'filename': row['filename'],
+            'content_hash': row['content_hash'],
+            'size': row['size'],
+            'uploaded_at': datetime.fromtimestamp(row['uploaded_at'])
+        }
+
+    def add(
+        self,
+        file_id: str,
+        path: str,
+        filename: str,
+        content_hash: Optional[str] = None,
+        size: int = 0,
+        uploaded_at: Optional[float] = None
+    ):
+        """Record a file stored at its own path (not deduplicated)"""
+        self._connect().execute(
+            "INSERT INTO files (file_id, path, filename, content_hash, size, uploaded_at) VALUES (?, ?, ?, ?, ?, ?)",
+            (file_id, path, filename, content_hash, size, uploaded_at or time.time())
+        )
+
+    def add_blob_reference(
+        self,
+        file_id: str,
+        blob_path: str,
+        filename: str,
+        content_hash: str,
+        size: int = 0,
+        uploaded_at: Optional[float] = None,
+        materialize: Optional[Callable[[str], None]] = None
+    ) -> str:
+        """
+        Record a file whose contents live in the content-addressed blob for content_hash.
+        The blob row is created on first use, otherwise its reference count is incremented.
+        materialize(path) runs inside the same transaction and must leave the contents at the
+        blob's path (creating it if missing). Releasing a blob in delete() holds the same lock,
+        so a blob can't be removed between being referenced and being written.
+        Returns the blob's path (an existing blob keeps its original path).
+        """
+        now = uploaded_at or time.time()
+
+        def reference(connection):
+            path = blob_path
+            row = connection.execute("SELECT path FROM blobs WHERE content_hash = ?", (content_hash,)).fetchone()
+            if row is None:
+                connection.execute(
+                    "INSERT INTO blobs (content_hash, path, size, refcount, created_at) VALUES (?, ?, ?, 1, ?)",
+                    (content_hash, path, size, now)
+                )
+            else:
+                path = row['path']
+                connection.execute("UPDATE blobs SET refcount = refcount + 1 WHERE content_hash = ?", (content_hash,))
+            connection.execute(
+                "INSERT INTO files (file_id, path, filename, content_hash, size, uploaded_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (file_id, path, filename, content_hash, size, now)
+            )
+            if materialize is not None:
+                materialize(path)
+            return path
+
+        return self._transaction(reference)
+
+    def get(self, file_id: str) -> Optional[Dict[str, Any]]:
+        """Look up a file by id (primary key lookup)"""
+        row = self._connect().execute("SELECT * FROM files WHERE file_id = ?", (file_id,)).fetchone()
+        return self._to_dict(row) if row else None
+
+    def delete(self, file_id: str, release: Optional[Callable[[str], None]] = None) -> Optional[str]:
+        """
+        Remove a file's metadata and release its blob reference.
+        Returns the on-disk path that is no longer referenced by any file, or None if the file
+        did not exist or its blob is still in use. release(path), if given, runs for that path
+        inside the transaction (e.g. to remove the file), so a concurrent upload of the same
+        contents can't reference the path while it is being removed; otherwise the caller removes it.
+        """
+        def remove(connection):
+            row = connection.execute("SELECT path, content_hash FROM files WHERE file_id = ?", (file_id,)).fetchone()
+            if row is None:
+                return None
+            connection.execute("DELETE FROM files WHERE file_id = ?", (file_id,))
+
+            unreferenced_path = row['path']
+            blob = connection.execute(
+                "SELECT refcount FROM blobs WHERE content_hash = ?", (row['content_hash'],)
+            ).fetchone() if row['content_hash'] else None
+            if blob is not None:
+                if blob['refcount'] > 1:
+                    connection.execute("UPDATE blobs SET refcount = refcount - 1 WHERE content_hash = ?", (row['content_hash'],))
+                    return None
+                connection.execute("DELETE FROM blobs WHERE content_hash = ?", (row['content_hash'],))
+            if release is not None:
+                release(unreferenced_path)
+            return unreferenced_path
+
+        return self._transaction(remove)
+
+    def pin(self, owner: str, file_ids: Iterable[str], expires_at: float):
+        """Protect files from eviction on behalf of owner until expires_at (or until unpinned)"""
+        rows = [(owner, file_id, expires_at) for file_id in file_ids]
+        self._transaction(lambda connection: connection.executemany(
+            "INSERT OR REPLACE INTO pins (owner, file_id, expires_at) VALUES (?, ?, ?)", rows
+        ))
+
+    def unpin(self, owner: str, file_ids: Iterable[str]):
+        rows = [(owner, file_id) for file_id in file_ids]
+        self._transaction(lambda connection: connection.executemany(
+            "DELETE FROM pins WHERE owner = ? AND file_id = ?", rows
+        ))
+
+    def renew_pins(self, owner: str, expires_at: float):
+        """Extend every pin held by owner"""
+        self._connect().execute("UPDATE pins SET expires_at = ? WHERE owner = ?", (expires_at, owner))
+
+    def pinned_file_ids(self, now: Optional[float] = None) -> Set[str]:
+        """File ids pinned by any process; pins whose owner stopped renewing them are dropped"""
+        connection = self._connect()
+        connection.execute("DELETE FROM pins WHERE expires_at < ?", (now or time.time(),))
+        return {row['file_id'] for row in connection.execute("SELECT DISTINCT file_id FROM pins")}
+
+    def __contains__(self, file_id: str) -> bool:
+        return self._connect().execute("SELECT 1 FROM files WHERE file_id = ?", (file_id,)).fetchone() is not None
+
+    def has_path(self, path: str) -> bool:
+        """Whether any file record points at this path"""
+        return self._connect().execute("SELECT 1 FROM files WHERE path = ? LIMIT 1", (path,)).fetchone() is not None
+
+    def latest_by_content(self, content_hashes: Optional[List[str]] = None) -> Dict[str, Dict[str, Any]]:
+        """Most recently uploaded file per content hash (all stored contents, or only the given hashes)"""
+        connection = self._connect()
+        query = "SELECT *, MAX(uploaded_at) FROM files WHERE content_hash IS NOT NULL"
+        if content_hashes is None:
+            rows = connection.execute(query + " GROUP BY content_hash").fetchall()
+        else:
+            rows = []
+            # Stay under SQLite's bound-parameter limit
+            for start in range(0, len(content_hashes), 500):
+                chunk = content_hashes[start:start + 500]
+                rows += connection.execute(
+                    query + f" AND content_hash IN ({','.join('?' * len(chunk))}) GROUP BY content_hash", chunk
+                ).fetchall()
+        return {row['content_hash']: self._to_dict(row) for row in rows}
+
+    def oldest(self, limit: int, uploaded_before: Optional[float] = None, offset: int = 0) -> List[Dict[str, Any]]:
+        """Oldest files first, optionally only those uploaded before a timestamp"""
+        if uploaded_before is None:
+            rows = self._connect().execute(
+                "SELECT * FROM files ORDER BY uploaded_at LIMIT ? OFFSET ?", (limit, offset)
+            ).fetchall()
+        else:
+            rows = self._connect().execute(
+                "SELECT * FROM files WHERE uploaded_at < ? ORDER BY uploaded_at LIMIT ? OFFSET ?",
+                (uploaded_before, limit, offset)
+            ).fetchall()
+        return [self._to_dict(row) for row in rows]
+
+    def totals(self) -> Dict[str, int]:
+        """Number of stored files, distinct blobs, and bytes physically on disk"""
+        connection = self._connect()
+        files = connection.execute("SELECT COUNT(*) FROM files").fetchone()[0]
+        blobs, blob_bytes = connection.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM blobs").fetchone()
+        # Files stored before deduplication have no blob row and occupy their own space
+        legacy_bytes = connection.execute("""
+            SELECT COALESCE(SUM(f.size), 0) FROM files f
+            LEFT JOIN blobs b ON f.content_hash = b.content_hash
+            WHERE b.content_hash IS NULL
+        """).fetchone()[0]
+        return {"files": files, "blobs": blobs, "bytes": blob_bytes + legacy_bytes}
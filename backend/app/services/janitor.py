@@ -0,0 +1,251 @@
+import os
+import time
+import uuid
+import socket
+import asyncio
+import logging
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple, Any
+from app.services.file_store import FileStore
+
+logger = logging.getLogger(__name__)
+
+class StorageJanitor:
+    """Background task that expires stored files, enforces a disk-usage cap and removes stranded uploads"""
+
+    def __init__(
+        self,
+        file_store: FileStore,
+        storage_dir: str,
+        upload_dir: str,
+        ttl_seconds: Optional[float] = None,
+        max_bytes: Optional[int] = None,
+        interval: Optional[float] = None,
+        batch_size: Optional[int] = None,
+        upload_stale_seconds: Optional[float] = None
+    ):
+        self.file_store = file_store
+        self.storage_dir = storage_dir
+        self.upload_dir = upload_dir
+        # 0 disables the corresponding rule
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else float(os.getenv("STORAGE_TTL_HOURS", "168")) * 3600
+        self.max_bytes = max_bytes if max_bytes is not None else int(float(os.getenv("STORAGE_MAX_MB", "10240")) * 1024 * 1024)
+        # When over max_bytes, evict down to this fraction of it
+        self.low_water_ratio = float(os.getenv("STORAGE_LOW_WATER_RATIO", "0.9"))
+        self.interval = interval or float(os.getenv("JANITOR_INTERVAL", "600"))
+        self.batch_size = batch_size or int(os.getenv("JANITOR_BATCH_SIZE", "100"))
+        self.upload_stale_seconds = upload_stale_seconds if upload_stale_seconds is not None else float(os.getenv("UPLOAD_STALE_SECONDS", "21600"))
+
+        # Pins live in the shared database so every worker process's janitor honours them; a
+        # process renews its pins while running, and pins of a process that died expire
+        self.pin_lease_seconds = float(os.getenv("PIN_LEASE_SECONDS", "300"))
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        # File ids currently being processed in this process, with the number of requests using each
+        self._pinned: Dict[str, int] = {}
+        self._pin_lock: Optional[asyncio.Lock] = None
+        # SQLite databases (and their -wal/-shm/-journal files) that live among the stored files
+        self._protected_paths: Set[str] = set()
+        self.add_protected_path(file_store.db_path)
+        # Callables returning file ids that other components (e.g. queued jobs) still need
+        self._reference_sources: List[Callable[[], Set[str]]] = []
+        # Callables notified (in the sweep thread) with the record whose contents were just removed
+        self._removal_listeners: List[Callable[[Dict[str, Any]], None]] = []
+        self._task: Optional[asyncio.Task] = None
+        self._renew_task: Optional[asyncio.Task] = None
+        self.files_reclaimed = 0
+        self.bytes_reclaimed = 0
+        self.uploads_reclaimed = 0
+        self.last_run: Optional[float] = None
+
+    async def pin(self, file_ids: Iterable[str]):
+        """Keep files safe from eviction (by any process's janitor) until unpinned"""
+        if self._pin_lock is None:
+            self._pin_lock = asyncio.Lock()
+        async with self._pin_lock:
+            added = []
+            for file_id in file_ids:
+                count = self._pinned.get(file_id, 0)
+                self._pinned[file_id] = count + 1
+                if count == 0:
+                    added.append(file_id)
+            if added:
+                await asyncio.to_thread(self.file_store.pin, self.owner, added, time.time() + self.pin_lease_seconds)
+
+    async def unpin(self, file_ids: Iterable[str]):
+        if self._pin_lock is None:
+            self._pin_lock = asyncio.Lock()
+        async with self._pin_lock:
+            released = []
+            for file_id in file_ids:
+                count = self._pinned.get(file_id, 0) - 1
+                if count > 0:
+                    self._pinned[file_id] = count
+                else:
+                    self._pinned.pop(file_id, None)
+                    released.append(file_id)
+            if released:
+                await asyncio.to_thread(self.file_store.unpin, self.owner, released)
+
+    def add_protected_path(self, path: str):
+        """Never remove this file (e.g. a SQLite database kept under storage_dir) or its journal files"""
+        path = os.path.abspath(path)
+        self._protected_paths.update(path + suffix for suffix in ("", "-wal", "-shm", "-journal"))
+
+    def add_reference_source(self, source: Callable[[], Set[str]]):
+        """Register a callable (run in the sweep thread) whose file ids are never evicted"""
+        self._reference_sources.append(source)
+
+    def add_removal_listener(self, listener: Callable[[Dict[str, Any]], None]):
+        """Register a callable run whenever stored contents are deleted (e.g. to drop them from an index)"""
+        self._removal_listeners.append(listener)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run_forever())
+            self._renew_task = asyncio.create_task(self._renew_pins())
+
+    async def stop(self):
+        for task in (self._task, self._renew_task):
+            if task is not None:
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        self._task = None
+        self._renew_task = None
+        if self._pinned:
+            await asyncio.to_thread(self.file_store.unpin, self.owner, list(self._pinned))
+            self._pinned.clear()
+
+    async def _renew_pins(self):
+        while True:
+            await asyncio.sleep(self.pin_lease_seconds / 3)
+            if not self._pinned:
+                continue
+            try:
+                await asyncio.to_thread(self.file_store.renew_pins, self.owner, time.time() + self.pin_lease_seconds)
+            except Exception:
+                logger.exception("Failed to renew storage pins")
+
+    async def _run_forever(self):
+        while True:
+            try:
+                await self.sweep()
+            except Exception:
+                logger.exception("Storage janitor sweep failed")
+            await asyncio.sleep(self.interval)
+
+    async def sweep(self) -> Dict[str, int]:
+        """Run one collection pass off the event loop; returns what this pass reclaimed"""
+        return await asyncio.to_thread(self._sweep)
+
+    def _sweep(self) -> Dict[str, int]:
+        reclaimed = {"files": 0, "bytes": 0, "uploads": 0}
+        now = time.time()
+        pinned = self.file_store.pinned_file_ids(now)
+        for source in self._reference_sources:
+            pinned = pinned | source()
+
+        # 1. Files older than the TTL
+        if self.ttl_seconds > 0:
+            self._evict(reclaimed, pinned, uploaded_before=now - self.ttl_seconds)
+
+        # 2. Oldest files while above the disk-usage high-water mark
+        if self.max_bytes > 0 and self.file_store.totals()["bytes"] > self.max_bytes:
+            target = int(self.max_bytes * self.low_water_ratio)
+            self._evict(reclaimed, pinned, target_bytes=target)
+
+        # 3. Upload temp files left behind by crashes, and storage files with no metadata
+        if self.upload_stale_seconds > 0:
+            count, _ = self._remove_stale(self.upload_dir, now - self.upload_stale_seconds, known=None)
+            reclaimed["uploads"] += count
+        if self.ttl_seconds > 0:
+            count, size = self._remove_stale(self.storage_dir, now - self.ttl_seconds, known=self.file_store.has_path)
+            reclaimed["files"] += count
+            reclaimed["bytes"] += size
+
+        self.files_reclaimed += reclaimed["files"]
+        self.bytes_reclaimed += reclaimed["bytes"]
+        self.uploads_reclaimed += reclaimed["uploads"]
+        self.last_run = now
+        return reclaimed
+
+    def _evict(
+        self,
+        reclaimed: Dict[str, int],
+        pinned: Set[str],
+        uploaded_before: Optional[float] = None,
+        target_bytes: Optional[int] = None
+    ):
+        """Delete the oldest unpinned files in batches, by age cutoff or until under target_bytes"""
+        skipped = 0
+        total_bytes = self.file_store.totals()["bytes"] if target_bytes is not None else 0
+        while target_bytes is None or total_bytes > target_bytes:
+            batch = self.file_store.oldest(self.batch_size, uploaded_before=uploaded_before, offset=skipped)
+            if not batch:
+                break
+            for record in batch:
+                if record['file_id'] in pinned:
+                    skipped += 1
+                    continue
+                size = self._remove_record(record)
+                reclaimed["files"] += 1
+                reclaimed["bytes"] += size
+                total_bytes -= size
+                if target_bytes is not None and total_bytes <= target_bytes:
+                    break
+
+    def _remove_record(self, record: Dict[str, Any]) -> int:
+        """Delete a file record; its contents go only when no other file references them"""
+        removed_bytes = 0
+
+        def release(path: str):
+            nonlocal removed_bytes
+            try:
+                size = os.path.getsize(path)
+                os.remove(path)
+                removed_bytes = size
+            except FileNotFoundError:
+                pass
+
+        if not self.file_store.delete(record['file_id'], release=release):
+            return 0
+        for listener in self._removal_listeners:
+            try:
+                listener(record)
+            except Exception:
+                logger.exception("Storage removal listener failed")
+        return removed_bytes
+
+    def _remove_stale(self, directory: str, modified_before: float, known) -> Tuple[int, int]:
+        """Remove plain files older than the cutoff, skipping files `known` still references; returns (count, bytes)"""
+        removed = 0
+        removed_bytes = 0
+        for root, _, names in os.walk(directory):
+            for name in names:
+                path = os.path.join(root, name)
+                if os.path.abspath(path) in self._protected_paths:
+                    continue
+                try:
+                    stat = os.stat(path)
+                    if stat.st_mtime >= modified_before:
+                        continue
+                    if known is not None and known(path):
+                        continue
+                    os.remove(path)
+                    removed += 1
+                    removed_bytes += stat.st_size
+                except FileNotFoundError:
+                    continue
+        return removed, removed_bytes
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "files_reclaimed": self.files_reclaimed,
+            "bytes_reclaimed": self.bytes_reclaimed,
+            "uploads_reclaimed": self.uploads_reclaimed,
+            "last_run": self.last_run,
+            "ttl_seconds": self.ttl_seconds,
+            "max_bytes": self.max_bytes,
+            "pinned_files": len(self._pinned)
+        }
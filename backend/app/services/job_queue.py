@@ -0,0 +1,398 @@
+import os
+import json
+import time
+import uuid
+import socket
+import sqlite3
+import asyncio
+import logging
+import threading
+from typing import Dict, List, Optional, Set, Any
+from app.models import CVMatchResult
+from app.services.cv_matcher import CVMatcher
+
+logger = logging.getLogger(__name__)
+
+FINAL_STATUSES = ("completed", "failed", "cancelled")
+
+class JobQueue:
+    """
+    Durable queue of screening jobs, backed by SQLite (no external broker).
+    Each job's files are rows in job_files; a file's result is checkpointed as soon as it
+    is scored, so a job that is interrupted resumes with only the files still pending.
+    Running jobs hold a lease that their worker renews; a job whose lease expired (its
+    worker or container died) is picked up again by any worker.
+    """
+
+    def __init__(self, db_path: Optional[str] = None, lease_seconds: Optional[float] = None):
+        # Shares the file metadata database by default (routes.py registers it with the janitor as protected)
+        self.db_path = db_path or os.getenv("JOB_QUEUE_DB", os.getenv("FILE_STORE_DB", os.path.join("file_storage", "metadata.db")))
+        self.lease_seconds = lease_seconds or float(os.getenv("JOB_LEASE_SECONDS", "60"))
+        os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+        # sqlite3 connections can't be shared between threads, so keep one per thread
+        self._local = threading.local()
+        self._init_schema()
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.db_path, timeout=30.0, isolation_level=None)
+            connection.row_factory = sqlite3.Row
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    def _init_schema(self):
+        connection = self._connect()
+        connection.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                job_id TEXT PRIMARY KEY,
+                requirements TEXT NOT NULL,
+                options TEXT,
+                status TEXT NOT NULL,
+                total INTEGER NOT NULL DEFAULT 0,
+                completed INTEGER NOT NULL DEFAULT 0,
+                error TEXT,
+                worker_id TEXT,
+                lease_expires_at REAL,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            )
+        """)
+        # Databases created before jobs had options
+        if "options" not in {row["name"] for row in connection.execute("PRAGMA table_info(jobs)")}:
+            connection.execute("ALTER TABLE jobs ADD COLUMN options TEXT")
+        connection.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, created_at)")
+        connection.execute("""
+            CREATE TABLE IF NOT EXISTS job_files (
+                job_id TEXT NOT NULL,
+                position INTEGER NOT NULL,
+                file_id TEXT NOT NULL,
+                filename TEXT NOT NULL,
+                path TEXT NOT NULL,
+                extension TEXT NOT NULL,
+                content_hash TEXT,
+                status TEXT NOT NULL DEFAULT 'pending',
+                result TEXT,
+                completed_order INTEGER,
+                PRIMARY KEY (job_id, position)
+            )
+        """)
+
+    def _transaction(self, func):
+        connection = self._connect()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            value = func(connection)
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        return value
+
+    @staticmethod
+    def _job_to_dict(row: sqlite3.Row) -> Dict[str, Any]:
+        return {
+            'job_id': row['job_id'],
+            'status': row['status'],
+            'total': row['total'],
+            'completed': row['completed'],
+            'error': row['error'],
+            'created_at': row['created_at'],
+            'updated_at': row['updated_at']
+        }
+
+    def submit(self, requirements: str, files: List[Dict[str, Any]], options: Optional[Dict[str, Any]] = None) -> str:
+        """
+        Enqueue a job. files: dicts with file_id, filename, path, extension and content_hash;
+        paths must outlive the request (stored files, not upload temp files).
+        options: extra CVMatcher.process_cv_files keyword arguments (e.g. batch_mode)
+        """
+        job_id = str(uuid.uuid4())
+        now = time.time()
+
+        def insert(connection):
+            connection.execute(
+                "INSERT INTO jobs (job_id, requirements, options, status, total, created_at, updated_at) VALUES (?, ?, ?, 'queued', ?, ?, ?)",
+                (job_id, requirements, json.dumps(options or {}), len(files), now, now)
+            )
+            connection.executemany(
+                "INSERT INTO job_files (job_id, position, file_id, filename, path, extension, content_hash) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (job_id, position, f['file_id'], f['filename'], f['path'], f['extension'], f.get('content_hash'))
+                    for position, f in enumerate(files)
+                ]
+            )
+
+        self._transaction(insert)
+        return job_id
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        row = self._connect().execute("SELECT * FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return self._job_to_dict(row) if row else None
+
+    def claim_next(self, worker_id: str) -> Optional[Dict[str, Any]]:
+        """Atomically take the oldest queued job (or one whose lease expired); returns it with its requirements and options"""
+        now = time.time()
+
+        def claim(connection):
+            row = connection.execute("""
+                SELECT * FROM jobs
+                WHERE status = 'queued' OR (status = 'running' AND lease_expires_at < ?)
+                ORDER BY created_at LIMIT 1
+            """, (now,)).fetchone()
+            if row is None:
+                return None
+            connection.execute(
+                "UPDATE jobs SET status = 'running', worker_id = ?, lease_expires_at = ?, updated_at = ? WHERE job_id = ?",
+                (worker_id, now + self.lease_seconds, now, row['job_id'])
+            )
+            job = self._job_to_dict(row)
+            job['status'] = 'running'
+            job['requirements'] = row['requirements']
+            job['options'] = json.loads(row['options'] or '{}')
+            return job
+
+        return self._transaction(claim)
+
+    def renew_lease(self, job_id: str, worker_id: str) -> bool:
+        """Extend a running job's lease; False if the job was cancelled or taken over"""
+        now = time.time()
+        cursor = self._connect().execute(
+            "UPDATE jobs SET lease_expires_at = ?, updated_at = ? WHERE job_id = ? AND worker_id = ? AND status = 'running'",
+            (now + self.lease_seconds, now, job_id, worker_id)
+        )
+        return cursor.rowcount > 0
+
+    def pending_files(self, job_id: str) -> List[Dict[str, Any]]:
+        rows = self._connect().execute(
+            "SELECT * FROM job_files WHERE job_id = ? AND status = 'pending' ORDER BY position", (job_id,)
+        ).fetchall()
+        return [
+            {
+                'file_id': row['file_id'],
+                'filename': row['filename'],
+                'path': row['path'],
+                'extension': row['extension'],
+                'content_hash': row['content_hash']
+            }
+            for row in rows
+        ]
+
+    def checkpoint(self, job_id: str, result: CVMatchResult):
+        """Persist one file's result (idempotent: a file that already has a result is left alone)"""
+        payload = json.dumps(result.dict())
+        now = time.time()
+
+        def save(connection):
+            cursor = connection.execute("""
+                UPDATE job_files
+                SET status = 'done', result = ?,
+                    completed_order = (SELECT completed + 1 FROM jobs WHERE job_id = ?)
+                WHERE job_id = ? AND file_id = ? AND status = 'pending'
+            """, (payload, job_id, job_id, result.file_id))
+            if cursor.rowcount:
+                connection.execute(
+                    "UPDATE jobs SET completed = completed + 1, updated_at = ? WHERE job_id = ?", (now, job_id)
+                )
+
+        self._transaction(save)
+
+    def finish(self, job_id: str, worker_id: str, status: str, error: Optional[str] = None) -> bool:
+        """Move a running job owned by worker_id to a final status (or back to 'queued')"""
+        cursor = self._connect().execute(
+            "UPDATE jobs SET status = ?, error = ?, worker_id = NULL, lease_expires_at = NULL, updated_at = ? "
+            "WHERE job_id = ? AND worker_id = ? AND status = 'running'",
+            (status, error, time.time(), job_id, worker_id)
+        )
+        return cursor.rowcount > 0
+
+    def cancel(self, job_id: str) -> bool:
+        """Cancel a queued or running job; checkpointed results are kept"""
+        cursor = self._connect().execute(
+            "UPDATE jobs SET status = 'cancelled', updated_at = ? WHERE job_id = ? AND status IN ('queued', 'running')",
+            (time.time(), job_id)
+        )
+        return cursor.rowcount > 0
+
+    def results(self, job_id: str, after: int = 0) -> List[CVMatchResult]:
+        """Checkpointed results in completion order, starting after the given count"""
+        rows = self._connect().execute(
+            "SELECT result FROM job_files WHERE job_id = ? AND status = 'done' AND completed_order > ? ORDER BY completed_order",
+            (job_id, after)
+        ).fetchall()
+        return [CVMatchResult(**json.loads(row['result'])) for row in rows]
+
+    def active_file_ids(self) -> Set[str]:
+        """File ids referenced by queued or running jobs (kept safe from the storage janitor)"""
+        rows = self._connect().execute("""
+            SELECT DISTINCT f.file_id FROM job_files f JOIN jobs j ON f.job_id = j.job_id
+            WHERE j.status IN ('queued', 'running') AND f.status = 'pending'
+        """).fetchall()
+        return {row['file_id'] for row in rows}
+
+    def depth(self) -> Dict[str, int]:
+        """Number of jobs per status"""
+        rows = self._connect().execute("SELECT status, COUNT(*) AS count FROM jobs GROUP BY status").fetchall()
+        return {row['status']: row['count'] for row in rows}
+
+
+class JobRunner:
+    """Worker pool that claims jobs from a JobQueue and runs them through CVMatcher"""
+
+    def __init__(self, queue: JobQueue, workers: Optional[int] = None, poll_interval: Optional[float] = None):
+        self.queue = queue
+        self.workers = workers if workers is not None else int(os.getenv("JOB_WORKERS", "1"))
+        # How often idle workers look for jobs submitted by other processes
+        self.poll_interval = poll_interval or float(os.getenv("JOB_POLL_INTERVAL", "2"))
+        self.worker_prefix = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._tasks: List[asyncio.Task] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._changed: Optional[asyncio.Condition] = None
+        self._running: Dict[str, asyncio.Task] = {}
+
+    def start(self):
+        if self._tasks:
+            return
+        self._wakeup = asyncio.Event()
+        self._changed = asyncio.Condition()
+        for index in range(self.workers):
+            self._tasks.append(asyncio.create_task(self._worker(f"{self.worker_prefix}:{index}")))
+
+    async def stop(self):
+        """Stop the workers; interrupted jobs go back to the queue and resume from their checkpoints"""
+        for task in self._tasks:
+            task.cancel()
+        for task in self._tasks:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._tasks = []
+
+    def notify(self):
+        """Wake idle workers (a job was just submitted in this process)"""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def cancel(self, job_id: str) -> bool:
+        """Cancel a job; if it is running in this process its in-flight files are abandoned immediately"""
+        cancelled = await asyncio.to_thread(self.queue.cancel, job_id)
+        task = self._running.get(job_id)
+        if cancelled and task is not None:
+            task.cancel()
+        return cancelled
+
+    async def wait_for_change(self, timeout: float):
+        """Block until a job in this process makes progress, or the timeout elapses"""
+        if self._changed is None:
+            await asyncio.sleep(timeout)
+            return
+        async with self._changed:
+            try:
+                await asyncio.wait_for(self._changed.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _notify_changed(self):
+        if self._changed is not None:
+            async with self._changed:
+                self._changed.notify_all()
+
+    async def _worker(self, worker_id: str):
+        while True:
+            try:
+                job = await asyncio.to_thread(self.queue.claim_next, worker_id)
+            except Exception:
+                logger.exception("Failed to claim a job")
+                job = None
+            if job is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            task = asyncio.create_task(self._run_job(job, worker_id))
+            self._running[job['job_id']] = task
+            try:
+                await asyncio.shield(task)
+            except asyncio.CancelledError:
+                if task.done():
+                    continue  # The job itself was cancelled
+                # Shutting down: stop the job and hand it back to the queue
+                task.cancel()
+                try:
+                    await task
+                except (asyncio.CancelledError, Exception):
+                    pass
+                await asyncio.to_thread(self.queue.finish, job['job_id'], worker_id, "queued")
+                raise
+            except Exception as e:
+                logger.exception("Job %s failed", job['job_id'])
+                await asyncio.to_thread(self.queue.finish, job['job_id'], worker_id, "failed", str(e))
+            finally:
+                self._running.pop(job['job_id'], None)
+                await self._notify_changed()
+
+    async def _run_job(self, job: Dict[str, Any], worker_id: str):
+        job_id = job['job_id']
+        files = await asyncio.to_thread(self.queue.pending_files, job_id)
+        heartbeat = asyncio.create_task(self._keep_lease(job_id, worker_id, asyncio.current_task()))
+        # Results are handed to a single writer task so SQLite writes never block the event loop;
+        # results still queued when the job is interrupted are simply scored again on resume
+        pending: asyncio.Queue = asyncio.Queue()
+        failures: List[Exception] = []
+        writer = asyncio.create_task(self._write_checkpoints(job_id, pending, failures))
+        try:
+            if files:
+                await CVMatcher().process_cv_files(
+                    [(f['path'], f['filename'], f['extension']) for f in files],
+                    job['requirements'],
+                    content_hashes={f['path']: f['content_hash'] for f in files if f['content_hash']},
+                    result_callback=pending.put_nowait,
+                    file_ids=[f['file_id'] for f in files],
+                    **job.get('options', {})
+                )
+            await pending.join()
+        finally:
+            heartbeat.cancel()
+            writer.cancel()
+        if failures:
+            raise Exception(f"Failed to checkpoint {len(failures)} result(s): {failures[0]}")
+        await asyncio.to_thread(self.queue.finish, job_id, worker_id, "completed")
+
+    async def _write_checkpoints(self, job_id: str, pending: asyncio.Queue, failures: List[Exception]):
+        """Persist a job's results in the order they were scored, off the event loop"""
+        while True:
+            result = await pending.get()
+            try:
+                await asyncio.to_thread(self.queue.checkpoint, job_id, result)
+            except Exception as e:
+                logger.exception("Failed to checkpoint %s for job %s", result.filename, job_id)
+                failures.append(e)
+            finally:
+                pending.task_done()
+            await self._notify_changed()
+
+    async def _keep_lease(self, job_id: str, worker_id: str, job_task: asyncio.Task):
+        """Renew the job's lease; stop the job if it was cancelled (possibly from another process)"""
+        while True:
+            await asyncio.sleep(self.queue.lease_seconds / 3)
+            try:
+                owned = await asyncio.to_thread(self.queue.renew_lease, job_id, worker_id)
+            except Exception:
+                logger.exception("Failed to renew lease for job %s", job_id)
+                continue
+            if not owned:
+                job_task.cancel()
+                return
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "workers": self.workers,
+            "running_here": len(self._running),
+            "jobs": self.queue.depth()
+        }
@@ -0,0 +1,247 @@
+import os
+import json
+import heapq
+import time
+import asyncio
+import logging
+import tempfile
+from collections import deque
+from typing import Deque, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+PHASES = ("extraction", "llm", "parse")
+# Used until a phase has been observed at least once
+DEFAULT_SECONDS = {"extraction": 2.0, "llm": 15.0, "parse": 0.05}
+# Samples a key needs before its own quantiles are trusted over the phase-wide ones
+MIN_SAMPLES = 5
+POOLED = "*"
+
+SIZE_BUCKETS = [(64 * 1024, "<64KB"), (256 * 1024, "<256KB"), (1024 * 1024, "<1MB"), (4 * 1024 * 1024, "<4MB")]
+LENGTH_BUCKETS = [(2000, "<2k"), (8000, "<8k"), (32000, "<32k")]
+
+
+def _bucket(value: float, buckets: List[Tuple[int, str]], last: str) -> str:
+    for limit, label in buckets:
+        if value < limit:
+            return label
+    return last
+
+
+def extraction_key(extension: str, size_bytes: int) -> str:
+    """Extraction timings are keyed by file type and size (a proxy for page count known before parsing)"""
+    return f"{extension.lower().lstrip('.')}:{_bucket(size_bytes, SIZE_BUCKETS, '>=4MB')}"
+
+
+def length_key(text_length: int) -> str:
+    """LLM and parse timings are keyed by the length of the text sent to the model"""
+    return _bucket(text_length, LENGTH_BUCKETS, ">=32k")
+
+
+def quantile(values: List[float], q: float) -> float:
+    """Linearly interpolated quantile of already sorted values"""
+    position = (len(values) - 1) * q
+    lower = int(position)
+    upper = min(lower + 1, len(values) - 1)
+    return values[lower] + (values[upper] - values[lower]) * (position - lower)
+
+
+class LatencyStats:
+    """
+    Rolling per-phase timings (extraction, LLM, parse) keyed by file type, size and text length.
+    Each key keeps its last `window` samples; quantiles of those drive per-file progress,
+    batch ETAs and longest-first scheduling. Samples can be exported and persisted across restarts.
+    """
+
+    def __init__(self, window: Optional[int] = None, path: Optional[str] = None):
+        self.window = window or int(os.getenv("LATENCY_WINDOW", "200"))
+        self.path = path if path is not None else os.getenv("LATENCY_STATS_FILE", os.path.join("cache", "latency_stats.json"))
+        # Seconds between background saves (0 = only at shutdown)
+        self.save_interval = float(os.getenv("LATENCY_SAVE_INTERVAL", "300"))
+        self._samples: Dict[str, Dict[str, Deque[float]]] = {phase: {} for phase in PHASES}
+        # Samples recorded since the last save
+        self._unsaved = 0
+        self._task: Optional[asyncio.Task] = None
+        if self.path:
+            self.load()
+
+    def record(self, phase: str, key: str, seconds: float):
+        samples = self._samples[phase]
+        for sample_key in (key, POOLED):
+            window = samples.get(sample_key)
+            if window is None:
+                window = samples[sample_key] = deque(maxlen=self.window)
+            window.append(seconds)
+        self._unsaved += 1
+
+    def quantile(self, phase: str, key: Optional[str] = None, q: float = 0.5) -> float:
+        """Quantile for the key, falling back to the whole phase and then to a default"""
+        samples = self._samples[phase]
+        window = samples.get(key) if key else None
+        if window is None or len(window) < MIN_SAMPLES:
+            window = samples.get(POOLED)
+        if not window:
+            return DEFAULT_SECONDS[phase]
+        return quantile(sorted(window), q)
+
+    def expected(
+        self,
+        extension: Optional[str] = None,
+        size_bytes: int = 0,
+        text_length: Optional[int] = None,
+        q: float = 0.5
+    ) -> Dict[str, float]:
+        """Expected seconds per phase for one file; phase-wide figures stand in for whatever is not known yet"""
+        file_key = extraction_key(extension, size_bytes) if extension else None
+        text_key = length_key(text_length) if text_length is not None else None
+        return {
+            "extraction": self.quantile("extraction", file_key, q),
+            "llm": self.quantile("llm", text_key, q),
+            "parse": self.quantile("parse", text_key, q)
+        }
+
+    def snapshot(self) -> Dict[str, Dict[str, Dict[str, float]]]:
+        """Sample count, mean and p50/p90/p99 for every phase and key"""
+        export = {}
+        for phase, samples in self._samples.items():
+            export[phase] = {}
+            for key, window in samples.items():
+                values = sorted(window)
+                if not values:
+                    continue
+                export[phase][key] = {
+                    "count": len(values),
+                    "mean": round(sum(values) / len(values), 3),
+                    "p50": round(quantile(values, 0.5), 3),
+                    "p90": round(quantile(values, 0.9), 3),
+                    "p99": round(quantile(values, 0.99), 3)
+                }
+        return export
+
+    def load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                stored = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError):
+            logger.warning("Ignoring unreadable latency statistics in %s", self.path)
+            return
+        for phase, samples in stored.items():
+            if phase not in self._samples or not isinstance(samples, dict):
+                continue
+            for key, values in samples.items():
+                self._samples[phase][key] = deque(
+                    (float(value) for value in values if isinstance(value, (int, float))), maxlen=self.window
+                )
+
+    def export(self) -> Dict[str, Dict[str, List[float]]]:
+        """Raw sample windows (a copy, so it can be written from another thread)"""
+        return {
+            phase: {key: [round(value, 4) for value in window] for key, window in samples.items()}
+            for phase, samples in self._samples.items()
+        }
+
+    def save(self):
+        """Write the raw sample windows atomically so a restart keeps its estimates"""
+        if self.path:
+            self._write(self.export())
+            self._unsaved = 0
+
+    def _write(self, data: Dict[str, Dict[str, List[float]]]):
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        # Every worker process saves to the same path, so each writes its own temporary file
+        descriptor, temporary = tempfile.mkstemp(dir=directory, prefix=f"{os.path.basename(self.path)}.", suffix=".tmp")
+        try:
+            with os.fdopen(descriptor, "w", encoding="utf-8") as f:
+                json.dump(data, f)
+            os.replace(temporary, self.path)
+        except BaseException:
+            try:
+                os.remove(temporary)
+            except FileNotFoundError:
+                pass
+            raise
+
+    def start(self):
+        """Save periodically in the background, so a crash loses at most one interval of samples"""
+        if self._task is None and self.path and self.save_interval > 0:
+            self._task = asyncio.create_task(self._save_forever())
+
+    async def stop(self):
+        """Stop background saving and save a final time"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self.save()
+
+    async def _save_forever(self):
+        while True:
+            await asyncio.sleep(self.save_interval)
+            if not self._unsaved:
+                continue
+            # Copy the windows on the event loop (where they are updated), write them in a thread
+            data = self.export()
+            self._unsaved = 0
+            try:
+                await asyncio.to_thread(self._write, data)
+            except Exception:
+                logger.exception("Failed to save latency statistics to %s", self.path)
+
+
+class BatchTracker:
+    """
+    Expected remaining time of one batch run with a fixed number of workers. Files are
+    registered with their expected duration; the ETA is the makespan of scheduling what
+    is left longest-first onto the workers, after the files in flight finish.
+    """
+
+    def __init__(self, concurrency: int):
+        self.concurrency = max(1, concurrency)
+        self._expected: Dict[int, float] = {}
+        self._started: Dict[int, float] = {}
+
+    def add(self, key: int, expected: float):
+        self._expected[key] = expected
+
+    def start(self, key: int):
+        self._started[key] = time.monotonic()
+
+    def finish(self, key: int):
+        self._expected.pop(key, None)
+        self._started.pop(key, None)
+
+    def eta(self) -> float:
+        now = time.monotonic()
+        running = [
+            max(0.0, self._expected[key] - (now - started))
+            for key, started in self._started.items() if key in self._expected
+        ]
+        queued = sorted((expected for key, expected in self._expected.items() if key not in self._started), reverse=True)
+        workers = sorted(running)[-self.concurrency:]
+        workers += [0.0] * (self.concurrency - len(workers))
+        heapq.heapify(workers)
+        for expected in queued:
+            heapq.heappush(workers, heapq.heappop(workers) + expected)
+        return round(max(workers), 1)
+
+
+def longest_first(expected: Iterable[float]) -> List[int]:
+    """Indices ordered by descending expected duration, so long files don't start last and stretch the batch"""
+    durations = list(expected)
+    return sorted(range(len(durations)), key=lambda index: durations[index], reverse=True)
+
+
+_latency_stats: Optional[LatencyStats] = None
+
+def get_latency_stats() -> LatencyStats:
+    """Return the process-wide latency statistics"""
+    global _latency_stats
+    if _latency_stats is None:
+        _latency_stats = LatencyStats()
+    return _latency_stats
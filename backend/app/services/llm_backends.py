@@ -0,0 +1,260 @@
+import os
+import re
+import json
+import math
+import random
+import asyncio
+import hashlib
+import httpx
+from abc import ABC, abstractmethod
+from openai import AsyncOpenAI
+from typing import Dict, NamedTuple, Optional
+from app.services.text_compactor import estimate_tokens
+
+# Process-wide async HTTP client shared by every LLMService instance so that
+# connections to the LLM provider are pooled and kept alive across requests
+_http_client: Optional[httpx.AsyncClient] = None
+
+def get_http_client() -> httpx.AsyncClient:
+    """Return the shared pooled async HTTP client, creating it on first use"""
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        limits = httpx.Limits(
+            max_connections=int(os.getenv("LLM_MAX_CONNECTIONS", "20")),
+            max_keepalive_connections=int(os.getenv("LLM_MAX_KEEPALIVE_CONNECTIONS", "10")),
+            keepalive_expiry=float(os.getenv("LLM_KEEPALIVE_EXPIRY", "30"))
+        )
+        # No proxy configuration is passed to avoid conflicts with the OpenAI client
+        _http_client = httpx.AsyncClient(
+            timeout=float(os.getenv("LLM_TIMEOUT", "60")),
+            limits=limits
+        )
+    return _http_client
+
+async def close_http_client():
+    """Close the shared HTTP client (called on application shutdown)"""
+    global _http_client
+    if _http_client is not None and not _http_client.is_closed:
+        await _http_client.aclose()
+    _http_client = None
+
+
+class Completion(NamedTuple):
+    """Message content of a chat completion and its token usage (None if unknown)"""
+    content: str
+    prompt_tokens: Optional[int] = None
+    completion_tokens: Optional[int] = None
+
+    @property
+    def total_tokens(self) -> Optional[int]:
+        if self.prompt_tokens is None or self.completion_tokens is None:
+            return None
+        return self.prompt_tokens + self.completion_tokens
+
+
+class LLMBackend(ABC):
+    """
+    Executes one chat completion request body. Rate limiting and retries are applied by LLMService.
+    """
+
+    name = "base"
+
+    @abstractmethod
+    async def complete(self, body: Dict) -> Completion:
+        """Send one chat completion request body and return the reply with its token usage"""
+
+
+class OpenAIBackend(LLMBackend):
+    """OpenAI chat completions over the shared pooled HTTP client"""
+
+    name = "openai"
+
+    def __init__(self):
+        api_key = os.getenv("OPENAI_API_KEY")
+        if not api_key or api_key == "your_openai_api_key_here":
+            raise ValueError(
+                "OPENAI_API_KEY environment variable is not set. "
+                "Please set it in the backend/.env file"
+            )
+
+        # Initialize async OpenAI client
+        # Use the shared pooled httpx client so concurrent analyses reuse connections
+        # and never block the event loop. Retries are handled by call_with_retries
+        # (shared rate limiter, Retry-After aware), so the SDK's own retries are disabled.
+        try:
+            self.client = AsyncOpenAI(
+                api_key=api_key,
+                http_client=get_http_client(),
+                max_retries=0
+            )
+        except (TypeError, AttributeError) as e:
+            # If http_client parameter doesn't work with this OpenAI version, try without it
+            # This handles different versions of the OpenAI library
+            try:
+                self.client = AsyncOpenAI(api_key=api_key, max_retries=0)
+            except Exception as init_error:
+                raise ValueError(
+                    f"Failed to initialize OpenAI client: {str(init_error)}. "
+                    "Please check your OpenAI API key and library version. "
+                    f"Original error: {str(e)}"
+                )
+        except Exception as e:
+            raise ValueError(
+                f"Failed to initialize OpenAI client: {str(e)}. "
+                "Please check your OpenAI API key and library version."
+            )
+
+    async def complete(self, body: Dict) -> Completion:
+        response = await self.client.chat.completions.create(**body)
+        usage = getattr(response, "usage", None)
+        return Completion(
+            response.choices[0].message.content,
+            getattr(usage, "prompt_tokens", None),
+            getattr(usage, "completion_tokens", None)
+        )
+
+
+class StubBackendError(Exception):
+    """Simulated provider error; status_code makes it look retryable (429/503) to the retry logic"""
+
+    def __init__(self, message: str, status_code: int, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.status_code = status_code
+        headers = {"retry-after": str(retry_after)} if retry_after is not None else {}
+        self.response = httpx.Response(status_code, headers=headers)
+
+
+SKILL_LINE_PATTERN = re.compile(r"^- (.+) \((required|expected|nice to have)\)$", re.M)
+ROLE_PATTERN = re.compile(r"^ROLE (\d+):$", re.M)
+CV_MARKER = "CV CONTENT:\n"
+
+
+class StubBackend(LLMBackend):
+    """
+    Local deterministic stand-in for load testing without provider spend. Responses are
+    schema-valid analyses derived from the prompt itself (skills listed in the requirements
+    are looked up in the CV), identical for identical prompts. Latency follows a configurable
+    distribution and a configurable share of calls fail with 503s, 429s or invalid JSON.
+    """
+
+    name = "stub"
+
+    def __init__(
+        self,
+        distribution: Optional[str] = None,
+        median: Optional[float] = None,
+        spread: Optional[float] = None,
+        error_rate: Optional[float] = None,
+        rate_limit_rate: Optional[float] = None,
+        invalid_json_rate: Optional[float] = None,
+        seed: Optional[int] = None
+    ):
+        # Latency: 'fixed' (median), 'uniform' (median +/- spread*median) or 'lognormal' (sigma = spread)
+        self.distribution = (distribution or os.getenv("LLM_STUB_LATENCY_DISTRIBUTION", "lognormal")).lower()
+        if self.distribution not in ("fixed", "uniform", "lognormal"):
+            raise ValueError(f"Unsupported LLM_STUB_LATENCY_DISTRIBUTION: {self.distribution}. Supported: fixed, uniform, lognormal")
+        self.median = median if median is not None else float(os.getenv("LLM_STUB_LATENCY_MEDIAN", "1.5"))
+        self.spread = spread if spread is not None else float(os.getenv("LLM_STUB_LATENCY_SPREAD", "0.5"))
+        self.error_rate = error_rate if error_rate is not None else float(os.getenv("LLM_STUB_ERROR_RATE", "0"))
+        self.rate_limit_rate = rate_limit_rate if rate_limit_rate is not None else float(os.getenv("LLM_STUB_RATE_LIMIT_RATE", "0"))
+        self.invalid_json_rate = invalid_json_rate if invalid_json_rate is not None else float(os.getenv("LLM_STUB_INVALID_JSON_RATE", "0"))
+        seed = seed if seed is not None else os.getenv("LLM_STUB_SEED") or None
+        self.random = random.Random(int(seed) if seed is not None else None)
+        self.calls = 0
+        # Simulated latency served so far (total and longest single call)
+        self.latency_total = 0.0
+        self.latency_max = 0.0
+
+    def latency(self) -> float:
+        if self.distribution == "fixed":
+            return self.median
+        if self.distribution == "uniform":
+            return max(0.0, self.random.uniform(self.median * (1 - self.spread), self.median * (1 + self.spread)))
+        return self.median * math.exp(self.random.gauss(0, self.spread))
+
+    async def complete(self, body: Dict) -> Completion:
+        self.calls += 1
+        latency = self.latency()
+        self.latency_total += latency
+        self.latency_max = max(self.latency_max, latency)
+        await asyncio.sleep(latency)
+        draw = self.random.random()
+        if draw < self.rate_limit_rate:
+            raise StubBackendError("Stub rate limit exceeded", 429, retry_after=1)
+        if draw < self.rate_limit_rate + self.error_rate:
+            raise StubBackendError("Stub server error", 503)
+
+        user = next((message["content"] for message in body["messages"] if message["role"] == "user"), "")
+        if draw < self.rate_limit_rate + self.error_rate + self.invalid_json_rate:
+            content = "Sorry, I cannot produce JSON for this CV."
+        else:
+            content = json.dumps(self.respond(user))
+        prompt_tokens = sum(estimate_tokens(message["content"]) for message in body["messages"])
+        return Completion(content, prompt_tokens, estimate_tokens(content))
+
+    def respond(self, user: str) -> Dict:
+        """The analysis (or {"analyses": [...]} for multi-role prompts) for a user message"""
+        head, _, cv_text = user.partition(CV_MARKER)
+        roles = ROLE_PATTERN.split(head)
+        if len(roles) > 1:
+            # [preamble, number, text, number, text, ...]
+            analyses = []
+            for number, text in zip(roles[1::2], roles[2::2]):
+                analysis = self.analysis(text, cv_text)
+                analysis["role"] = int(number)
+                analyses.append(analysis)
+            return {"analyses": analyses}
+        return self.analysis(head, cv_text)
+
+    @staticmethod
+    def analysis(requirements: str, cv_text: str) -> Dict:
+        lowered = cv_text.lower()
+        skills = SKILL_LINE_PATTERN.findall(requirements)
+        breakdown = []
+        missing = []
+        for skill, importance in skills:
+            found = skill.lower() in lowered
+            if not found and importance == "required":
+                missing.append(skill)
+            breakdown.append({
+                "skill_name": skill,
+                "match_percentage": 80.0 if found else 0.0,
+                "level": "proficient" if found else "missing",
+                "relevance": {"required": "high", "expected": "medium"}.get(importance, "low")
+            })
+        matched = sum(1 for item in breakdown if item["level"] != "missing")
+        skills_match = round(100.0 * matched / len(breakdown), 1) if breakdown else 50.0
+        # Stable per (requirements, CV) jitter so otherwise equal CVs still rank deterministically
+        digest = hashlib.sha256((requirements + "\0" + cv_text).encode("utf-8")).digest()
+        jitter = digest[0] % 11 - 5
+        overall = max(0.0, min(100.0, skills_match + jitter))
+        return {
+            "match_percentage": overall,
+            "skills_match": skills_match,
+            "experience_match": 40 + digest[1] % 50,
+            "education_match": 40 + digest[2] % 50,
+            "overall_match": overall,
+            "technical_skills_score": skills_match,
+            "soft_skills_score": 40 + digest[3] % 50,
+            "leadership_score": 30 + digest[4] % 60,
+            "communication_score": 40 + digest[5] % 50,
+            "summary": f"Stub analysis: {matched} of {len(breakdown)} listed skills found in the CV.",
+            "strengths": [f"Mentions {item['skill_name']}" for item in breakdown if item["level"] != "missing"][:3],
+            "weaknesses": [f"No mention of {skill}" for skill in missing][:3],
+            "years_of_experience": digest[6] % 15,
+            "education_level": None,
+            "certifications": [],
+            "languages": [],
+            "skill_breakdown": breakdown,
+            "required_skills_missing": missing
+        }
+
+
+def create_backend(name: Optional[str] = None) -> LLMBackend:
+    """Backend selected by LLM_BACKEND ('openai' or 'stub')"""
+    name = (name or os.getenv("LLM_BACKEND", "openai")).lower()
+    if name == "openai":
+        return OpenAIBackend()
+    if name == "stub":
+        return StubBackend()
+    raise ValueError(f"Unsupported LLM_BACKEND: {name}. Supported backends: openai, stub")
@@ -1,207 +1,252 @@
 import os
-from openai import OpenAI
-from typing import Dict, List
+import time
+import asyncio
+from typing import Dict, List, Optional, Union
 import json
 from dotenv import load_dotenv
+from app.services.rate_limiter import get_rate_limiter, call_with_retries
+from app.services.text_compactor import estimate_tokens
+from app.services.prompt_builder import PromptBuilder, CompiledRequirements
+from app.services.llm_backends import Completion, LLMBackend, create_backend
+from app.services.metrics import get_metrics
 
 # Load environment variables from .env file
 load_dotenv()
 
+# Summary used when the LLM response could not be parsed; such results are never cached
+PARSE_ERROR_SUMMARY = "Error parsing LLM response. Manual review recommended."
+
+# Roles scored together in one multi-role prompt (bounded so the response fits in max_tokens)
+MULTI_ROLE_BATCH_SIZE = max(1, int(os.getenv("LLM_MULTI_ROLE_BATCH_SIZE", "4")))
+
+def fallback_analysis() -> Dict:
+    """Neutral analysis returned when the LLM response could not be parsed"""
+    return {
+        "match_percentage": 50,
+        "skills_match": 50,
+        "experience_match": 50,
+        "education_match": 50,
+        "overall_match": 50,
+        "technical_skills_score": 50,
+        "soft_skills_score": 50,
+        "leadership_score": 50,
+        "communication_score": 50,
+        "summary": PARSE_ERROR_SUMMARY,
+        "strengths": [],
+        "weaknesses": ["Could not complete automated analysis"],
+        "skill_breakdown": [],
+        "required_skills_missing": [],
+        "years_of_experience": None,
+        "education_level": None,
+        "certifications": [],
+        "languages": []
+    }
+
 class LLMService:
     """Service for interacting with LLM for CV analysis"""
     
-    def __init__(self):
-        api_key = os.getenv("OPENAI_API_KEY")
-        if not api_key or api_key == "your_openai_api_key_here":
-            raise ValueError(
-                "OPENAI_API_KEY environment variable is not set. "
-                "Please set it in the backend/.env file"
-            )
-        
-        # Initialize OpenAI client
-        # Use explicit httpx client configuration to avoid proxy issues
-        try:
-            import httpx
-            # Create httpx client with timeout but no proxy configuration
-            # Don't pass proxies parameter at all to avoid conflicts
-            http_client = httpx.Client(timeout=60.0)
-            
-            # Initialize OpenAI with custom http_client
-            # This ensures we have full control over the HTTP client configuration
-            self.client = OpenAI(
-                api_key=api_key,
-                http_client=http_client
-            )
-        except (TypeError, AttributeError) as e:
-            # If http_client parameter doesn't work with this OpenAI version, try without it
-            # This handles different versions of the OpenAI library
-            try:
-                self.client = OpenAI(api_key=api_key)
-            except Exception as init_error:
-                raise ValueError(
-                    f"Failed to initialize OpenAI client: {str(init_error)}. "
-                    "Please check your OpenAI API key and library version. "
-                    f"Original error: {str(e)}"
-                )
-        except Exception as e:
-            raise ValueError(
-                f"Failed to initialize OpenAI client: {str(e)}. "
-                "Please check your OpenAI API key and library version."
-            )
+    def __init__(self, backend: Optional[LLMBackend] = None):
+        # OpenAI by default; LLM_BACKEND=stub answers locally (no API key needed) for load testing
+        self.backend = backend or create_backend()
         
         self.model = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
+        self.rate_limiter = get_rate_limiter()
+        self.prompts = PromptBuilder()
+        self.metrics = get_metrics()
     
     async def analyze_cv_match(
         self, 
         cv_text: str, 
-        requirements: str
+        requirements: Union[str, CompiledRequirements]
     ) -> Dict:
         """
         Analyze CV against requirements using LLM with granular skill-based analysis
+        requirements: raw text, or requirements already compiled once for the whole batch
         Returns a dictionary with detailed match scores and analysis
         """
-        prompt = f"""
-You are an expert HR recruiter analyzing a CV against job requirements. Provide a comprehensive, granular analysis.
-
-JOB REQUIREMENTS:
-{requirements}
-
-CV CONTENT:
-{cv_text}
-
-Analyze this CV and provide a detailed match assessment. Return your response as a JSON object with the following structure:
-{{
-    "match_percentage": <0-100>,
-    "skills_match": <0-100>,
-    "experience_match": <0-100>,
-    "education_match": <0-100>,
-    "overall_match": <0-100>,
-    "technical_skills_score": <0-100>,
-    "soft_skills_score": <0-100>,
-    "leadership_score": <0-100>,
-    "communication_score": <0-100>,
-    "summary": "<brief 2-3 sentence summary>",
-    "strengths": ["strength1", "strength2", "strength3"],
-    "weaknesses": ["weakness1", "weakness2"],
-    "years_of_experience": <number or null>,
-    "education_level": "<degree level or null>",
-    "certifications": ["cert1", "cert2"],
-    "languages": ["language1", "language2"],
-    "skill_breakdown": [
-        {{
-            "skill_name": "<skill name>",
-            "match_percentage": <0-100>,
-            "level": "<expert|proficient|intermediate|beginner|missing>",
-            "relevance": "<high|medium|low>"
-        }}
-    ],
-    "required_skills_missing": ["skill1", "skill2"]
-}}
-
-Analysis Guidelines:
-1. Extract ALL skills mentioned in requirements and assess each individually
-2. For each skill, determine the candidate's proficiency level
-3. Calculate match percentage based on skill overlap and proficiency
-4. Identify missing critical skills
-5. Assess years of experience from CV content
-6. Extract education level, certifications, and languages
-7. Evaluate technical skills (programming, tools, technologies)
-8. Evaluate soft skills (communication, teamwork, leadership)
-9. Be precise and granular in your assessment
-
-Return ONLY the JSON object, no additional text or markdown.
-"""
+        messages = self.prompts.single(cv_text, requirements)
         
         try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": "You are an expert HR recruiter specializing in technical recruitment. Always respond with valid JSON only. Be thorough and granular in your skill analysis."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.3,
-                max_tokens=2000,
-                response_format={"type": "json_object"}
-            )
-            
-            content = response.choices[0].message.content.strip()
-            
-            # Remove markdown code blocks if present
-            if content.startswith("```"):
-                content = content.split("```")[1]
-                if content.startswith("json"):
-                    content = content[4:]
-                content = content.strip()
-            
-            result = json.loads(content)
-            
-            # Validate and ensure all required fields with defaults
-            defaults = {
-                "match_percentage": 0,
-                "skills_match": 0,
-                "experience_match": 0,
-                "education_match": 0,
-                "overall_match": 0,
-                "technical_skills_score": 0,
-                "soft_skills_score": 0,
-                "leadership_score": 0,
-                "communication_score": 0,
-                "summary": "No summary available",
-                "strengths": [],
-                "weaknesses": [],
-                "skill_breakdown": [],
-                "required_skills_missing": [],
-                "years_of_experience": None,
-                "education_level": None,
-                "certifications": [],
-                "languages": []
-            }
-            
-            # Apply defaults for missing fields
-            for key, default_value in defaults.items():
-                if key not in result:
-                    result[key] = default_value
-            
-            # Ensure skill_breakdown is a list of proper dictionaries
-            if not isinstance(result.get("skill_breakdown"), list):
-                result["skill_breakdown"] = []
-            
-            # Validate skill_breakdown items
-            validated_skills = []
-            for skill in result["skill_breakdown"]:
-                if isinstance(skill, dict):
-                    validated_skills.append({
-                        "skill_name": skill.get("skill_name", "Unknown"),
-                        "match_percentage": float(skill.get("match_percentage", 0)),
-                        "level": skill.get("level", "missing"),
-                        "relevance": skill.get("relevance", "low")
-                    })
-            result["skill_breakdown"] = validated_skills
-            
-            return result
-            
-        except json.JSONDecodeError as e:
-            # Fallback if JSON parsing fails
-            return {
-                "match_percentage": 50,
-                "skills_match": 50,
-                "experience_match": 50,
-                "education_match": 50,
-                "overall_match": 50,
-                "technical_skills_score": 50,
-                "soft_skills_score": 50,
-                "leadership_score": 50,
-                "communication_score": 50,
-                "summary": "Error parsing LLM response. Manual review recommended.",
-                "strengths": [],
-                "weaknesses": ["Could not complete automated analysis"],
-                "skill_breakdown": [],
-                "required_skills_missing": [],
-                "years_of_experience": None,
-                "education_level": None,
-                "certifications": [],
-                "languages": []
-            }
+            content = await self._complete(messages, max_tokens=2000)
         except Exception as e:
             raise Exception(f"Error calling LLM service: {str(e)}")
-
+        return self.parse_analysis(content)
+    
+    async def analyze_cv_match_multi(
+        self,
+        cv_text: str,
+        requirements_list: List[Union[str, CompiledRequirements]]
+    ) -> List[Dict]:
+        """
+        Analyze one CV against several requirement sets, sending the CV text once per group of
+        MULTI_ROLE_BATCH_SIZE roles instead of once per role. The roles come before the CV, so
+        the same group's prompts for different CVs share a prefix for provider prompt caching.
+        Returns one analysis per requirement set, in order.
+        """
+        groups = [
+            requirements_list[i:i + MULTI_ROLE_BATCH_SIZE]
+            for i in range(0, len(requirements_list), MULTI_ROLE_BATCH_SIZE)
+        ]
+        grouped = await asyncio.gather(*[self._analyze_role_group(cv_text, group) for group in groups])
+        return [analysis for group in grouped for analysis in group]
+    
+    async def _analyze_role_group(self, cv_text: str, requirements_list: List[Union[str, CompiledRequirements]]) -> List[Dict]:
+        if len(requirements_list) == 1:
+            return [await self.analyze_cv_match(cv_text, requirements_list[0])]
+        
+        messages = self.prompts.multi(cv_text, requirements_list)
+        
+        try:
+            content = await self._complete(messages, max_tokens=2000 * len(requirements_list))
+            parsed = json.loads(content)
+        except json.JSONDecodeError:
+            self.metrics.parse_failures.inc()
+            return [fallback_analysis() for _ in requirements_list]
+        except Exception as e:
+            raise Exception(f"Error calling LLM service: {str(e)}")
+        
+        analyses: List[Optional[Dict]] = [None] * len(requirements_list)
+        items = parsed.get("analyses") if isinstance(parsed, dict) else None
+        for index, item in enumerate(items if isinstance(items, list) else []):
+            if not isinstance(item, dict):
+                continue
+            role = str(item.pop("role", index + 1))
+            position = int(role) - 1 if role.isdigit() and 0 < int(role) <= len(analyses) else index
+            if position < len(analyses) and analyses[position] is None:
+                analyses[position] = self._normalize_analysis(item)
+        
+        # Roles the model skipped are analyzed on their own
+        missing = [index for index, analysis in enumerate(analyses) if analysis is None]
+        if missing:
+            retried = await asyncio.gather(*[
+                self.analyze_cv_match(cv_text, requirements_list[index]) for index in missing
+            ])
+            for index, analysis in zip(missing, retried):
+                analyses[index] = analysis
+        return analyses
+    
+    def request_body(self, messages: List[Dict[str, str]], max_tokens: int) -> Dict:
+        """Chat completion parameters for one analysis (also the body of a provider batch request)"""
+        return {
+            "model": self.model,
+            "messages": messages,
+            "temperature": 0.3,
+            "max_tokens": max_tokens,
+            "response_format": {"type": "json_object"}
+        }
+    
+    def batch_request(self, custom_id: str, cv_text: str, requirements: Union[str, CompiledRequirements]) -> Dict:
+        """One line of a provider batch input file analyzing a CV against one requirement set"""
+        return {
+            "custom_id": custom_id,
+            "method": "POST",
+            "url": "/v1/chat/completions",
+            "body": self.request_body(self.prompts.single(cv_text, requirements), 2000)
+        }
+    
+    async def complete_request(self, body: Dict) -> str:
+        """Run a serialized request body (as written to batch files) as an interactive call"""
+        return await self._complete(body["messages"], body.get("max_tokens", 2000))
+    
+    async def _complete(self, messages: List[Dict[str, str]], max_tokens: int) -> str:
+        """
+        Run one JSON-mode chat completion and return the message content. The call waits for
+        the shared rate limiter, reserving the estimated prompt tokens plus max_tokens, and
+        rate-limit, server and connection errors are retried with backoff.
+        """
+        reserved = sum(estimate_tokens(message["content"]) for message in messages) + max_tokens
+        body = self.request_body(messages, max_tokens)
+        completion = await call_with_retries(
+            lambda: self._call_backend(body),
+            self.rate_limiter,
+            tokens=reserved
+        )
+        self.rate_limiter.record_usage(reserved, completion.total_tokens)
+        if completion.prompt_tokens is not None:
+            self.metrics.prompt_tokens.observe(completion.prompt_tokens)
+        if completion.completion_tokens is not None:
+            self.metrics.completion_tokens.observe(completion.completion_tokens)
+        
+        return self.strip_markdown(completion.content)
+    
+    async def _call_backend(self, body: Dict) -> Completion:
+        """One provider call, timed per attempt"""
+        start = time.perf_counter()
+        try:
+            completion = await self.backend.complete(body)
+        except Exception:
+            self.metrics.llm_request_seconds.observe(time.perf_counter() - start, outcome="error")
+            raise
+        self.metrics.llm_request_seconds.observe(time.perf_counter() - start, outcome="ok")
+        return completion
+    
+    @staticmethod
+    def strip_markdown(content: str) -> str:
+        """Remove markdown code blocks around a JSON response if present"""
+        content = content.strip()
+        if content.startswith("```"):
+            content = content.split("```")[1]
+            if content.startswith("json"):
+                content = content[4:]
+            content = content.strip()
+        return content
+    
+    @classmethod
+    def parse_analysis(cls, content: str) -> Dict:
+        """Analysis from a response's message content (the neutral fallback if it is not a JSON object)"""
+        try:
+            parsed = json.loads(cls.strip_markdown(content))
+            if not isinstance(parsed, dict):
+                raise ValueError(f"Expected a JSON object, got {type(parsed).__name__}")
+            return cls._normalize_analysis(parsed)
+        except (TypeError, ValueError):
+            # Covers json.JSONDecodeError, and fields of the wrong type in an otherwise valid reply
+            get_metrics().parse_failures.inc()
+            return fallback_analysis()
+    
+    @staticmethod
+    def _normalize_analysis(result: Dict) -> Dict:
+        """Fill in missing fields with defaults and validate the skill breakdown"""
+        defaults = {
+            "match_percentage": 0,
+            "skills_match": 0,
+            "experience_match": 0,
+            "education_match": 0,
+            "overall_match": 0,
+            "technical_skills_score": 0,
+            "soft_skills_score": 0,
+            "leadership_score": 0,
+            "communication_score": 0,
+            "summary": "No summary available",
+            "strengths": [],
+            "weaknesses": [],
+            "skill_breakdown": [],
+            "required_skills_missing": [],
+            "years_of_experience": None,
+            "education_level": None,
+            "certifications": [],
+            "languages": []
+        }
+        
+        # Apply defaults for missing fields
+        for key, default_value in defaults.items():
+            if key not in result:
+                result[key] = default_value
+        
+        # Ensure skill_breakdown is a list of proper dictionaries
+        if not isinstance(result.get("skill_breakdown"), list):
+            result["skill_breakdown"] = []
+        
+        # Validate skill_breakdown items
+        validated_skills = []
+        for skill in result["skill_breakdown"]:
+            if isinstance(skill, dict):
+                validated_skills.append({
+                    "skill_name": skill.get("skill_name", "Unknown"),
+                    "match_percentage": float(skill.get("match_percentage", 0)),
+                    "level": skill.get("level", "missing"),
+                    "relevance": skill.get("relevance", "low")
+                })
+        result["skill_breakdown"] = validated_skills
+        
+        return result
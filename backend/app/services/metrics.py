@@ -0,0 +1,222 @@
+import bisect
+import math
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Content type of the Prometheus text exposition format served by /metrics
+CONTENT_TYPE = "text/plain; version=0.0.4"
+
+SECONDS_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300)
+TOKEN_BUCKETS = (100, 250, 500, 1000, 2000, 4000, 8000, 16000, 32000, 64000)
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if value == -math.inf:
+        return "-Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(str(value))}"' for name, value in labels.items()) + "}"
+
+
+class Metric:
+    """
+    One metric family with optional labels. Values live in plain dicts keyed by the label
+    values and are only updated from the event loop, so recording costs a dict lookup.
+    """
+
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        if not self.labelnames:
+            # Unlabelled series are exported (as zero) before their first update
+            self._values[()] = 0
+
+    def _key(self, labels: Dict[str, object]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def _labels(self, key: Tuple[str, ...]) -> Dict[str, str]:
+        return dict(zip(self.labelnames, key))
+
+    def samples(self) -> Iterable[Tuple[str, Dict[str, str], float]]:
+        for key, value in self._values.items():
+            yield self.name, self._labels(key), value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for name, labels, value in self.samples():
+            lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        return lines
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (), buckets: Tuple[float, ...] = SECONDS_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: [count per bucket (+Inf last)..., sum]
+        self._series: Dict[Tuple[str, ...], List[float]] = {}
+        if not self.labelnames:
+            self._series[()] = [0] * (len(self.buckets) + 2)
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        series = self._series.get(key)
+        if series is None:
+            series = self._series[key] = [0] * (len(self.buckets) + 2)
+        series[bisect.bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def samples(self) -> Iterable[Tuple[str, Dict[str, str], float]]:
+        for key, series in self._series.items():
+            labels = self._labels(key)
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), series[:-1]):
+                cumulative += count
+                yield f"{self.name}_bucket", {**labels, "le": _format_value(bound)}, cumulative
+            yield f"{self.name}_sum", labels, series[-1]
+            yield f"{self.name}_count", labels, cumulative
+
+
+class PipelineMetrics:
+    """
+    Process-wide instrumentation of the screening pipeline, fed by hooks in FileProcessor,
+    LLMService and CVMatcher. State owned by other components (caches, stored files, job
+    queue, rate limiter) is read at scrape time and passed to render().
+    """
+
+    def __init__(self):
+        self.extraction_seconds = Histogram(
+            "cvfilter_extraction_seconds", "Time to parse a document into text", ("format",)
+        )
+        self.extraction_failures = Counter(
+            "cvfilter_extraction_failures_total", "Documents whose text could not be extracted", ("format",)
+        )
+        self.llm_request_seconds = Histogram(
+            "cvfilter_llm_request_seconds", "Duration of one LLM provider call (each retry counted separately)", ("outcome",)
+        )
+        self.analysis_seconds = Histogram(
+            "cvfilter_analysis_seconds", "Time for the LLM analysis of one CV, including rate-limit waits and retries"
+        )
+        self.result_seconds = Histogram(
+            "cvfilter_result_seconds", "Time to turn an analysis into a scored result (validation and skill check)"
+        )
+        self.prompt_tokens = Histogram(
+            "cvfilter_llm_prompt_tokens", "Prompt tokens per LLM request", buckets=TOKEN_BUCKETS
+        )
+        self.completion_tokens = Histogram(
+            "cvfilter_llm_completion_tokens", "Completion tokens per LLM request", buckets=TOKEN_BUCKETS
+        )
+        self.parse_failures = Counter(
+            "cvfilter_llm_parse_failures_total", "LLM responses that were not valid JSON"
+        )
+        self.files_in_flight = Gauge(
+            "cvfilter_files_in_flight", "CVs currently being extracted or analyzed"
+        )
+        self.files_queued = Gauge(
+            "cvfilter_files_queued", "CVs of running batches waiting for a concurrency slot"
+        )
+        self.metrics: List[Metric] = [
+            self.extraction_seconds,
+            self.extraction_failures,
+            self.llm_request_seconds,
+            self.analysis_seconds,
+            self.result_seconds,
+            self.prompt_tokens,
+            self.completion_tokens,
+            self.parse_failures,
+            self.files_in_flight,
+            self.files_queued
+        ]
+
+    def render(self, state: Iterable[Metric] = ()) -> str:
+        lines = []
+        for metric in list(self.metrics) + list(state):
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+def state_metrics(
+    cache_stats: Dict[str, Optional[Dict]],
+    storage_totals: Dict[str, int],
+    job_depth: Dict[str, int],
+    limiter_stats: Dict
+) -> List[Metric]:
+    """Scrape-time metrics from the caches, file store, job queue and LLM rate limiter stats"""
+    cache_hits = Counter("cvfilter_cache_hits_total", "Cache lookups that found an entry", ("cache",))
+    cache_misses = Counter("cvfilter_cache_misses_total", "Cache lookups that found nothing", ("cache",))
+    cache_hit_ratio = Gauge("cvfilter_cache_hit_ratio", "Share of cache lookups that were hits since startup", ("cache",))
+    for cache, stats in cache_stats.items():
+        if stats is None:
+            continue
+        cache_hits.inc(stats["hits"], cache=cache)
+        cache_misses.inc(stats["misses"], cache=cache)
+        cache_hit_ratio.set(stats["hit_rate"], cache=cache)
+
+    stored_bytes = Gauge("cvfilter_stored_bytes", "Bytes of uploaded CVs stored on disk")
+    stored_bytes.set(storage_totals["bytes"])
+    stored_files = Gauge("cvfilter_stored_files", "Stored CV files (distinct uploads)")
+    stored_files.set(storage_totals["files"])
+
+    jobs = Gauge("cvfilter_jobs", "Background screening jobs by status (queue depth)", ("status",))
+    for status in ("queued", "running"):
+        jobs.set(job_depth.get(status, 0), status=status)
+    for status, count in job_depth.items():
+        jobs.set(count, status=status)
+
+    llm_waiting = Gauge("cvfilter_llm_requests_waiting", "LLM requests waiting for the rate limiter")
+    llm_waiting.set(limiter_stats["waiting"])
+    llm_retries = Counter("cvfilter_llm_retries_total", "LLM calls retried after a rate limit, server or connection error")
+    llm_retries.inc(limiter_stats["retries"])
+    llm_rate_limited = Counter("cvfilter_llm_rate_limited_total", "LLM calls rejected with 429")
+    llm_rate_limited.inc(limiter_stats["rate_limited"])
+    llm_failures = Counter("cvfilter_llm_failures_total", "LLM calls that failed after all retries")
+    llm_failures.inc(limiter_stats["failures"])
+    return [cache_hits, cache_misses, cache_hit_ratio, stored_bytes, stored_files, jobs, llm_waiting, llm_retries, llm_rate_limited, llm_failures]
+
+
+_metrics: Optional[PipelineMetrics] = None
+
+def get_metrics() -> PipelineMetrics:
+    """Return the process-wide pipeline metrics"""
+    global _metrics
+    if _metrics is None:
+        _metrics = PipelineMetrics()
+    return _metrics
@@ -0,0 +1,97 @@
+import re
+import math
+from collections import Counter
+from typing import Dict, List, Optional
+
+# Keeps tokens like "c++", "c#", ".net" and "node.js" intact
+TOKEN_PATTERN = re.compile(r"[a-z0-9+#][a-z0-9+#.\-]*")
+
+STOPWORDS = frozenset("""
+a an and are as at be but by can for from has have in into is it its of on or our that the their this
+to we will with you your who what which must should able strong good years year experience required
+requirements preferred plus etc e.g i.e including knowledge skills skill work working job role team
+""".split())
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens with stopwords and trailing punctuation removed"""
+    tokens = []
+    for token in TOKEN_PATTERN.findall(text.lower()):
+        token = token.rstrip(".-")
+        if (len(token) > 1 and token not in STOPWORDS) or token in ("c", "r"):
+            tokens.append(token)
+    return tokens
+
+
+class BM25Ranker:
+    """
+    In-process Okapi BM25 over one batch of CVs, used to rank candidates against the
+    requirements before any LLM call. Document statistics come from the batch itself.
+    """
+
+    def __init__(self, documents: List[str], k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.term_counts: List[Counter] = [Counter(tokenize(document)) for document in documents]
+        self.lengths = [sum(counts.values()) for counts in self.term_counts]
+        self.average_length = (sum(self.lengths) / len(self.lengths)) if self.lengths else 0.0
+        self.document_frequency: Counter = Counter()
+        for counts in self.term_counts:
+            self.document_frequency.update(counts.keys())
+
+    def idf(self, term: str) -> float:
+        total = len(self.term_counts)
+        frequency = self.document_frequency.get(term, 0)
+        # The +1 keeps terms that appear in every CV from scoring negative
+        return math.log(1 + (total - frequency + 0.5) / (frequency + 0.5))
+
+    def scores(self, query: str) -> List[float]:
+        """BM25 score of every document for the query (higher is more relevant)"""
+        terms = set(tokenize(query))
+        results = []
+        for counts, length in zip(self.term_counts, self.lengths):
+            score = 0.0
+            norm = self.k1 * (1 - self.b + self.b * length / self.average_length) if self.average_length else self.k1
+            for term in terms:
+                frequency = counts.get(term, 0)
+                if frequency:
+                    score += self.idf(term) * frequency * (self.k1 + 1) / (frequency + norm)
+            results.append(score)
+        return results
+
+    def coverage(self, query: str) -> List[Dict]:
+        """
+        Per document, the IDF-weighted share (0-100) of the requirement terms the CV mentions,
+        plus the matched and missing terms. Unlike raw BM25 it is bounded, so it can be shown as a score.
+        """
+        terms = sorted(set(tokenize(query)))
+        weights = {term: self.idf(term) for term in terms}
+        total_weight = sum(weights.values())
+        results = []
+        for counts in self.term_counts:
+            matched = [term for term in terms if term in counts]
+            missing = [term for term in terms if term not in counts]
+            weight = sum(weights[term] for term in matched)
+            results.append({
+                "percentage": round(100.0 * weight / total_weight, 1) if total_weight else 0.0,
+                "matched": matched,
+                "missing": sorted(missing, key=lambda term: weights[term], reverse=True)
+            })
+        return results
+
+
+def select_candidates(
+    scores: List[float],
+    percentages: List[float],
+    top_n: Optional[int] = None,
+    threshold: Optional[float] = None
+) -> List[int]:
+    """
+    Indices of the documents that go on to LLM analysis: the best top_n by BM25 score,
+    limited to those whose coverage percentage is at least threshold (either may be None)
+    """
+    ranked = sorted(range(len(scores)), key=lambda index: scores[index], reverse=True)
+    if threshold is not None:
+        ranked = [index for index in ranked if percentages[index] >= threshold]
+    if top_n is not None:
+        ranked = ranked[:max(0, top_n)]
+    return ranked
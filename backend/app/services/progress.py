@@ -0,0 +1,107 @@
+import os
+import heapq
+import asyncio
+import itertools
+from typing import AsyncIterator, Dict, List, Optional, Union
+from app.models import ProgressUpdate, CVMatchResult
+
+TERMINAL_STATUSES = ("completed", "error")
+
+class ProgressBus:
+    """
+    Push-based progress channel from CVMatcher to one SSE client.
+    Pending updates are coalesced per file (a slow consumer only sees each file's latest
+    state) and delivered at most once per min_interval; terminal updates and finished
+    results are always delivered, in order. The stream ends as soon as the bus is closed.
+    After keepalive_interval seconds without any update the stream yields an empty batch, so
+    the SSE response can send a keep-alive comment instead of a made-up progress update.
+    """
+
+    def __init__(self, min_interval: Optional[float] = None, keepalive_interval: Optional[float] = None):
+        self.min_interval = min_interval if min_interval is not None else float(os.getenv("PROGRESS_MIN_INTERVAL", "0.25"))
+        if keepalive_interval is None:
+            keepalive_interval = float(os.getenv("SSE_KEEPALIVE_INTERVAL", "15"))
+        self.keepalive_interval = keepalive_interval
+        self._pending: Dict[str, ProgressUpdate] = {}
+        self._ordered: List[Union[ProgressUpdate, CVMatchResult]] = []
+        self._changed = asyncio.Event()
+        self._closed = asyncio.Event()
+
+    def publish(self, update: ProgressUpdate):
+        """Record a state change (safe to call from synchronous callbacks on the event loop)"""
+        if update.status in TERMINAL_STATUSES:
+            # Terminal updates are never coalesced away
+            self._pending.pop(update.filename, None)
+            self._ordered.append(update)
+        else:
+            self._pending[update.filename] = update
+        self._changed.set()
+
+    def publish_result(self, result: CVMatchResult):
+        """Queue a finished CV result for delivery right after its progress updates"""
+        self._ordered.append(result)
+        self._changed.set()
+
+    def close(self):
+        self._closed.set()
+        self._changed.set()
+
+    def _drain(self) -> List[Union[ProgressUpdate, CVMatchResult]]:
+        batch = list(self._pending.values()) + self._ordered
+        self._pending = {}
+        self._ordered = []
+        self._changed.clear()
+        return batch
+
+    async def stream(self) -> AsyncIterator[List[Union[ProgressUpdate, CVMatchResult]]]:
+        """
+        Yield batches of updates and results as they happen until the bus is closed and drained
+        (an empty batch when nothing happened for keepalive_interval seconds)
+        """
+        while True:
+            if self.keepalive_interval > 0:
+                try:
+                    await asyncio.wait_for(self._changed.wait(), timeout=self.keepalive_interval)
+                except asyncio.TimeoutError:
+                    yield []
+                    continue
+            else:
+                await self._changed.wait()
+            batch = self._drain()
+            if batch:
+                yield batch
+            if self._closed.is_set():
+                if not self._pending and not self._ordered:
+                    return
+                continue
+            if self.min_interval > 0:
+                # Throttle: let updates accumulate, but wake immediately on close
+                try:
+                    await asyncio.wait_for(self._closed.wait(), timeout=self.min_interval)
+                except asyncio.TimeoutError:
+                    pass
+
+
+class TopKRanking:
+    """Keeps the K best results by match_percentage in a min-heap as results stream in"""
+
+    def __init__(self, k: int):
+        self.k = max(1, k)
+        self._heap: List[tuple] = []
+        self._sequence = itertools.count()
+
+    def add(self, result: CVMatchResult) -> bool:
+        """Offer a result; returns True if it entered the top K"""
+        # On equal scores the earlier result ranks higher, so the later one is evicted first
+        entry = (result.match_percentage, -next(self._sequence), result)
+        if len(self._heap) < self.k:
+            heapq.heappush(self._heap, entry)
+            return True
+        if entry[:2] > self._heap[0][:2]:
+            heapq.heapreplace(self._heap, entry)
+            return True
+        return False
+
+    def top(self) -> List[CVMatchResult]:
+        """Current top K, best first"""
+        return [entry[2] for entry in sorted(self._heap, key=lambda entry: entry[:2], reverse=True)]
@@ -0,0 +1,139 @@
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple, Union
+from app.services.skill_engine import SkillEngine
+from app.services.text_compactor import normalize_whitespace
+
+# Bumped whenever the prompt layout, instructions or listed key skills change, so cached analyses from older prompts are not reused
+PROMPT_VERSION = "3"
+
+SYSTEM_PROMPT = "You are an expert HR recruiter specializing in technical recruitment. Always respond with valid JSON only. Be thorough and granular in your skill analysis."
+
+ANALYSIS_SCHEMA = """{
+    "match_percentage": <0-100>,
+    "skills_match": <0-100>,
+    "experience_match": <0-100>,
+    "education_match": <0-100>,
+    "overall_match": <0-100>,
+    "technical_skills_score": <0-100>,
+    "soft_skills_score": <0-100>,
+    "leadership_score": <0-100>,
+    "communication_score": <0-100>,
+    "summary": "<brief 2-3 sentence summary>",
+    "strengths": ["strength1", "strength2", "strength3"],
+    "weaknesses": ["weakness1", "weakness2"],
+    "years_of_experience": <number or null>,
+    "education_level": "<degree level or null>",
+    "certifications": ["cert1", "cert2"],
+    "languages": ["language1", "language2"],
+    "skill_breakdown": [
+        {
+            "skill_name": "<skill name>",
+            "match_percentage": <0-100>,
+            "level": "<expert|proficient|intermediate|beginner|missing>",
+            "relevance": "<high|medium|low>"
+        }
+    ],
+    "required_skills_missing": ["skill1", "skill2"]
+}"""
+
+ANALYSIS_GUIDELINES = """Analysis Guidelines:
+1. Extract ALL skills mentioned in requirements and assess each individually
+2. For each skill, determine the candidate's proficiency level
+3. Calculate match percentage based on skill overlap and proficiency
+4. Identify missing critical skills
+5. Assess years of experience from CV content
+6. Extract education level, certifications, and languages
+7. Evaluate technical skills (programming, tools, technologies)
+8. Evaluate soft skills (communication, teamwork, leadership)
+9. Be precise and granular in your assessment"""
+
+# Everything that never changes goes in the system message, so every prompt of every batch
+# starts with the same tokens and the provider can serve that prefix from its prompt cache
+STATIC_INSTRUCTIONS = f"""{SYSTEM_PROMPT}
+
+You analyze a CV against job requirements and provide a comprehensive, granular analysis. The user message gives the job requirements (with the key skills to assess) followed by the CV.
+
+Each analysis is a JSON object with the following structure:
+{ANALYSIS_SCHEMA}
+
+{ANALYSIS_GUIDELINES}
+
+Return ONLY JSON, no additional text or markdown."""
+
+IMPORTANCE_LABELS = {1.5: "required", 1.0: "expected", 0.5: "nice to have"}
+
+
+@dataclass
+class CompiledRequirements:
+    """Requirements normalized once per batch, with the skills to assess ranked by importance"""
+    text: str
+    skills: List[Tuple[str, str]] = field(default_factory=list)
+
+    def render(self, heading: str = "JOB REQUIREMENTS") -> str:
+        block = f"{heading}:\n{self.text}"
+        if self.skills:
+            block += "\n\nKEY SKILLS TO ASSESS:\n" + "\n".join(f"- {skill} ({importance})" for skill, importance in self.skills)
+        return block
+
+
+def compile_requirements(requirements: str, engine: Optional[SkillEngine] = None) -> CompiledRequirements:
+    """Normalize requirements text and list its skills (required first), reusing a compiled skill engine if given"""
+    engine = engine or SkillEngine(requirements)
+    ranked = sorted(range(len(engine.skills)), key=lambda column: -engine.weights[column])
+    skills = [
+        (engine.skills[column], IMPORTANCE_LABELS.get(float(engine.weights[column]), "expected"))
+        for column in ranked
+    ]
+    return CompiledRequirements(normalize_whitespace(requirements), skills)
+
+
+class PromptBuilder:
+    """
+    Builds chat messages in cache-friendly order: static instructions (system message), then the
+    requirements, then the CV. Requirements are compiled once per distinct string and reused.
+    """
+
+    def __init__(self):
+        self._compiled: Dict[str, CompiledRequirements] = {}
+
+    def compile(self, requirements: Union[str, CompiledRequirements]) -> CompiledRequirements:
+        if isinstance(requirements, CompiledRequirements):
+            return requirements
+        compiled = self._compiled.get(requirements)
+        if compiled is None:
+            compiled = self._compiled[requirements] = compile_requirements(requirements)
+        return compiled
+
+    def single(self, cv_text: str, requirements: Union[str, CompiledRequirements]) -> List[Dict[str, str]]:
+        """Messages scoring one CV against one requirement set (response: one analysis object)"""
+        user = f"""{self.compile(requirements).render()}
+
+CV CONTENT:
+{cv_text}
+
+Analyze this CV against the job requirements and return the analysis object."""
+        return self._messages(user)
+
+    def multi(self, cv_text: str, requirements_list: List[Union[str, CompiledRequirements]]) -> List[Dict[str, str]]:
+        """
+        Messages scoring one CV against several requirement sets ("roles"). The roles come before the
+        CV: every CV in a batch is scored against the same roles, so the prefix is shared across files.
+        """
+        roles = "\n\n".join(
+            self.compile(requirements).render(f"ROLE {number}")
+            for number, requirements in enumerate(requirements_list, start=1)
+        )
+        user = f"""{roles}
+
+CV CONTENT:
+{cv_text}
+
+Assess the CV against each role independently. Return a JSON object of the form {{"analyses": [...]}} with exactly {len(requirements_list)} analysis objects, one per role in role order, each with an added "role" field holding the role number."""
+        return self._messages(user)
+
+    @staticmethod
+    def _messages(user: str) -> List[Dict[str, str]]:
+        return [
+            {"role": "system", "content": STATIC_INSTRUCTIONS},
+            {"role": "user", "content": user}
+        ]
@@ -0,0 +1,225 @@
+import os
+import time
+import random
+import asyncio
+import logging
+import email.utils
+from typing import Any, Awaitable, Callable, Dict, Optional, TypeVar
+import httpx
+import openai
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# HTTP statuses worth retrying: timeouts, conflicts, rate limits and server errors
+RETRYABLE_STATUSES = {408, 409, 429}
+
+class RateLimiter:
+    """
+    Client-side limiter shared by every LLM call in the process: one token bucket for
+    requests per minute and one for tokens per minute, each refilling continuously.
+    The allowed rate adapts (AIMD): it is halved whenever the provider returns a 429 and
+    recovers additively on success, so throughput converges on the real quota instead of
+    repeatedly hitting it. A Retry-After from the provider pauses all callers.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: Optional[float] = None,
+        tokens_per_minute: Optional[float] = None,
+        adaptive: Optional[bool] = None
+    ):
+        # 0 disables the corresponding bucket
+        self.requests_per_minute = requests_per_minute if requests_per_minute is not None else float(os.getenv("LLM_RPM", "500"))
+        self.tokens_per_minute = tokens_per_minute if tokens_per_minute is not None else float(os.getenv("LLM_TPM", "200000"))
+        self.adaptive = adaptive if adaptive is not None else os.getenv("LLM_ADAPTIVE_RATE", "true").lower() == "true"
+        # Fraction of the configured rate currently allowed
+        self.rate_factor = 1.0
+        self.min_rate_factor = 0.1
+        self.recovery_step = 0.05
+
+        self._requests = self.requests_per_minute
+        self._tokens = self.tokens_per_minute
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock: Optional[asyncio.Lock] = None
+
+        self.waiting = 0
+        self.requests_admitted = 0
+        self.tokens_admitted = 0
+        self.throttled_seconds = 0.0
+        self.rate_limited = 0
+        self.retries = 0
+        self.failures = 0
+
+    def _refill(self):
+        now = time.monotonic()
+        elapsed = now - self._updated
+        self._updated = now
+        if self.requests_per_minute:
+            self._requests = min(
+                self.requests_per_minute,
+                self._requests + elapsed * self.requests_per_minute * self.rate_factor / 60
+            )
+        if self.tokens_per_minute:
+            self._tokens = min(
+                self.tokens_per_minute,
+                self._tokens + elapsed * self.tokens_per_minute * self.rate_factor / 60
+            )
+
+    def _wait_time(self, tokens: float) -> float:
+        """Seconds until one request and `tokens` tokens are available (0 if available now)"""
+        wait = max(0.0, self._paused_until - time.monotonic())
+        if self.requests_per_minute and self._requests < 1:
+            wait = max(wait, (1 - self._requests) * 60 / (self.requests_per_minute * self.rate_factor))
+        if self.tokens_per_minute and self._tokens < tokens:
+            wait = max(wait, (tokens - self._tokens) * 60 / (self.tokens_per_minute * self.rate_factor))
+        return wait
+
+    async def acquire(self, tokens: float = 0):
+        """Wait (first come, first served) until a request using about `tokens` tokens is allowed"""
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        if self.tokens_per_minute:
+            # A single request larger than the whole bucket must still be able to go
+            tokens = min(tokens, self.tokens_per_minute)
+        self.waiting += 1
+        try:
+            async with self._lock:
+                while True:
+                    self._refill()
+                    wait = self._wait_time(tokens)
+                    if wait <= 0:
+                        break
+                    self.throttled_seconds += wait
+                    await asyncio.sleep(wait)
+                if self.requests_per_minute:
+                    self._requests -= 1
+                if self.tokens_per_minute:
+                    self._tokens -= tokens
+                self.requests_admitted += 1
+                self.tokens_admitted += tokens
+        finally:
+            self.waiting -= 1
+
+    def record_usage(self, reserved_tokens: float, used_tokens: Optional[float]):
+        """Settle a reservation with the token count the provider actually billed"""
+        if used_tokens is None:
+            return
+        self.tokens_admitted += used_tokens - reserved_tokens
+        if self.tokens_per_minute:
+            self._refill()
+            # May go negative, which simply delays the next callers
+            self._tokens = min(self.tokens_per_minute, self._tokens + reserved_tokens - used_tokens)
+
+    def on_success(self):
+        if self.adaptive and self.rate_factor < 1.0:
+            self.rate_factor = min(1.0, self.rate_factor + self.recovery_step)
+
+    def on_rate_limited(self, retry_after: Optional[float]):
+        self.rate_limited += 1
+        if self.adaptive:
+            self.rate_factor = max(self.min_rate_factor, self.rate_factor / 2)
+        if retry_after:
+            self._paused_until = max(self._paused_until, time.monotonic() + retry_after)
+
+    def stats(self) -> Dict[str, Any]:
+        self._refill()
+        return {
+            "requests_per_minute": self.requests_per_minute,
+            "tokens_per_minute": self.tokens_per_minute,
+            "rate_factor": round(self.rate_factor, 3),
+            "available_requests": round(self._requests, 2) if self.requests_per_minute else None,
+            "available_tokens": round(self._tokens) if self.tokens_per_minute else None,
+            "paused_for": round(max(0.0, self._paused_until - time.monotonic()), 2),
+            "waiting": self.waiting,
+            "requests_admitted": self.requests_admitted,
+            "tokens_admitted": round(self.tokens_admitted),
+            "throttled_seconds": round(self.throttled_seconds, 2),
+            "rate_limited": self.rate_limited,
+            "retries": self.retries,
+            "failures": self.failures
+        }
+
+
+def retry_after_seconds(error: Exception) -> Optional[float]:
+    """Delay requested by the provider via retry-after-ms / Retry-After (seconds or HTTP date)"""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    value = headers.get("retry-after-ms")
+    if value:
+        try:
+            return float(value) / 1000
+        except ValueError:
+            pass
+    value = headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, email.utils.parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def is_retryable(error: Exception) -> bool:
+    status = getattr(error, "status_code", None)
+    if status is not None:
+        return status in RETRYABLE_STATUSES or status >= 500
+    return isinstance(error, (openai.APIConnectionError, httpx.TransportError, asyncio.TimeoutError))
+
+
+async def call_with_retries(
+    call: Callable[[], Awaitable[T]],
+    limiter: RateLimiter,
+    tokens: float = 0,
+    max_retries: Optional[int] = None,
+    base_delay: Optional[float] = None,
+    max_delay: Optional[float] = None
+) -> T:
+    """
+    Run call() under the rate limiter, retrying 429s, 5xxs and connection errors with
+    full-jitter exponential backoff; a provider Retry-After is honoured as the minimum delay
+    """
+    max_retries = max_retries if max_retries is not None else int(os.getenv("LLM_MAX_RETRIES", "5"))
+    base_delay = base_delay if base_delay is not None else float(os.getenv("LLM_RETRY_BASE_DELAY", "1"))
+    max_delay = max_delay if max_delay is not None else float(os.getenv("LLM_RETRY_MAX_DELAY", "60"))
+
+    attempt = 0
+    while True:
+        await limiter.acquire(tokens)
+        try:
+            result = await call()
+        except Exception as e:
+            if not is_retryable(e) or attempt >= max_retries:
+                limiter.failures += 1
+                raise
+            retry_after = retry_after_seconds(e)
+            if getattr(e, "status_code", None) == 429:
+                limiter.on_rate_limited(retry_after)
+            delay = random.uniform(0, min(max_delay, base_delay * 2 ** attempt))
+            if retry_after is not None:
+                delay = max(delay, min(retry_after, max_delay))
+            attempt += 1
+            limiter.retries += 1
+            logger.warning("LLM call failed (%s); retry %d/%d in %.1fs", e, attempt, max_retries, delay)
+            await asyncio.sleep(delay)
+            continue
+        limiter.on_success()
+        return result
+
+
+_rate_limiter: Optional[RateLimiter] = None
+
+def get_rate_limiter() -> RateLimiter:
+    """Return the process-wide LLM rate limiter"""
+    global _rate_limiter
+    if _rate_limiter is None:
+        _rate_limiter = RateLimiter()
+    return _rate_limiter
@@ -0,0 +1,206 @@
+import re
+import numpy as np
+from typing import Dict, List, Tuple
+from app.models import SkillMatch
+from app.services.prefilter import tokenize
+
+TECHNICAL_SKILLS = [
+    "python", "java", "javascript", "typescript", "c++", "c#", "go", "rust", "ruby", "php", "scala",
+    "kotlin", "swift", "r", "sql", "nosql", "postgresql", "mysql", "mongodb", "redis", "elasticsearch",
+    "react", "angular", "vue", "node.js", "django", "flask", "fastapi", "spring", ".net", "graphql",
+    "rest", "microservices", "docker", "kubernetes", "aws", "azure", "gcp", "terraform", "ansible",
+    "linux", "git", "ci/cd", "jenkins", "kafka", "spark", "hadoop", "airflow", "pandas", "numpy",
+    "machine learning", "deep learning", "nlp", "computer vision", "tensorflow", "pytorch",
+    "data analysis", "html", "css", "excel", "tableau", "power bi", "figma", "cybersecurity", "networking",
+    "jira", "confluence", "snowflake", "bigquery", "dbt", "salesforce", "photoshop"
+]
+
+SOFT_SKILLS = [
+    "communication", "leadership", "teamwork", "collaboration", "problem solving", "mentoring",
+    "stakeholder management", "project management", "agile", "scrum", "presentation", "negotiation",
+    "time management", "critical thinking", "customer service"
+]
+
+# Alternative spellings mapped to the canonical skill name
+SKILL_ALIASES = {
+    "golang": "go", "postgres": "postgresql", "k8s": "kubernetes", "js": "javascript",
+    "ts": "typescript", "nodejs": "node.js", "reactjs": "react", "react.js": "react",
+    "vue.js": "vue", "amazon web services": "aws", "google cloud": "gcp", "ml": "machine learning",
+    "team work": "teamwork", "problem-solving": "problem solving", "restful": "rest", "dotnet": ".net",
+    "sklearn": "machine learning", "scikit-learn": "machine learning", "mentorship": "mentoring",
+    "information security": "cybersecurity", "infosec": "cybersecurity", "application security": "cybersecurity",
+    "network security": "cybersecurity"
+}
+
+# Skill names and aliases that are also everyday words or abbreviations ("ready to go", "Rest assured",
+# "R&D", "250 ml"). They are left out of the word lookup and only count where the case-sensitive
+# pattern of their skill matches the original text
+AMBIGUOUS_TERMS = frozenset({"go", "rest", "r", "js", "ts", "ml"})
+CONTEXTUAL_PATTERNS = {
+    # Capitalized and mid-sentence ("Python and Go", "(Go)"), not "Go the extra mile"
+    "go": re.compile(r"(?:(?<=[\w,;/] )|(?<=[(/]))Go\b(?![-'])"),
+    "rest": re.compile(r"\bREST\b|\b[Rr]est(?=[ -]APIs?\b)"),
+    # A standalone capital R, not "R&D", "R-squared" or an initial ("R. Smith")
+    "r": re.compile(r"(?<![\w&/.-])R\b(?!\s*&|['-]|\.\w|\. [A-Z][a-z])"),
+    "javascript": re.compile(r"\bJS\b"),
+    "typescript": re.compile(r"\bTS\b"),
+    "machine learning": re.compile(r"\bML\b"),
+}
+
+# Requirement lines containing these words weigh more (or less) than plain lines
+REQUIRED_MARKERS = ("required", "must", "essential", "mandatory", "minimum")
+OPTIONAL_MARKERS = ("preferred", "nice to have", "bonus", "plus", "desirable", "optional")
+
+# Number of mentions at which a skill counts as fully matched
+MENTION_SATURATION = 3
+MAX_NGRAM = 3
+
+# Tool-shaped words that are job-ad vocabulary rather than skills
+GENERIC_WORDS = frozenset("""
+senior junior lead principal staff engineer engineers developer developers manager backend frontend full
+stack degree bachelor bachelors master masters phd computer science english company remote office hybrid
+candidate candidates ideal responsibilities qualifications position opportunity salary benefits
+cv hr uk us usa eu emea apac bsc msc mba ceo cto cfo coo vp svp api apis saas b2b b2c kpi kpis okr okrs
+ltd inc llc gmbh asap tbd fte pto
+""".split())
+
+# Capitalized words inside a line (not its first word), candidates for tool names missing from the vocabulary
+PROPER_NOUN_PATTERN = re.compile(r"(?<=[\s,;(/])([A-Z][A-Za-z0-9+#.]*[A-Za-z0-9+#])")
+# Only words shaped like product names become skills: inner capitals ("FastAPI", "GitHub"), digits
+# or symbols ("S3", "Node.js") or short acronyms ("SAP"). Ordinary capitalized words ("Software",
+# "Platform") are far more often headings or sentence starts than tools
+TOOL_NAME_PATTERN = re.compile(r"^(?:[A-Z][a-z0-9]*[A-Z][A-Za-z0-9]*|[A-Za-z]*[0-9+#.][A-Za-z0-9+#.]*|[A-Z]{2,6})$")
+# A capitalized word right after these starts a sentence or list item
+SENTENCE_BOUNDARIES = ".!?:;-*\u2022"
+
+def _phrase_key(phrase: str) -> Tuple[str, ...]:
+    return tuple(tokenize(phrase))
+
+def _ngrams(tokens: List[str]):
+    for size in range(1, MAX_NGRAM + 1):
+        for start in range(len(tokens) - size + 1):
+            yield tuple(tokens[start:start + size])
+
+
+class SkillEngine:
+    """
+    Local skill matcher compiled from one set of requirements. Skills are taken from a known
+    vocabulary (with aliases) plus tool-like proper nouns in the requirements; a whole batch of
+    CVs is then turned into a CV x skill mention-count matrix and scored with NumPy.
+    """
+
+    def __init__(self, requirements: str):
+        self.requirements = requirements
+        # n-gram of tokens -> canonical skill; the skill names themselves and all aliases
+        self._lookup: Dict[Tuple[str, ...], str] = {}
+        for skill in TECHNICAL_SKILLS + SOFT_SKILLS:
+            if skill not in AMBIGUOUS_TERMS:
+                self._lookup[_phrase_key(skill)] = skill
+        for alias, skill in SKILL_ALIASES.items():
+            if alias not in AMBIGUOUS_TERMS:
+                self._lookup[_phrase_key(alias)] = skill
+
+        weights = self._extract_skills(requirements)
+        self.skills: List[str] = list(weights)
+        self.weights = np.array([weights[skill] for skill in self.skills], dtype=np.float64)
+        soft = set(SOFT_SKILLS)
+        self.technical_mask = np.array([skill not in soft for skill in self.skills], dtype=bool)
+        self._index = {skill: column for column, skill in enumerate(self.skills)}
+
+    def _extract_skills(self, requirements: str) -> Dict[str, float]:
+        """Skills mentioned in the requirements with their weight (highest weight over the lines that mention them)"""
+        weights: Dict[str, float] = {}
+        for line in requirements.splitlines():
+            lowered = line.lower()
+            if any(marker in lowered for marker in OPTIONAL_MARKERS):
+                weight = 0.5
+            elif any(marker in lowered for marker in REQUIRED_MARKERS):
+                weight = 1.5
+            else:
+                weight = 1.0
+
+            found = [self._lookup[gram] for gram in _ngrams(tokenize(line)) if gram in self._lookup]
+            found.extend(skill for skill, pattern in CONTEXTUAL_PATTERNS.items() if pattern.search(line))
+            for match in PROPER_NOUN_PATTERN.finditer(line):
+                noun = match.group(1)
+                if not TOOL_NAME_PATTERN.match(noun) or line[:match.start()].rstrip()[-1:] in SENTENCE_BOUNDARIES:
+                    continue
+                key = _phrase_key(noun)
+                if len(key) == 1 and key not in self._lookup and key[0] not in GENERIC_WORDS | AMBIGUOUS_TERMS:
+                    self._lookup[key] = key[0]
+                    found.append(key[0])
+            for skill in found:
+                weights[skill] = max(weights.get(skill, 0.0), weight)
+        return weights
+
+    def mention_counts(self, cv_texts: List[str]) -> np.ndarray:
+        """CV x skill matrix of how often each skill (or an alias) is mentioned"""
+        counts = np.zeros((len(cv_texts), len(self.skills)), dtype=np.float64)
+        if not self.skills:
+            return counts
+        # Resolve every n-gram of the batch to a skill column, then accumulate all hits at once
+        gram_columns = {gram: self._index[skill] for gram, skill in self._lookup.items() if skill in self._index}
+        rows: List[int] = []
+        columns: List[int] = []
+        for row, text in enumerate(cv_texts):
+            hits = [gram_columns[gram] for gram in _ngrams(tokenize(text)) if gram in gram_columns]
+            rows.extend([row] * len(hits))
+            columns.extend(hits)
+        np.add.at(counts, (np.array(rows, dtype=np.intp), np.array(columns, dtype=np.intp)), 1)
+        for skill, pattern in CONTEXTUAL_PATTERNS.items():
+            column = self._index.get(skill)
+            if column is not None:
+                counts[:, column] += [len(pattern.findall(text)) for text in cv_texts]
+        return counts
+
+    def score(self, cv_texts: List[str]) -> Dict[str, np.ndarray]:
+        """
+        Score a batch in one pass. Returns arrays over CVs: skills_match, technical_skills_score and
+        soft_skills_score (0-100, weighted by requirement importance), plus the per-skill 'strength'
+        matrix (0-1, saturating with the number of mentions) and raw 'counts'.
+        """
+        counts = self.mention_counts(cv_texts)
+        strength = np.minimum(1.0, np.log1p(counts) / np.log1p(MENTION_SATURATION))
+        return {
+            "counts": counts,
+            "strength": strength,
+            "skills_match": self._weighted(strength, np.ones_like(self.technical_mask)),
+            "technical_skills_score": self._weighted(strength, self.technical_mask),
+            "soft_skills_score": self._weighted(strength, ~self.technical_mask)
+        }
+
+    def _weighted(self, strength: np.ndarray, mask: np.ndarray) -> np.ndarray:
+        weights = self.weights * mask
+        total = weights.sum()
+        if total == 0:
+            return np.zeros(strength.shape[0])
+        return np.round(100.0 * (strength @ weights) / total, 1)
+
+    def breakdown(self, counts: np.ndarray, strength: np.ndarray) -> List[SkillMatch]:
+        """SkillMatch records for one CV's row of the matrix (level is a mention-count heuristic)"""
+        matches = []
+        for column, skill in enumerate(self.skills):
+            mentions = counts[column]
+            if mentions == 0:
+                level = "missing"
+            elif mentions >= MENTION_SATURATION:
+                level = "proficient"
+            elif mentions >= 2:
+                level = "intermediate"
+            else:
+                level = "beginner"
+            weight = self.weights[column]
+            matches.append(SkillMatch(
+                skill_name=skill,
+                match_percentage=round(float(strength[column]) * 100, 1),
+                level=level,
+                relevance="high" if weight > 1 else "medium" if weight == 1 else "low"
+            ))
+        return matches
+
+    def missing(self, counts: np.ndarray) -> List[str]:
+        """Required (non-optional) skills one CV never mentions"""
+        return [
+            skill for column, skill in enumerate(self.skills)
+            if counts[column] == 0 and self.weights[column] >= 1
+        ]
@@ -0,0 +1,227 @@
+import os
+import re
+from collections import Counter
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+# Rough token estimate for English prose (no tokenizer dependency): about 4 characters per token
+CHARS_PER_TOKEN = 4
+
+TRUNCATION_MARKER = "[...]"
+
+# Bumped whenever compaction output changes, so analyses of differently compacted text are not reused
+COMPACTION_VERSION = "2"
+
+# Section headings recognised at the start of a line, with their priority when the budget is
+# tight: lower-priority sections are dropped first, higher ones keep a larger share
+SECTION_PRIORITIES = [
+    (re.compile(r"^(professional\s+)?(summary|profile|objective|about\s+me)\b", re.I), 3),
+    (re.compile(r"^(work\s+|professional\s+)?(experience|employment|work\s+history|career\s+history)\b", re.I), 4),
+    (re.compile(r"^(technical\s+|core\s+|key\s+)?(skills|competencies|technologies|tech\s+stack)\b", re.I), 4),
+    (re.compile(r"^(education|academic|qualifications)\b", re.I), 3),
+    (re.compile(r"^(certifications?|licen[cs]es|courses|training)\b", re.I), 2),
+    (re.compile(r"^(projects|publications|awards|achievements)\b", re.I), 2),
+    (re.compile(r"^(languages)\b", re.I), 2),
+    (re.compile(r"^(volunteer(ing)?|activities)\b", re.I), 1),
+    (re.compile(r"^(references|hobbies|interests|personal\s+(details|information))\b", re.I), 0),
+]
+DEFAULT_PRIORITY = 3
+DROPPABLE_PRIORITY = 1
+MIN_SECTION_TOKENS = 64
+
+PAGE_NUMBER_PATTERN = re.compile(r"^(page\s*)?\d{1,3}(\s*(/|of)\s*\d{1,3})?$", re.I)
+INVISIBLE_PATTERN = re.compile("[\u00ad\u200b\u200c\u200d\u2060\ufeff]")
+HORIZONTAL_SPACE_PATTERN = re.compile("[ \t\u00a0\u2000-\u200a\u202f\u205f\u3000]+")
+HYPHENATED_BREAK_PATTERN = re.compile(r"(\w)-\n(\w)")
+# Back-to-back repeated phrases (e.g. a merged table cell extracted once per column) of up
+# to this many words and at least this many characters are collapsed to one copy
+MAX_REPEATED_PHRASE_WORDS = 12
+MIN_REPEATED_PHRASE_CHARS = 8
+
+
+def default_token_budget() -> int:
+    """Prompt token budget for CV text (PROMPT_TOKEN_BUDGET; 0 = no limit)"""
+    return int(os.getenv("PROMPT_TOKEN_BUDGET", "6000"))
+
+
+def estimate_tokens(text: str) -> int:
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+@dataclass
+class CompactionResult:
+    text: str
+    tokens_before: int
+    tokens_after: int
+    truncated: bool = False
+
+    @property
+    def tokens_saved(self) -> int:
+        return self.tokens_before - self.tokens_after
+
+
+def normalize_whitespace(text: str) -> str:
+    """Remove invisible characters, join hyphenated line breaks and collapse runs of spaces and blank lines"""
+    text = text.replace("\r\n", "\n").replace("\r", "\n")
+    text = INVISIBLE_PATTERN.sub("", text)
+    text = HYPHENATED_BREAK_PATTERN.sub(r"\1\2", text)
+    lines = [HORIZONTAL_SPACE_PATTERN.sub(" ", line).strip() for line in text.split("\n")]
+    compacted: List[str] = []
+    for line in lines:
+        if line or (compacted and compacted[-1]):
+            compacted.append(line)
+    return "\n".join(compacted).strip()
+
+
+def collapse_repeated_phrases(line: str) -> str:
+    """
+    Keep one copy of a phrase repeated back to back ("Python Developer Python Developer").
+    Compares word windows of bounded size, so the cost stays linear in the line length.
+    """
+    words = line.split(" ")
+    kept: List[str] = []
+    index = 0
+    while index < len(words):
+        for size in range(1, min(MAX_REPEATED_PHRASE_WORDS, (len(words) - index) // 2) + 1):
+            phrase = words[index:index + size]
+            if len(" ".join(phrase)) < MIN_REPEATED_PHRASE_CHARS or words[index + size:index + 2 * size] != phrase:
+                continue
+            end = index + 2 * size
+            while words[end:end + size] == phrase:
+                end += size
+            kept.extend(phrase)
+            index = end
+            break
+        else:
+            kept.append(words[index])
+            index += 1
+    return " ".join(kept)
+
+
+def remove_boilerplate(lines: List[str], min_repeats: int = 3) -> List[str]:
+    """
+    Drop page numbers, short lines repeated on many pages (headers/footers: only the first
+    occurrence is kept), exact duplicates of longer lines, and back-to-back repeated phrases
+    """
+    counts = Counter(line.lower() for line in lines if line)
+    seen = set()
+    kept = []
+    for line in lines:
+        if not line or line == TRUNCATION_MARKER:
+            kept.append(line)
+            continue
+        if PAGE_NUMBER_PATTERN.match(line):
+            continue
+        key = line.lower()
+        repeated_header = len(line) <= 80 and counts[key] >= min_repeats
+        if (repeated_header or len(line) >= 40) and key in seen:
+            continue
+        seen.add(key)
+        kept.append(collapse_repeated_phrases(line))
+    return kept
+
+
+def split_sections(lines: List[str]) -> List[Tuple[int, List[str]]]:
+    """Split lines at recognised headings into (priority, lines) sections; text before the first heading is its own section"""
+    sections: List[Tuple[int, List[str]]] = [(DEFAULT_PRIORITY, [])]
+    for line in lines:
+        priority = None
+        if line and len(line) <= 40:
+            for pattern, section_priority in SECTION_PRIORITIES:
+                if pattern.match(line):
+                    priority = section_priority
+                    break
+        if priority is not None:
+            sections.append((priority, [line]))
+        else:
+            sections[-1][1].append(line)
+    return [(priority, section) for priority, section in sections if any(section)]
+
+
+def truncate_to_budget(sections: List[Tuple[int, List[str]]], token_budget: int) -> Tuple[List[str], bool]:
+    """
+    Fit sections into the budget: drop the lowest-priority sections (references, hobbies...) first,
+    then cut every remaining section to a share of the budget weighted by size and priority,
+    keeping each section's first lines (the most recent roles are usually listed first)
+    """
+    def size(section: List[str]) -> int:
+        return sum(_line_cost(line) for line in section)
+
+    total = sum(size(section) for _, section in sections)
+    if total <= token_budget:
+        return [line for _, section in sections for line in section], False
+
+    kept = list(sections)
+    for drop_priority in range(0, DROPPABLE_PRIORITY + 1):
+        if total <= token_budget:
+            break
+        for entry in [entry for entry in kept if entry[0] == drop_priority]:
+            kept.remove(entry)
+            total -= size(entry[1])
+            if total <= token_budget:
+                break
+
+    if total > token_budget:
+        # Every section keeps up to MIN_SECTION_TOKENS so short sections (skills, education)
+        # survive; the rest of the budget is shared by size and priority
+        sizes = [size(section) for _, section in kept]
+        base = [min(section_size, MIN_SECTION_TOKENS) for section_size in sizes]
+        if sum(base) > token_budget:
+            base = [0] * len(kept)
+        weights = [(section_size - floor) * (priority + 1) for (priority, _), section_size, floor in zip(kept, sizes, base)]
+        total_weight = sum(weights) or 1
+        spare = token_budget - sum(base)
+        shares = [max(1, floor + spare * weight // total_weight) for floor, weight in zip(base, weights)]
+        kept = [
+            (priority, _truncate_lines(section, share))
+            for (priority, section), share in zip(kept, shares)
+        ]
+
+    return [line for _, section in kept for line in section], True
+
+
+def _line_cost(line: str) -> int:
+    """Tokens for a line plus its newline"""
+    return estimate_tokens(line) + 1
+
+
+def _truncate_lines(lines: List[str], token_budget: int) -> List[str]:
+    """Keep leading lines within the budget, cutting the last one at a word boundary"""
+    kept = []
+    used = 0
+    for line in lines:
+        cost = _line_cost(line)
+        if used + cost <= token_budget:
+            kept.append(line)
+            used += cost
+            continue
+        # The cut line (or the marker) must fit too, so compacting the output again is a no-op
+        remaining_chars = (token_budget - used - 1) * CHARS_PER_TOKEN - len(TRUNCATION_MARKER) - 1
+        if remaining_chars > 20:
+            kept.append(line[:remaining_chars].rsplit(" ", 1)[0] + " " + TRUNCATION_MARKER)
+            break
+        while kept and used + _line_cost(TRUNCATION_MARKER) > token_budget:
+            used -= _line_cost(kept.pop())
+        if kept and kept[-1] != TRUNCATION_MARKER:
+            kept.append(TRUNCATION_MARKER)
+        break
+    return kept
+
+
+def compact_text(text: str, token_budget: Optional[int] = None) -> CompactionResult:
+    """
+    Shrink extracted CV text before prompting: normalize whitespace, remove page furniture and
+    duplicated text, then (if still over token_budget, default PROMPT_TOKEN_BUDGET; 0 = no limit)
+    truncate section by section
+    """
+    if token_budget is None:
+        token_budget = default_token_budget()
+    tokens_before = estimate_tokens(text)
+
+    lines = remove_boilerplate(normalize_whitespace(text).split("\n"))
+    truncated = False
+    if token_budget > 0:
+        lines, truncated = truncate_to_budget(split_sections(lines), token_budget)
+
+    compacted = "\n".join(lines).strip()
+    return CompactionResult(compacted, tokens_before, estimate_tokens(compacted), truncated)
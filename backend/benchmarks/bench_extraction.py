@@ -0,0 +1,99 @@
+"""
+Micro-benchmark: streaming text extraction vs. the previous concatenating extractor
+
+Run from the backend directory:
+    python -m benchmarks.bench_extraction [--corpus-dir DIR] [--repeat N] [--max-chars N]
+"""
+import io
+import os
+import json
+import time
+import argparse
+import tempfile
+import statistics
+from typing import Tuple
+import PyPDF2
+from docx import Document
+from app.services.file_processor import assemble_text, iter_pdf_chunks, iter_docx_chunks
+from benchmarks.corpus import generate_corpus
+
+
+def legacy_pdf(file_path: str) -> str:
+    """Extractor as it was before streaming: whole file in memory, text += page"""
+    with open(file_path, 'rb') as file:
+        file_data = file.read()
+    pdf_reader = PyPDF2.PdfReader(io.BytesIO(file_data))
+    text = ""
+    for page in pdf_reader.pages:
+        text += page.extract_text() + "\n"
+    return text.strip()
+
+
+def legacy_docx(file_path: str) -> str:
+    doc = Document(file_path)
+    text = ""
+    for paragraph in doc.paragraphs:
+        text += paragraph.text + "\n"
+    for table in doc.tables:
+        for row in table.rows:
+            for cell in row.cells:
+                text += cell.text + " "
+        text += "\n"
+    return text.strip()
+
+
+def streaming(file_path: str, extension: str, max_chars: int) -> str:
+    chunks = iter_pdf_chunks(file_path) if extension == ".pdf" else iter_docx_chunks(file_path)
+    return assemble_text(chunks, max_chars)
+
+
+def best_of(func, repeat: int) -> Tuple[float, float]:
+    """Best and median wall time of repeat calls"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings), statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--corpus-dir", default=os.path.join(tempfile.gettempdir(), "cv_bench_corpus"))
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--max-chars", type=int, default=int(os.getenv("EXTRACTION_MAX_CHARS", "100000")))
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    corpus = generate_corpus(args.corpus_dir)
+    rows = []
+    for path, extension, pages in corpus:
+        legacy = legacy_pdf if extension == ".pdf" else legacy_docx
+        legacy_best, legacy_median = best_of(lambda: legacy(path), args.repeat)
+        full_best, _ = best_of(lambda: streaming(path, extension, 0), args.repeat)
+        capped_best, _ = best_of(lambda: streaming(path, extension, args.max_chars), args.repeat)
+        rows.append({
+            "format": extension,
+            "pages": pages,
+            "bytes": os.path.getsize(path),
+            "legacy_s": round(legacy_best, 4),
+            "legacy_median_s": round(legacy_median, 4),
+            "streaming_s": round(full_best, 4),
+            "streaming_capped_s": round(capped_best, 4),
+            "speedup_capped": round(legacy_best / capped_best, 2) if capped_best else None
+        })
+
+    if args.json:
+        print(json.dumps({"max_chars": args.max_chars, "results": rows}, indent=2))
+        return
+
+    print(f"{'format':<6} {'pages':>5} {'legacy':>9} {'stream':>9} {'capped':>9} {'speedup':>8}")
+    for row in rows:
+        print(
+            f"{row['format']:<6} {row['pages']:>5} {row['legacy_s']:>8.3f}s "
+            f"{row['streaming_s']:>8.3f}s {row['streaming_capped_s']:>8.3f}s {row['speedup_capped']:>7.2f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
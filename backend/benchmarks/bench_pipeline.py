@@ -0,0 +1,416 @@
+"""
+End-to-end benchmark of the screening pipeline with a simulated LLM
+
+Generates a synthetic PDF/DOCX corpus and measures FileProcessor.extract_text throughput,
+CVMatcher.process_cv_files wall time, the SSE overhead of /upload (against /upload-sync on the
+same files) and peak Python memory of the upload routes. LLM calls go to the stub backend
+(LLM_BACKEND=stub) with lognormal latency, so no API key is needed and runs are repeatable.
+Everything runs in a scratch working directory; results are written as a JSON report, and a
+previous report can be given as a baseline to flag regressions.
+
+Run from the backend directory:
+    python -m benchmarks.bench_pipeline [--cvs N] [--llm-latency S] [--output FILE] [--baseline FILE]
+"""
+import os
+import sys
+import gc
+import json
+import time
+import asyncio
+import argparse
+import platform
+import tempfile
+import statistics
+import tracemalloc
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+import httpx
+from benchmarks.corpus import generate_batch, generate_corpus
+
+REQUIREMENTS = (
+    "Senior backend engineer. Must have Python, FastAPI and PostgreSQL. "
+    "Docker and Kubernetes required. Experience with Kafka and AWS preferred. Nice to have: Terraform."
+)
+ROLES = [
+    REQUIREMENTS,
+    "Frontend engineer with React and TypeScript. GraphQL expected. Nice to have: CI/CD and Agile."
+]
+
+
+def configure_environment(args: argparse.Namespace, workdir: str):
+    """
+    Point the app at the stub LLM and a scratch directory. Caches and the rate limiter are
+    disabled so every run does the full work; must happen before the app is imported because
+    the routes create their upload/storage directories at import time.
+    """
+    os.environ.update({
+        "LLM_BACKEND": "stub",
+        "LLM_STUB_LATENCY_DISTRIBUTION": "lognormal",
+        "LLM_STUB_LATENCY_MEDIAN": str(args.llm_latency),
+        "LLM_STUB_LATENCY_SPREAD": str(args.llm_spread),
+        "LLM_STUB_ERROR_RATE": str(args.llm_error_rate),
+        "LLM_STUB_RATE_LIMIT_RATE": "0",
+        "LLM_STUB_INVALID_JSON_RATE": "0",
+        "LLM_STUB_SEED": str(args.seed),
+        "LLM_RPM": "0",
+        "LLM_TPM": "0",
+        "ANALYSIS_CACHE_ENABLED": "false",
+        "TEXT_CACHE_ENABLED": "false",
+        "LATENCY_STATS_FILE": "",
+        "CV_MAX_CONCURRENCY": str(args.concurrency[0]),
+        "FILE_STORE_DB": os.path.join(workdir, "file_storage", "metadata.db"),
+        "BATCH_DIR": os.path.join(workdir, "cache", "batches")
+    })
+    os.chdir(workdir)
+
+
+async def bench_extraction(corpus: List[Tuple[str, str, int]], batch: List[Tuple[str, str, int]], repeat: int) -> Dict:
+    """Per-document extraction time across page counts, and concurrent throughput over a batch"""
+    from app.services.file_processor import FileProcessor
+
+    # Start the extraction worker pool outside the timings
+    await FileProcessor.extract_text(batch[0][0], batch[0][1])
+
+    documents = []
+    for path, extension, pages in corpus:
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            text = await FileProcessor.extract_text(path, extension)
+            timings.append(time.perf_counter() - start)
+        best = min(timings)
+        size = os.path.getsize(path)
+        documents.append({
+            "format": extension,
+            "pages": pages,
+            "bytes": size,
+            "chars": len(text),
+            "best_s": round(best, 4),
+            "median_s": round(statistics.median(timings), 4),
+            "pages_per_s": round(pages / best, 1) if best else None,
+            "mb_per_s": round(size / best / 1e6, 2) if best else None
+        })
+
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        await asyncio.gather(*[FileProcessor.extract_text(path, extension) for path, extension, _ in batch])
+        timings.append(time.perf_counter() - start)
+    best = min(timings)
+    size = sum(os.path.getsize(path) for path, _, _ in batch)
+    return {
+        "documents": documents,
+        "batch": {
+            "files": len(batch),
+            "pages": sum(pages for _, _, pages in batch),
+            "bytes": size,
+            "best_s": round(best, 4),
+            "files_per_s": round(len(batch) / best, 1) if best else None,
+            "mb_per_s": round(size / best / 1e6, 2) if best else None
+        }
+    }
+
+
+async def bench_pipeline(batch: List[Tuple[str, str, int]], concurrency_levels: List[int]) -> List[Dict]:
+    """
+    process_cv_files wall time per concurrency level. llm_floor_s is the least time the simulated
+    LLM latency alone allows (total latency spread over the workers, or the slowest call), so
+    overhead_s is what extraction, parsing and scheduling add on top.
+    """
+    from app.services.cv_matcher import CVMatcher
+
+    file_paths = [(path, os.path.basename(path), extension) for path, extension, _ in batch]
+    rows = []
+    for concurrency in concurrency_levels:
+        matcher = CVMatcher(max_concurrency=concurrency)
+        start = time.perf_counter()
+        results = await matcher.process_cv_files(file_paths, REQUIREMENTS)
+        wall = time.perf_counter() - start
+        backend = matcher.llm_service.backend
+        floor = max(backend.latency_total / concurrency, backend.latency_max)
+        rows.append({
+            "concurrency": concurrency,
+            "files": len(results),
+            "llm_calls": backend.calls,
+            "wall_s": round(wall, 3),
+            "files_per_s": round(len(results) / wall, 2),
+            "llm_floor_s": round(floor, 3),
+            "overhead_s": round(wall - floor, 3)
+        })
+    return rows
+
+
+def upload_files(batch: List[Tuple[str, str, int]]) -> List[tuple]:
+    files = []
+    for path, _, _ in batch:
+        with open(path, "rb") as f:
+            files.append(("files", (os.path.basename(path), f.read())))
+    return files
+
+
+class ChunkTimer:
+    """
+    ASGI wrapper recording when each response body chunk leaves the app. The in-process
+    transport only hands a streamed response over once it is complete, so event timings are
+    taken here.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.chunks: List[Tuple[float, bytes]] = []
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        async def timed_send(message):
+            if message["type"] == "http.response.body" and message.get("body"):
+                self.chunks.append((time.perf_counter(), message["body"]))
+            await send(message)
+
+        await self.app(scope, receive, timed_send)
+
+
+async def post_sse(client, timer: ChunkTimer, files: List[tuple]) -> Dict:
+    """POST /api/upload and read back the event stream, timing the first event and the first result"""
+    timer.chunks.clear()
+    start = time.perf_counter()
+    response = await client.post("/api/upload", data={"requirements": REQUIREMENTS}, files=files)
+    response.raise_for_status()
+    wall = time.perf_counter() - start
+
+    first_event = first_result = None
+    events: Counter = Counter()
+    for sent, body in timer.chunks:
+        for line in body.decode("utf-8").splitlines():
+            if not line.startswith("data: "):
+                continue
+            event = json.loads(line[len("data: "):])
+            if event["type"] == "error":
+                raise RuntimeError(f"/upload failed: {event['message']}")
+            events[event["type"]] += 1
+            if first_event is None:
+                first_event = sent - start
+            if event["type"] == "result" and first_result is None:
+                first_result = sent - start
+    return {
+        "wall_s": round(wall, 3),
+        "first_event_s": round(first_event, 3) if first_event is not None else None,
+        "first_result_s": round(first_result, 3) if first_result is not None else None,
+        "events": dict(events),
+        "chunks": len(timer.chunks),
+        "stream_bytes": len(response.content)
+    }
+
+
+async def post_sync(client, files: List[tuple]) -> Dict:
+    start = time.perf_counter()
+    response = await client.post("/api/upload-sync", data={"requirements": REQUIREMENTS}, files=files)
+    response.raise_for_status()
+    return {"wall_s": round(time.perf_counter() - start, 3), "response_bytes": len(response.content)}
+
+
+async def post_multi(client, files: List[tuple]) -> Dict:
+    start = time.perf_counter()
+    response = await client.post("/api/upload-multi", data={"requirements_sets": json.dumps(ROLES)}, files=files)
+    response.raise_for_status()
+    return {"wall_s": round(time.perf_counter() - start, 3), "response_bytes": len(response.content)}
+
+
+async def bench_sse(client, timer: ChunkTimer, files: List[tuple]) -> Dict:
+    """/upload vs /upload-sync on the same files: the difference is the cost of streaming progress"""
+    streamed = await post_sse(client, timer, files)
+    synchronous = await post_sync(client, files)
+    overhead = streamed["wall_s"] - synchronous["wall_s"]
+    events = sum(streamed["events"].values())
+    return {
+        "files": len(files),
+        "sse": streamed,
+        "sync": synchronous,
+        "overhead_s": round(overhead, 3),
+        "overhead_pct": round(100 * overhead / synchronous["wall_s"], 1) if synchronous["wall_s"] else None,
+        "bytes_per_event": round(streamed["stream_bytes"] / events) if events else None
+    }
+
+
+async def peak_memory(request) -> Dict:
+    """
+    Peak Python heap allocated while a request runs (tracemalloc, all threads of this process).
+    Includes the client's copy of the request body; parsing in extraction worker processes is not counted.
+    """
+    gc.collect()
+    tracemalloc.start()
+    try:
+        baseline, _ = tracemalloc.get_traced_memory()
+        result = await request()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {"peak_mb": round((peak - baseline) / 1e6, 2), "wall_s": result["wall_s"]}
+
+
+async def bench_memory(client, timer: ChunkTimer, files: List[tuple]) -> Dict:
+    upload_bytes = sum(len(data) for _, (_, data) in files)
+    return {
+        "upload_bytes": upload_bytes,
+        "routes": {
+            "/upload": await peak_memory(lambda: post_sse(client, timer, files)),
+            "/upload-sync": await peak_memory(lambda: post_sync(client, files)),
+            "/upload-multi": await peak_memory(lambda: post_multi(client, files))
+        },
+        "max_rss_mb": max_rss_mb()
+    }
+
+
+def max_rss_mb() -> Optional[float]:
+    """Process high-water mark of resident memory (None where the resource module is unavailable)"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return round(rss / (1e6 if sys.platform == "darwin" else 1e3), 1)
+
+
+def summary(report: Dict) -> Dict[str, float]:
+    """Headline figures (lower is better) compared against a baseline report; all exclude the simulated LLM latency itself"""
+    figures = {"extraction_batch_s": report["extraction"]["batch"]["best_s"]}
+    for row in report["pipeline"]:
+        figures[f"pipeline_c{row['concurrency']}_overhead_s"] = row["overhead_s"]
+    figures["sse_overhead_s"] = report["sse"]["overhead_s"]
+    for route, measured in report["memory"]["routes"].items():
+        figures[f"memory_{route.strip('/')}_peak_mb"] = measured["peak_mb"]
+    return figures
+
+
+def regressions(current: Dict[str, float], baseline: Dict[str, float], tolerance: float) -> List[Dict]:
+    """Figures worse than the baseline by more than tolerance (relative), ignoring tiny absolute changes"""
+    found = []
+    for name, value in current.items():
+        before = baseline.get(name)
+        if value is None or before is None:
+            continue
+        if value > before * (1 + tolerance) and value - before > 0.05:
+            found.append({"metric": name, "baseline": before, "current": value, "change_pct": round(100 * (value - before) / before, 1) if before else None})
+    return found
+
+
+def print_report(report: Dict):
+    print(f"{'format':<6} {'pages':>5} {'bytes':>9} {'best':>9} {'pages/s':>9} {'MB/s':>7}")
+    for row in report["extraction"]["documents"]:
+        print(f"{row['format']:<6} {row['pages']:>5} {row['bytes']:>9} {row['best_s']:>8.3f}s {row['pages_per_s']:>9} {row['mb_per_s']:>7}")
+    batch = report["extraction"]["batch"]
+    print(f"\nbatch extraction: {batch['files']} files in {batch['best_s']:.3f}s ({batch['files_per_s']} files/s)")
+
+    print(f"\n{'concurrency':>11} {'wall':>9} {'llm floor':>10} {'overhead':>9} {'files/s':>8}")
+    for row in report["pipeline"]:
+        print(f"{row['concurrency']:>11} {row['wall_s']:>8.2f}s {row['llm_floor_s']:>9.2f}s {row['overhead_s']:>8.2f}s {row['files_per_s']:>8}")
+
+    sse = report["sse"]
+    print(
+        f"\n/upload {sse['sse']['wall_s']:.2f}s (first result {sse['sse']['first_result_s']}s, "
+        f"{sum(sse['sse']['events'].values())} events), /upload-sync {sse['sync']['wall_s']:.2f}s, "
+        f"SSE overhead {sse['overhead_s']:+.2f}s ({sse['overhead_pct']}%)"
+    )
+    for route, measured in report["memory"]["routes"].items():
+        print(f"{route:<14} peak {measured['peak_mb']:>8.2f} MB")
+    print(f"max RSS {report['memory']['max_rss_mb']} MB")
+    for item in report.get("regressions", []):
+        print(f"REGRESSION {item['metric']}: {item['baseline']} -> {item['current']} ({item['change_pct']}%)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--corpus-dir", default=os.path.join(tempfile.gettempdir(), "cv_bench_corpus"))
+    parser.add_argument("--cvs", type=int, default=24, help="CVs per screening batch")
+    parser.add_argument("--pages", type=int, nargs="+", default=[1, 5, 25, 100], help="page counts for the extraction corpus")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[4, 16], help="CV_MAX_CONCURRENCY levels; the first is used for the routes")
+    parser.add_argument("--llm-latency", type=float, default=1.5, help="median simulated LLM latency in seconds")
+    parser.add_argument("--llm-spread", type=float, default=0.5, help="lognormal sigma of the simulated latency")
+    parser.add_argument("--llm-error-rate", type=float, default=0.0, help="share of simulated 503s (retried)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3, help="repetitions for extraction timings (best is reported)")
+    parser.add_argument("--output", default="benchmark_report.json", help="JSON report path")
+    parser.add_argument("--baseline", help="previous report to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="relative slowdown reported as a regression")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args()
+
+    output = os.path.abspath(args.output)
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    corpus = generate_corpus(os.path.join(args.corpus_dir, "documents"), page_counts=tuple(args.pages))
+    batch = generate_batch(os.path.join(args.corpus_dir, f"batch_{args.cvs}_{args.seed}"), args.cvs, seed=args.seed)
+
+    workdir = tempfile.mkdtemp(prefix="cv_bench_run_")
+    configure_environment(args, workdir)
+    from app.main import app
+
+    async def direct() -> Tuple[Dict, List[Dict]]:
+        return (
+            await bench_extraction(corpus, batch, args.repeat),
+            await bench_pipeline(batch, args.concurrency)
+        )
+
+    async def routes() -> Tuple[Dict, Dict]:
+        # httpx's ASGI transport doesn't send lifespan events, so startup/shutdown run here
+        timer = ChunkTimer(app)
+        transport = httpx.ASGITransport(app=timer)
+        async with app.router.lifespan_context(app):
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+                return (
+                    await bench_sse(client, timer, files),
+                    await bench_memory(client, timer, files)
+                )
+
+    extraction, pipeline = asyncio.run(direct())
+    files = upload_files(batch)
+    sse, memory = asyncio.run(routes())
+
+    report = {
+        "generated_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "extraction_workers": os.getenv("EXTRACTION_WORKERS", str(min(4, os.cpu_count() or 1)))
+        },
+        "parameters": {
+            "cvs": args.cvs,
+            "pages": args.pages,
+            "concurrency": args.concurrency,
+            "llm_latency_median_s": args.llm_latency,
+            "llm_latency_sigma": args.llm_spread,
+            "llm_error_rate": args.llm_error_rate,
+            "seed": args.seed,
+            "repeat": args.repeat
+        },
+        "extraction": extraction,
+        "pipeline": pipeline,
+        "sse": sse,
+        "memory": memory
+    }
+    report["summary"] = summary(report)
+    if baseline is not None:
+        if baseline.get("parameters") != report["parameters"]:
+            print("warning: baseline was run with different parameters", file=sys.stderr)
+        report["regressions"] = regressions(report["summary"], baseline.get("summary", {}), args.tolerance)
+
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+        print(f"\nreport written to {output}")
+    if report.get("regressions"):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
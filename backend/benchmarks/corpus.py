@@ -0,0 +1,154 @@
+"""
+Synthetic CV corpus generator for benchmarks
+
+PDFs are written directly (single Helvetica font, one text stream per page) so no
+PDF authoring library is needed; DOCX files are built with python-docx.
+"""
+import os
+import random
+from typing import List, Tuple
+from docx import Document
+
+SKILLS = [
+    "Python", "FastAPI", "Django", "PostgreSQL", "Docker", "Kubernetes", "AWS", "React",
+    "TypeScript", "Go", "Terraform", "Redis", "Kafka", "Machine Learning", "NLP", "CI/CD",
+    "Leadership", "Communication", "Agile", "GraphQL", "Java", "Spark", "Airflow", "Linux"
+]
+SECTIONS = ["Summary", "Experience", "Education", "Skills", "Projects", "Certifications", "Languages"]
+WORDS = (
+    "designed built delivered scalable services team platform customers improved latency "
+    "reduced cost migrated architecture mentored engineers owned roadmap production data "
+    "pipelines reliability monitoring automated testing deployment stakeholders"
+).split()
+
+LINES_PER_PAGE = 45
+
+
+def _sentence(rng: random.Random) -> str:
+    words = rng.sample(WORDS, 8) + rng.sample(SKILLS, 2)
+    rng.shuffle(words)
+    return " ".join(words).capitalize() + "."
+
+
+def cv_lines(rng: random.Random, count: int) -> List[str]:
+    """Generate count lines of CV-like text"""
+    lines = []
+    for i in range(count):
+        if i % 15 == 0:
+            lines.append(SECTIONS[(i // 15) % len(SECTIONS)].upper())
+        else:
+            lines.append(_sentence(rng))
+    return lines
+
+
+def _escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def write_pdf(path: str, pages: int, seed: int = 0):
+    """Write a text PDF with the given number of pages"""
+    rng = random.Random(seed)
+    objects: List[bytes] = []
+
+    def add(body: bytes) -> int:
+        objects.append(body)
+        return len(objects)
+
+    catalog_id = add(b"")  # filled in below
+    pages_id = add(b"")
+    font_id = add(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+
+    page_ids = []
+    for page_number in range(pages):
+        lines = [f"Candidate {seed} - page {page_number + 1}"] + cv_lines(rng, LINES_PER_PAGE)
+        ops = ["BT", "/F1 9 Tf", "11 TL", "40 800 Td"]
+        for line in lines:
+            ops.append(f"({_escape(line)}) Tj T*")
+        ops.append("ET")
+        stream = "\n".join(ops).encode("latin-1")
+        content_id = add(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+        page_ids.append(add(
+            b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 595 842] "
+            b"/Resources << /Font << /F1 %d 0 R >> >> /Contents %d 0 R >>" % (pages_id, font_id, content_id)
+        ))
+
+    objects[catalog_id - 1] = b"<< /Type /Catalog /Pages %d 0 R >>" % pages_id
+    kids = b" ".join(b"%d 0 R" % page_id for page_id in page_ids)
+    objects[pages_id - 1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, len(page_ids))
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref_offset = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        out += b"%010d 00000 n \n" % offset
+    out += b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (
+        len(objects) + 1, catalog_id, xref_offset
+    )
+    with open(path, "wb") as f:
+        f.write(out)
+
+
+def write_docx(path: str, pages: int, seed: int = 0):
+    """Write a .docx with roughly the given number of pages of paragraphs plus a skills table"""
+    rng = random.Random(seed)
+    doc = Document()
+    doc.add_heading(f"Candidate {seed}", level=1)
+    for line in cv_lines(rng, pages * LINES_PER_PAGE):
+        doc.add_paragraph(line)
+    table = doc.add_table(rows=max(1, pages * 2), cols=3)
+    for row in table.rows:
+        skill = rng.choice(SKILLS)
+        row.cells[0].text = skill
+        row.cells[1].text = f"{rng.randint(1, 10)} years"
+        row.cells[2].text = rng.choice(["expert", "proficient", "intermediate"])
+    doc.save(path)
+
+
+def generate_corpus(
+    directory: str,
+    page_counts: Tuple[int, ...] = (1, 2, 5, 10, 25, 50, 100, 200),
+    formats: Tuple[str, ...] = (".pdf", ".docx")
+) -> List[Tuple[str, str, int]]:
+    """Generate one document per (page count, format); returns [(path, extension, pages)]"""
+    os.makedirs(directory, exist_ok=True)
+    corpus = []
+    for pages in page_counts:
+        for extension in formats:
+            path = os.path.join(directory, f"cv_{pages:03d}p{extension}")
+            if not os.path.exists(path):
+                if extension == ".pdf":
+                    write_pdf(path, pages, seed=pages)
+                else:
+                    write_docx(path, pages, seed=pages)
+            corpus.append((path, extension, pages))
+    return corpus
+
+
+def generate_batch(
+    directory: str,
+    count: int,
+    page_counts: Tuple[int, ...] = (1, 1, 2, 2, 3, 5),
+    seed: int = 0
+) -> List[Tuple[str, str, int]]:
+    """
+    Generate a screening batch of count CVs mixing formats and (mostly short) page counts,
+    like a real upload; returns [(path, extension, pages)]
+    """
+    os.makedirs(directory, exist_ok=True)
+    rng = random.Random(seed)
+    batch = []
+    for number in range(count):
+        extension = ".pdf" if number % 2 == 0 else ".docx"
+        pages = rng.choice(page_counts)
+        path = os.path.join(directory, f"cv_{number:04d}{extension}")
+        if not os.path.exists(path):
+            if extension == ".pdf":
+                write_pdf(path, pages, seed=seed + number)
+            else:
+                write_docx(path, pages, seed=seed + number)
+        batch.append((path, extension, pages))
+    return batch
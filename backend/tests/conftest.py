@@ -0,0 +1,62 @@
+import os
+import sys
+import asyncio
+import importlib
+import httpx
+import pytest
+from docx import Document
+from fastapi import FastAPI
+
+# Tests import the app package the same way uvicorn does (from backend/)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+@pytest.fixture(autouse=True)
+def isolated(tmp_path, monkeypatch):
+    """Run every test in its own directory with local, deterministic services"""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("FILE_STORE_DB", str(tmp_path / "file_storage" / "metadata.db"))
+    monkeypatch.setenv("LLM_BACKEND", "stub")
+    monkeypatch.setenv("LLM_STUB_LATENCY_DISTRIBUTION", "fixed")
+    monkeypatch.setenv("LLM_STUB_LATENCY_MEDIAN", "0.01")
+    monkeypatch.setenv("LLM_STUB_SEED", "1")
+    monkeypatch.setenv("EXTRACTION_WORKERS", "0")
+    monkeypatch.setenv("LATENCY_STATS_FILE", "")
+    monkeypatch.setenv("ANALYSIS_CACHE_ENABLED", "false")
+    monkeypatch.setenv("TEXT_CACHE_ENABLED", "false")
+    monkeypatch.setenv("CV_INDEX_ENABLED", "false")
+    return tmp_path
+
+@pytest.fixture
+def make_cv(tmp_path):
+    """Write a .docx CV with the given paragraphs; returns its path"""
+    def make(name: str, *paragraphs: str) -> str:
+        document = Document()
+        for paragraph in paragraphs:
+            document.add_paragraph(paragraph)
+        path = str(tmp_path / name)
+        document.save(path)
+        return path
+    return make
+
+class API:
+    """The API routes reloaded into the current test directory, called in-process over httpx"""
+
+    def __init__(self):
+        from app.api import routes
+        self.routes = importlib.reload(routes)
+        self.app = FastAPI()
+        self.app.include_router(self.routes.router, prefix="/api")
+
+    def request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        async def send():
+            transport = httpx.ASGITransport(app=self.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                return await client.request(method, url, **kwargs)
+        return asyncio.run(send())
+
+@pytest.fixture
+def api(isolated, monkeypatch):
+    """Routes with their stores (and the CV index) in this test's directory"""
+    monkeypatch.setenv("CV_INDEX_ENABLED", "true")
+    monkeypatch.setattr("app.services.cv_index._cv_index", None)
+    return API()
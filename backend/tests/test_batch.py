@@ -0,0 +1,99 @@
+import asyncio
+import os
+from app.services.batch_provider import LocalBatchProvider
+from app.services.cv_matcher import CVMatcher
+
+REQUIREMENTS = "Backend engineer.\nMust have Python, Docker and PostgreSQL."
+
+CVS = {
+    "strong.docx": "Backend developer with 8 years of Python, Docker and PostgreSQL in production systems.",
+    "partial.docx": "Software developer writing Python scripts and maintaining reporting databases for finance teams.",
+    "unrelated.docx": "Graphic designer producing brand identities, print layouts and illustrations for agencies.",
+}
+
+
+class CountingProvider(LocalBatchProvider):
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.submitted = 0
+
+    async def submit(self, input_path):
+        self.submitted += 1
+        return await super().submit(input_path)
+
+
+def batch_matcher(provider: LocalBatchProvider) -> CVMatcher:
+    matcher = CVMatcher()
+    matcher.batch_provider = provider
+    matcher.batch_poll_interval = 0.01
+    return matcher
+
+
+def make_files(make_cv):
+    return [(make_cv(name, text), name, ".docx") for name, text in CVS.items()]
+
+
+def test_batch_mode_scores_like_interactive_calls(make_cv):
+    files = make_files(make_cv)
+    provider = CountingProvider()
+    events = []
+
+    batched = asyncio.run(batch_matcher(provider).process_cv_files(
+        files, REQUIREMENTS, progress_callback=lambda *event: events.append(event), batch_mode=True
+    ))
+    interactive = asyncio.run(CVMatcher().process_cv_files(files, REQUIREMENTS))
+
+    assert provider.submitted == 1
+    assert [(result.filename, result.match_percentage) for result in batched] == \
+        [(result.filename, result.match_percentage) for result in interactive]
+    assert batched[0].filename == "strong.docx"
+    assert all(result.summary.startswith("Stub analysis") for result in batched)
+    assert {event[0] for event in events if event[1] == "completed"} == set(CVS)
+    # Input, output and submission marker are removed once the results are in
+    assert [name for name in os.listdir(os.path.join("cache", "batches")) if name.endswith((".jsonl", ".json"))] == []
+
+
+def test_failed_requests_become_error_results(make_cv):
+    async def complete(body):
+        if "Graphic designer" in body["messages"][-1]["content"]:
+            raise RuntimeError("model overloaded")
+        return await LocalBatchProvider()._call(body)
+
+    results = asyncio.run(batch_matcher(LocalBatchProvider(complete=complete)).process_cv_files(
+        make_files(make_cv), REQUIREMENTS, batch_mode=True
+    ))
+
+    failed = results[-1]
+    assert failed.filename == "unrelated.docx"
+    assert failed.summary == "Error processing CV: model overloaded"
+    assert all(result.summary.startswith("Stub analysis") for result in results[:-1])
+
+
+def submitted() -> bool:
+    directory = os.path.join("cache", "batches")
+    return os.path.isdir(directory) and any(name.endswith(".batch.json") for name in os.listdir(directory))
+
+
+def test_restarted_batch_resumes_instead_of_resubmitting(make_cv):
+    files = make_files(make_cv)
+
+    async def never(body):
+        await asyncio.Event().wait()
+
+    async def interrupted():
+        # The process stops while the provider is still working on the batch
+        task = asyncio.ensure_future(batch_matcher(CountingProvider(complete=never)).process_cv_files(
+            files, REQUIREMENTS, batch_mode=True
+        ))
+        while not submitted():
+            await asyncio.sleep(0.01)
+        task.cancel()
+
+    asyncio.run(interrupted())
+    assert submitted()
+    provider = CountingProvider()
+    results = asyncio.run(batch_matcher(provider).process_cv_files(files, REQUIREMENTS, batch_mode=True))
+
+    assert provider.submitted == 0
+    assert results[0].filename == "strong.docx"
+    assert all(result.summary.startswith("Stub analysis") for result in results)
@@ -0,0 +1,46 @@
+import asyncio
+from app.services.cache import AnalysisCache, TextCache, analysis_cache_version
+
+CV = "Jane Doe\nPython developer"
+
+
+def test_key_ignores_whitespace_noise():
+    cache = AnalysisCache(directory="analysis", model="m")
+    assert cache.make_key(CV, "Python") == cache.make_key("  Jane   Doe Python\tdeveloper ", "Python ")
+    assert cache.make_key(CV, "Python") != cache.make_key(CV, "Java")
+
+
+def test_key_depends_on_model_and_prompt_version():
+    base = AnalysisCache(directory="analysis", model="m", version="a").make_key(CV, "Python")
+    assert AnalysisCache(directory="analysis", model="other", version="a").make_key(CV, "Python") != base
+    assert AnalysisCache(directory="analysis", model="m", version="b").make_key(CV, "Python") != base
+
+
+def test_version_tracks_compaction_settings(monkeypatch):
+    monkeypatch.setenv("PROMPT_TOKEN_BUDGET", "6000")
+    default = analysis_cache_version()
+    monkeypatch.setenv("PROMPT_TOKEN_BUDGET", "2000")
+    smaller = analysis_cache_version()
+    monkeypatch.setenv("COMPACTION_ENABLED", "false")
+    disabled = analysis_cache_version()
+    assert len({default, smaller, disabled}) == 3
+
+
+def test_analysis_round_trip():
+    cache = AnalysisCache(directory="analysis", model="m")
+
+    async def run():
+        assert await cache.get(CV, "Python") is None
+        await cache.set(CV, "Python", {"match_percentage": 80})
+        return await cache.get(CV, "Python")
+
+    assert asyncio.run(run()) == {"match_percentage": 80}
+    assert cache.stats() == {"hits": 1, "misses": 1, "hit_rate": 0.5}
+
+
+def test_text_cache_is_versioned():
+    async def run():
+        await TextCache(directory="text", version="1").set("hash", "old text")
+        return await TextCache(directory="text", version="1").get("hash"), await TextCache(directory="text", version="2").get("hash")
+
+    assert asyncio.run(run()) == ("old text", None)
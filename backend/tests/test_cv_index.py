@@ -0,0 +1,84 @@
+import asyncio
+import os
+import time
+from app.services.cv_index import CVIndex
+
+BACKEND = "Backend developer, 8 years of Python and Docker. MSc in Computer Science. Speaks English and German."
+DATA = "Data analyst with 3 years of Python, SQL and Tableau. BSc in Statistics. Speaks English."
+DESIGN = "Graphic designer producing brand identities and print layouts. Diploma in Visual Arts. Speaks French."
+
+
+def make_index() -> CVIndex:
+    index = CVIndex()
+    for content_hash, text in (("backend", BACKEND), ("data", DATA), ("design", DESIGN)):
+        index.add(content_hash, f"{content_hash}.pdf", text)
+    return index
+
+
+def test_search_ranks_indexed_cvs():
+    index = make_index()
+
+    hits = index.search("python docker")
+    assert [hit["content_hash"] for hit in hits] == ["backend", "data"]
+    assert hits[0]["score"] > hits[1]["score"]
+    assert hits[0]["years_of_experience"] == 8
+    assert hits[0]["education_level"] == "master"
+    assert hits[0]["languages"] == ["English", "German"]
+
+
+def test_search_filters_on_extracted_fields():
+    index = make_index()
+
+    assert [hit["content_hash"] for hit in index.search("python", min_years=5)] == ["backend"]
+    assert [hit["content_hash"] for hit in index.search("python", education_level="master")] == ["backend"]
+    assert [hit["content_hash"] for hit in index.search("speaks", language="french")] == ["design"]
+
+
+def test_adding_is_idempotent_and_removal_drops_postings():
+    index = make_index()
+    postings = index.stats()["postings"]
+
+    assert index.add("backend", "again.pdf", BACKEND) is False
+    assert index.get("backend")["text"] == BACKEND
+    index.remove("backend")
+
+    assert "backend" not in index
+    assert [hit["content_hash"] for hit in index.search("python docker")] == ["data"]
+    assert index.stats()["documents"] == 2
+    assert index.stats()["postings"] < postings
+    assert index.missing(["backend", "data"]) == ["backend"]
+
+
+def store_cv(routes, file_id: str, text: str, uploaded_at: float = None) -> str:
+    path = os.path.join("file_storage", "blobs", f"{file_id}.pdf")
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(b"%PDF")
+    routes.file_store.add_blob_reference(file_id, path, f"{file_id}.pdf", file_id, size=4, uploaded_at=uploaded_at)
+    routes.cv_index.add(file_id, f"{file_id}.pdf", text)
+    return path
+
+
+def test_search_route_returns_stored_cvs(api):
+    store_cv(api.routes, "backend", BACKEND)
+    os.remove(store_cv(api.routes, "data", DATA))
+
+    response = api.request("GET", "/api/index/search", params={"q": "python docker"})
+    assert response.status_code == 200
+    # The data CV's file is gone from disk, so only the backend CV can be screened
+    assert [hit["file_id"] for hit in response.json()["results"]] == ["backend"]
+    assert "path" not in response.json()["results"][0]
+
+    assert api.request("GET", "/api/index/search", params={"q": " "}).status_code == 400
+    assert api.request("GET", "/api/index/search", params={"q": "python", "education_level": "wizard"}).status_code == 400
+
+
+def test_janitor_removal_drops_the_index_entry(api):
+    store_cv(api.routes, "old", BACKEND, uploaded_at=time.time() - 365 * 24 * 3600)
+    store_cv(api.routes, "new", DATA)
+
+    reclaimed = asyncio.run(api.routes.janitor.sweep())
+
+    assert reclaimed["files"] == 1
+    assert "old" not in api.routes.cv_index
+    assert "new" in api.routes.cv_index
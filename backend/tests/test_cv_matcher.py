@@ -0,0 +1,148 @@
+import time
+import asyncio
+from app.services.cv_matcher import CVMatcher
+
+REQUIREMENTS = "Senior backend engineer for our platform team.\nMust have Python, Docker and PostgreSQL.\nNice to have Kubernetes."
+
+CVS = {
+    "strong.docx": "Backend developer with 8 years of Python, Docker, PostgreSQL and Kubernetes in production systems.",
+    "partial.docx": "Software developer writing Python scripts and maintaining PostgreSQL reporting databases for finance teams.",
+    "unrelated.docx": "Graphic designer producing brand identities, print layouts and illustrations for agencies and publishers.",
+}
+
+
+def screen(make_cv, **options):
+    files = [(make_cv(name, text), name, ".docx") for name, text in CVS.items()]
+    return asyncio.run(CVMatcher().process_cv_files(files, REQUIREMENTS, **options))
+
+
+def fake_processing(matcher: CVMatcher, seconds: dict):
+    """Replace per-file processing with a sleep of seconds[filename]; returns the peak number in flight"""
+    state = {"in_flight": 0, "peak": 0}
+
+    async def process(file_path, filename, extension, requirements, progress_callback=None, content_hash=None):
+        state["in_flight"] += 1
+        state["peak"] = max(state["peak"], state["in_flight"])
+        try:
+            await asyncio.sleep(seconds[filename])
+        finally:
+            state["in_flight"] -= 1
+        result = CVMatcher._error_result(filename, "Analyzed", "None")
+        result.match_percentage = float(filename.split(".")[0][-1]) * 10
+        return result
+
+    matcher._process_single_file = process
+    return state
+
+
+def test_concurrency_is_bounded_and_results_are_ranked():
+    matcher = CVMatcher(max_concurrency=2)
+    names = [f"cv{index}.docx" for index in range(6)]
+    state = fake_processing(matcher, {name: 0.05 for name in names})
+    delivered = []
+
+    results = asyncio.run(matcher.process_cv_files(
+        [(name, name, ".docx") for name in names], REQUIREMENTS, result_callback=delivered.append,
+        file_ids=[f"id-{name}" for name in names]
+    ))
+
+    assert state["peak"] == 2
+    assert [result.match_percentage for result in results] == [50, 40, 30, 20, 10, 0]
+    assert sorted(result.filename for result in delivered) == names
+    assert all(result.file_id == f"id-{result.filename}" for result in results)
+
+
+def test_file_timeout_becomes_an_error_result():
+    matcher = CVMatcher(max_concurrency=4, file_timeout=0.2)
+    fake_processing(matcher, {"cv1.docx": 0.01, "cv2.docx": 5, "cv3.docx": 0.01})
+    events = []
+
+    started = time.monotonic()
+    results = asyncio.run(matcher.process_cv_files(
+        [(name, name, ".docx") for name in ("cv1.docx", "cv2.docx", "cv3.docx")], REQUIREMENTS,
+        progress_callback=lambda *event: events.append(event)
+    ))
+
+    assert time.monotonic() - started < 2
+    assert [result.filename for result in results] == ["cv3.docx", "cv1.docx", "cv2.docx"]
+    assert results[-1].match_percentage == 0
+    assert results[-1].summary.startswith("Error processing CV: Timed out")
+    assert [event[:3] for event in events] == [("cv2.docx", "error", 100)]
+
+
+def test_progress_reaches_completion_for_every_file(make_cv):
+    files = [(make_cv(name, text), name, ".docx") for name, text in CVS.items()]
+    events = []
+
+    asyncio.run(CVMatcher().process_cv_files(files, REQUIREMENTS, progress_callback=lambda *event: events.append(event)))
+
+    for name in CVS:
+        progress = [(status, value) for filename, status, value, _ in events if filename == name]
+        assert progress[-1] == ("completed", 100)
+        assert [value for _, value in progress] == sorted(value for _, value in progress)
+        assert "error" not in [status for status, _ in progress]
+
+
+def test_prefilter_scores_the_rest_with_the_skill_engine(make_cv):
+    results = {result.filename: result for result in screen(make_cv, prefilter_top_n=1)}
+
+    assert "Scored locally" not in results["strong.docx"].summary
+    for name in ("partial.docx", "unrelated.docx"):
+        result = results[name]
+        assert "not shortlisted" in result.summary
+        assert result.match_percentage == result.local_skills_match
+        # Only requested skills are reported missing, never filler words from the requirements
+        assert set(result.required_skills_missing) <= {"python", "docker", "postgresql", "kubernetes"}
+    assert results["unrelated.docx"].match_percentage == 0
+    assert 0 < results["partial.docx"].match_percentage < 100
+    assert "docker" in results["partial.docx"].required_skills_missing
+
+
+def test_prefilter_threshold_uses_the_skill_scale(make_cv):
+    results = {result.filename: result for result in screen(make_cv, prefilter_threshold=40)}
+
+    assert "not shortlisted" not in results["strong.docx"].summary
+    assert "not shortlisted" in results["partial.docx"].summary
+    assert "not shortlisted" in results["unrelated.docx"].summary
+
+
+def test_fast_mode_matches_prefilter_local_scores(make_cv):
+    fast = {result.filename: result for result in screen(make_cv, fast_mode=True)}
+    prefiltered = {result.filename: result for result in screen(make_cv, prefilter_top_n=1)}
+
+    assert fast["strong.docx"].match_percentage > fast["partial.docx"].match_percentage
+    assert fast["strong.docx"].required_skills_missing == []
+    for name in ("partial.docx", "unrelated.docx"):
+        assert fast[name].match_percentage == prefiltered[name].match_percentage
+        assert fast[name].required_skills_missing == prefiltered[name].required_skills_missing
+
+
+def test_fast_mode_without_known_skills_ranks_by_keywords(make_cv):
+    files = [(make_cv(name, text), name, ".docx") for name, text in CVS.items()]
+    results = asyncio.run(CVMatcher().process_cv_files(
+        files, "Backend developer for production systems and reporting databases", fast_mode=True
+    ))
+
+    assert [result.filename for result in results][0] == "strong.docx"
+    assert results[0].match_percentage > results[-1].match_percentage
+    assert all("keyword match" in result.summary and "fast mode" in result.summary for result in results)
+    assert results[-1].filename == "unrelated.docx" and results[-1].required_skills_missing == []
+
+
+def test_indexed_text_is_not_extracted_again(make_cv, monkeypatch):
+    monkeypatch.setenv("CV_INDEX_ENABLED", "true")
+    monkeypatch.setattr("app.services.cv_index._cv_index", None)
+    name, text = "strong.docx", CVS["strong.docx"]
+    files = [(make_cv(name, text), name, ".docx")]
+    hashes = {files[0][0]: "a" * 64}
+    first = asyncio.run(CVMatcher().process_cv_files(files, REQUIREMENTS, content_hashes=hashes))
+
+    matcher = CVMatcher()
+
+    async def fail(*args):
+        raise AssertionError("indexed CV was parsed again")
+
+    monkeypatch.setattr(matcher.file_processor, "extract_text", fail)
+    again = asyncio.run(matcher.process_cv_files(files, REQUIREMENTS, content_hashes=hashes))
+
+    assert again[0].match_percentage == first[0].match_percentage
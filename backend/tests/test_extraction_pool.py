@@ -0,0 +1,42 @@
+import asyncio
+import os
+import time
+import pytest
+from app.services.extraction_pool import ExtractionPool
+
+
+def sleep_and_report(seconds: float) -> int:
+    time.sleep(seconds)
+    return os.getpid()
+
+
+def test_timeout_only_retires_the_pool_after_running_work_finishes():
+    pool = ExtractionPool(max_workers=2, timeout=3)
+
+    async def run():
+        # Start both workers
+        first_pids = set(await asyncio.gather(pool.run(sleep_and_report, 0.2), pool.run(sleep_and_report, 0.2)))
+        shared = pool._executor
+
+        hung = asyncio.ensure_future(pool.run(sleep_and_report, 30))
+        await asyncio.sleep(1.5)
+        # Still running on the shared pool when the other task times out (well within its own timeout)
+        slow = asyncio.ensure_future(pool.run(sleep_and_report, 2))
+        with pytest.raises(TimeoutError):
+            await hung
+        assert pool._executor is None
+        # New work goes to a fresh pool while the retired one finishes its running task
+        fresh_pid = await pool.run(sleep_and_report, 0)
+        slow_pid = await slow
+        return first_pids, shared, fresh_pid, slow_pid
+
+    try:
+        first_pids, shared, fresh_pid, slow_pid = asyncio.run(run())
+    finally:
+        pool.shutdown()
+
+    assert slow_pid in first_pids
+    assert fresh_pid not in first_pids
+    # The retired pool (with the hung worker) was killed once its last task completed
+    assert shared not in pool._active
+    assert all(not process.is_alive() for process in (shared._processes or {}).values())
@@ -0,0 +1,89 @@
+import os
+import threading
+from app.services.file_store import FileStore
+
+def add(store: FileStore, file_id: str, content_hash: str = "abc") -> str:
+    return store.add_blob_reference(file_id, f"blobs/{file_id}.pdf", f"{file_id}.pdf", content_hash, size=100)
+
+
+def test_duplicate_uploads_share_one_blob():
+    store = FileStore()
+    first = add(store, "one")
+    second = add(store, "two")
+
+    assert first == second == "blobs/one.pdf"
+    assert store.totals() == {"files": 2, "blobs": 1, "bytes": 100}
+
+
+def test_blob_is_released_with_its_last_reference():
+    store = FileStore()
+    add(store, "one")
+    add(store, "two")
+
+    assert store.delete("one") is None
+    assert store.get("two")['path'] == "blobs/one.pdf"
+    assert store.delete("two") == "blobs/one.pdf"
+    assert store.delete("two") is None
+    assert store.totals() == {"files": 0, "blobs": 0, "bytes": 0}
+
+
+def test_reupload_after_delete_creates_a_new_blob():
+    store = FileStore()
+    add(store, "one")
+    assert store.delete("one") == "blobs/one.pdf"
+
+    assert add(store, "again") == "blobs/again.pdf"
+    assert store.totals() == {"files": 1, "blobs": 1, "bytes": 100}
+
+
+def link_from(source: str):
+    def materialize(path: str):
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.link(source, path)
+    return materialize
+
+
+def remove(path: str):
+    if os.path.exists(path):
+        os.remove(path)
+
+
+def test_missing_blob_is_recreated_on_reupload(tmp_path):
+    source = tmp_path / "upload.pdf"
+    source.write_bytes(b"%PDF")
+    store = FileStore()
+    path = store.add_blob_reference("one", str(tmp_path / "blobs" / "abc.pdf"), "one.pdf", "abc", materialize=link_from(str(source)))
+    os.remove(path)
+
+    assert store.add_blob_reference("two", "ignored.pdf", "two.pdf", "abc", materialize=link_from(str(source))) == path
+    assert os.path.exists(path)
+
+
+def test_reupload_waits_for_a_blob_being_released(tmp_path):
+    source = tmp_path / "upload.pdf"
+    source.write_bytes(b"%PDF")
+    blob_path = str(tmp_path / "blobs" / "abc.pdf")
+    store = FileStore()
+    store.add_blob_reference("one", blob_path, "one.pdf", "abc", materialize=link_from(str(source)))
+    state = {}
+
+    def reupload():
+        state["path"] = store.add_blob_reference("two", blob_path, "two.pdf", "abc", materialize=link_from(str(source)))
+
+    def release(path: str):
+        # The same contents are uploaded again while the janitor is removing the old blob
+        state["thread"] = threading.Thread(target=reupload)
+        state["thread"].start()
+        state["thread"].join(0.3)
+        state["blocked"] = state["thread"].is_alive()
+        os.remove(path)
+
+    assert store.delete("one", release=release) == blob_path
+    state["thread"].join()
+
+    # The upload waited for the removal, then wrote a fresh blob for its reference
+    assert state["blocked"]
+    assert state["path"] == blob_path
+    assert os.path.exists(blob_path)
+    assert store.totals() == {"files": 1, "blobs": 1, "bytes": 0}
@@ -0,0 +1,70 @@
+import asyncio
+import os
+import time
+from app.services.file_store import FileStore
+from app.services.janitor import StorageJanitor
+
+DAY = 24 * 3600
+
+
+def make_janitor(store: FileStore) -> StorageJanitor:
+    return StorageJanitor(store, "file_storage", "uploads", ttl_seconds=DAY, max_bytes=0, upload_stale_seconds=0)
+
+
+def store_old_file(store: FileStore, file_id: str) -> str:
+    path = os.path.join("file_storage", "blobs", f"{file_id}.pdf")
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(b"%PDF")
+    store.add_blob_reference(file_id, path, f"{file_id}.pdf", file_id, size=4, uploaded_at=time.time() - 2 * DAY)
+    return path
+
+
+def test_pins_are_honoured_by_other_processes():
+    store = FileStore()
+    path = store_old_file(store, "cv")
+    # Two worker processes: one is using the file while the other sweeps
+    worker, sweeper = make_janitor(store), make_janitor(store)
+
+    async def run():
+        await worker.pin(["cv"])
+        await worker.pin(["cv"])
+        first = await sweeper.sweep()
+        await worker.unpin(["cv"])
+        second = await sweeper.sweep()
+        await worker.unpin(["cv"])
+        third = await sweeper.sweep()
+        return first, second, third
+
+    first, second, third = asyncio.run(run())
+    assert first["files"] == second["files"] == 0
+    assert third["files"] == 1
+    assert not os.path.exists(path)
+    assert "cv" not in store
+
+
+def test_pins_of_a_dead_process_expire():
+    store = FileStore()
+    store_old_file(store, "cv")
+    store.pin("dead-process", ["cv"], expires_at=time.time() - 1)
+
+    reclaimed = asyncio.run(make_janitor(store).sweep())
+    assert reclaimed["files"] == 1
+    assert store.pinned_file_ids() == set()
+
+
+def test_databases_are_never_swept():
+    store = FileStore()
+    janitor = make_janitor(store)
+    janitor.add_protected_path(os.path.join("file_storage", "jobs.db"))
+    old = time.time() - 2 * DAY
+    for name in ("metadata.db", "metadata.db-wal", "jobs.db", "jobs.db-shm", "orphan.pdf"):
+        path = os.path.join("file_storage", name)
+        if not os.path.exists(path):
+            open(path, "wb").close()
+        os.utime(path, (old, old))
+
+    asyncio.run(janitor.sweep())
+    remaining = set(os.listdir("file_storage"))
+    assert "orphan.pdf" not in remaining
+    assert {"metadata.db", "metadata.db-wal", "jobs.db", "jobs.db-shm"} <= remaining
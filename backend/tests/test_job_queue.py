@@ -0,0 +1,123 @@
+import asyncio
+import time
+import threading
+from app.models import CVMatchResult
+from app.services.job_queue import JobQueue, JobRunner
+
+def job_files(paths):
+    return [
+        {'file_id': f"file-{index}", 'filename': path.rsplit("/", 1)[-1], 'path': path, 'extension': '.docx', 'content_hash': None}
+        for index, path in enumerate(paths)
+    ]
+
+def result_for(file_id: str, summary: str) -> CVMatchResult:
+    return CVMatchResult(
+        filename=f"{file_id}.docx", file_id=file_id, match_percentage=50, skills_match=50, experience_match=50,
+        education_match=50, overall_match=50, summary=summary, strengths=[], weaknesses=[],
+        skill_breakdown=[], required_skills_missing=[]
+    )
+
+def expire_lease(queue: JobQueue, job_id: str):
+    queue._connect().execute("UPDATE jobs SET lease_expires_at = ? WHERE job_id = ?", (time.time() - 1, job_id))
+
+
+def run_until_final(queue: JobQueue, job_id: str):
+    async def run():
+        runner = JobRunner(queue, workers=1, poll_interval=0.05)
+        runner.start()
+        try:
+            for _ in range(200):
+                if queue.get(job_id)['status'] in ("completed", "failed"):
+                    break
+                await asyncio.sleep(0.05)
+        finally:
+            await runner.stop()
+
+    asyncio.run(run())
+
+
+def test_checkpoint_is_idempotent():
+    queue = JobQueue()
+    job_id = queue.submit("python", job_files(["/a.docx", "/b.docx"]))
+    queue.claim_next("worker")
+    queue.checkpoint(job_id, result_for("file-0", "first"))
+    queue.checkpoint(job_id, result_for("file-0", "again"))
+
+    assert queue.get(job_id)['completed'] == 1
+    assert [result.summary for result in queue.results(job_id)] == ["first"]
+    assert [f['file_id'] for f in queue.pending_files(job_id)] == ["file-1"]
+
+
+def test_expired_lease_is_claimed_by_another_worker():
+    queue = JobQueue(lease_seconds=60)
+    job_id = queue.submit("python", job_files(["/a.docx"]))
+    assert queue.claim_next("dead")['job_id'] == job_id
+    # A live lease keeps the job away from other workers
+    assert queue.claim_next("other") is None
+
+    expire_lease(queue, job_id)
+    assert queue.claim_next("other")['job_id'] == job_id
+    # The crashed worker lost ownership and can neither renew nor finish the job
+    assert not queue.renew_lease(job_id, "dead")
+    assert not queue.finish(job_id, "dead", "completed")
+
+
+def test_runner_resumes_crashed_job_from_checkpoints(make_cv):
+    paths = [
+        make_cv(f"cv{index}.docx", f"Candidate {index} is a Python developer with Docker and PostgreSQL experience building web services.")
+        for index in range(3)
+    ]
+    queue = JobQueue(lease_seconds=60)
+    job_id = queue.submit("Python and Docker", job_files(paths))
+
+    # A worker claims the job, checkpoints one file and dies
+    queue.claim_next("dead")
+    queue.checkpoint(job_id, result_for("file-0", "scored before the crash"))
+    expire_lease(queue, job_id)
+
+    run_until_final(queue, job_id)
+
+    job = queue.get(job_id)
+    assert job['status'] == 'completed'
+    assert job['completed'] == 3
+    results = queue.results(job_id)
+    # The checkpointed file was not analyzed again
+    assert results[0].file_id == "file-0"
+    assert results[0].summary == "scored before the crash"
+    assert sorted(result.file_id for result in results[1:]) == ["file-1", "file-2"]
+    assert queue.pending_files(job_id) == []
+
+
+def test_checkpoints_are_written_off_the_event_loop(make_cv):
+    loop_threads = set()
+    checkpoint_threads = set()
+
+    class RecordingQueue(JobQueue):
+        def checkpoint(self, job_id, result):
+            checkpoint_threads.add(threading.get_ident())
+            super().checkpoint(job_id, result)
+
+    queue = RecordingQueue()
+    paths = [make_cv(f"cv{index}.docx", f"Candidate {index}: Python developer with Docker experience on web services.") for index in range(2)]
+    job_id = queue.submit("Python", job_files(paths))
+    loop_threads.add(threading.get_ident())
+    run_until_final(queue, job_id)
+
+    assert queue.get(job_id)['status'] == 'completed'
+    assert len(queue.results(job_id)) == 2
+    assert checkpoint_threads and not checkpoint_threads & loop_threads
+
+
+def test_failed_checkpoint_fails_the_job(make_cv):
+    class BrokenQueue(JobQueue):
+        def checkpoint(self, job_id, result):
+            raise RuntimeError("disk full")
+
+    queue = BrokenQueue()
+    path = make_cv("cv.docx", "Candidate: Python developer with Docker experience on web services.")
+    job_id = queue.submit("Python", job_files([path]))
+    run_until_final(queue, job_id)
+
+    job = queue.get(job_id)
+    assert job['status'] == 'failed'
+    assert "disk full" in job['error']
@@ -0,0 +1,48 @@
+import asyncio
+import os
+from app.services.latency_stats import DEFAULT_SECONDS, LatencyStats, longest_first
+
+
+def test_quantiles_fall_back_to_pooled_then_default():
+    stats = LatencyStats(window=10, path="")
+    assert stats.quantile("llm", "<2k") == DEFAULT_SECONDS["llm"]
+    for seconds in (1, 2, 3):
+        stats.record("llm", "<2k", seconds)
+    # Too few samples for the key itself: the phase-wide window answers
+    assert stats.quantile("llm", "<2k") == 2
+    for seconds in (10, 10, 10):
+        stats.record("llm", "<2k", seconds)
+    assert stats.quantile("llm", "<2k") == 6.5
+    assert stats.quantile("llm", "<8k") == 6.5
+
+
+def test_save_and_load_round_trip(tmp_path):
+    path = str(tmp_path / "stats" / "latency.json")
+    stats = LatencyStats(window=10, path=path)
+    stats.record("extraction", ".pdf:<64KB", 0.5)
+    stats.save()
+
+    assert LatencyStats(window=10, path=path).snapshot() == stats.snapshot()
+    # Only the target file is left behind (no shared or stray temporary files)
+    assert os.listdir(tmp_path / "stats") == ["latency.json"]
+
+
+def test_saves_periodically_while_running(tmp_path, monkeypatch):
+    monkeypatch.setenv("LATENCY_SAVE_INTERVAL", "0.05")
+    path = str(tmp_path / "latency.json")
+    stats = LatencyStats(path=path)
+
+    async def run():
+        stats.start()
+        stats.record("parse", "<2k", 0.01)
+        await asyncio.sleep(0.2)
+        saved = os.path.exists(path)
+        await stats.stop()
+        return saved
+
+    assert asyncio.run(run())
+    assert LatencyStats(path=path).quantile("parse", "<2k") == 0.01
+
+
+def test_longest_first():
+    assert longest_first([1.0, 5.0, 3.0]) == [1, 2, 0]
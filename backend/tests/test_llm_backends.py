@@ -0,0 +1,60 @@
+import asyncio
+import pytest
+from app.services.llm_backends import StubBackend, StubBackendError, create_backend
+from app.services.llm_service import LLMService, PARSE_ERROR_SUMMARY
+from app.services.prompt_builder import PromptBuilder
+
+CV_TEXT = "Backend developer building Python services packaged with Docker."
+
+
+def body(requirements: str = "Must have Python and Kubernetes") -> dict:
+    return {"messages": PromptBuilder().single(CV_TEXT, requirements)}
+
+
+def test_stub_answers_from_the_prompt():
+    backend = StubBackend(distribution="fixed", median=0)
+
+    completion = asyncio.run(backend.complete(body()))
+    analysis = LLMService.parse_analysis(completion.content)
+
+    assert [item["skill_name"] for item in analysis["skill_breakdown"]] == ["python", "kubernetes"]
+    assert analysis["skills_match"] == 50.0
+    assert analysis["required_skills_missing"] == ["kubernetes"]
+    assert completion.prompt_tokens > 0 and completion.completion_tokens > 0
+
+
+def test_stub_is_deterministic_for_identical_prompts():
+    first = asyncio.run(StubBackend(distribution="fixed", median=0, seed=1).complete(body()))
+    second = asyncio.run(StubBackend(distribution="fixed", median=0, seed=2).complete(body()))
+    assert first.content == second.content
+
+
+def test_stub_latency_distributions():
+    assert StubBackend(distribution="fixed", median=0.5).latency() == 0.5
+    uniform = StubBackend(distribution="uniform", median=1, spread=0.2, seed=1)
+    assert all(0.8 <= uniform.latency() <= 1.2 for _ in range(100))
+    lognormal = StubBackend(distribution="lognormal", median=1, spread=0.5, seed=1)
+    assert all(latency > 0 for latency in (lognormal.latency() for _ in range(100)))
+    with pytest.raises(ValueError):
+        StubBackend(distribution="pareto")
+
+
+def test_stub_failures():
+    with pytest.raises(StubBackendError) as error:
+        asyncio.run(StubBackend(distribution="fixed", median=0, error_rate=1).complete(body()))
+    assert error.value.status_code == 503
+
+    with pytest.raises(StubBackendError) as error:
+        asyncio.run(StubBackend(distribution="fixed", median=0, rate_limit_rate=1).complete(body()))
+    assert error.value.status_code == 429
+    assert error.value.response.headers["retry-after"] == "1"
+
+    invalid = StubBackend(distribution="fixed", median=0, invalid_json_rate=1)
+    analysis = asyncio.run(LLMService(invalid).analyze_cv_match(CV_TEXT, "Must have Python"))
+    assert analysis["summary"] == PARSE_ERROR_SUMMARY
+
+
+def test_backend_is_selected_by_environment():
+    assert isinstance(create_backend(), StubBackend)
+    with pytest.raises(ValueError):
+        create_backend("unknown")
@@ -0,0 +1,99 @@
+import asyncio
+import pytest
+from app.services.llm_backends import ROLE_PATTERN, Completion, LLMBackend, StubBackend
+from app.services.llm_service import LLMService, PARSE_ERROR_SUMMARY
+from app.services.metrics import get_metrics
+
+
+class ReplyBackend(LLMBackend):
+    """Answers every request with the same message content"""
+
+    name = "reply"
+
+    def __init__(self, content: str):
+        self.content = content
+
+    async def complete(self, body):
+        return Completion(self.content, 10, 10)
+
+
+@pytest.mark.parametrize("content", [
+    '["a", "b"]',
+    '"text"',
+    "null",
+    "not json",
+    '{"skill_breakdown": [{"skill_name": "python", "match_percentage": "high"}]}',
+    '{"skill_breakdown": [{"skill_name": "python", "match_percentage": null}]}',
+])
+def test_replies_that_are_not_analyses_fall_back(content):
+    failures = get_metrics().parse_failures._values[()]
+
+    assert LLMService.parse_analysis(content)["summary"] == PARSE_ERROR_SUMMARY
+    analysis = asyncio.run(LLMService(ReplyBackend(content)).analyze_cv_match("CV text", "Python"))
+
+    assert analysis["summary"] == PARSE_ERROR_SUMMARY
+    assert get_metrics().parse_failures._values[()] == failures + 2
+
+
+def test_markdown_wrapped_object_is_parsed():
+    analysis = LLMService.parse_analysis('```json\n{"match_percentage": 70, "summary": "Good"}\n```')
+    assert analysis["match_percentage"] == 70
+    assert analysis["skill_breakdown"] == []
+
+
+class RecordingStub(StubBackend):
+    """Stub backend that records each request's role count and can reorder or drop roles"""
+
+    def __init__(self, reorder=None):
+        super().__init__(distribution="fixed", median=0)
+        self.reorder = reorder
+        self.role_counts = []
+
+    def respond(self, user):
+        self.role_counts.append(len(ROLE_PATTERN.findall(user)))
+        response = super().respond(user)
+        if self.reorder and "analyses" in response:
+            response["analyses"] = self.reorder(response["analyses"])
+        return response
+
+
+ROLES = ["Must have Python", "Must have Rust", "Must have Docker", "Must have Kotlin", "Must have Scala"]
+CV_TEXT = "Backend developer building Python services packaged with Docker."
+EXPECTED = [100.0, 0.0, 100.0, 0.0, 0.0]
+
+
+def analyze_multi(backend: StubBackend):
+    return asyncio.run(LLMService(backend).analyze_cv_match_multi(CV_TEXT, ROLES))
+
+
+def test_roles_are_grouped_by_batch_size(monkeypatch):
+    monkeypatch.setattr("app.services.llm_service.MULTI_ROLE_BATCH_SIZE", 2)
+    backend = RecordingStub()
+
+    analyses = analyze_multi(backend)
+
+    # Two multi-role calls of two roles each, the last role on its own
+    assert backend.role_counts == [2, 2, 0]
+    assert [analysis["skills_match"] for analysis in analyses] == EXPECTED
+    assert all("role" not in analysis for analysis in analyses)
+
+
+def test_analyses_are_mapped_by_role_number(monkeypatch):
+    monkeypatch.setattr("app.services.llm_service.MULTI_ROLE_BATCH_SIZE", 5)
+    backend = RecordingStub(reorder=lambda analyses: list(reversed(analyses)))
+
+    analyses = analyze_multi(backend)
+
+    assert backend.role_counts == [5]
+    assert [analysis["skills_match"] for analysis in analyses] == EXPECTED
+
+
+def test_skipped_roles_are_analyzed_on_their_own(monkeypatch):
+    monkeypatch.setattr("app.services.llm_service.MULTI_ROLE_BATCH_SIZE", 5)
+    # The model answers for roles 1, 2 and 4 only
+    backend = RecordingStub(reorder=lambda analyses: [analyses[0], analyses[1], analyses[3]])
+
+    analyses = analyze_multi(backend)
+
+    assert backend.role_counts == [5, 0, 0]
+    assert [analysis["skills_match"] for analysis in analyses] == EXPECTED
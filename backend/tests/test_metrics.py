@@ -0,0 +1,59 @@
+from app.services.metrics import Counter, Gauge, Histogram, PipelineMetrics, state_metrics
+
+
+def test_counter_and_gauge_exposition():
+    counter = Counter("requests_total", "Requests", ("outcome",))
+    counter.inc(outcome="ok")
+    counter.inc(2, outcome="ok")
+    gauge = Gauge("in_flight", "In flight")
+    gauge.inc()
+    gauge.dec(0.5)
+
+    assert counter.render() == [
+        "# HELP requests_total Requests",
+        "# TYPE requests_total counter",
+        'requests_total{outcome="ok"} 3',
+    ]
+    assert gauge.render()[-1] == "in_flight 0.5"
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram("seconds", "Duration", buckets=(0.1, 1))
+    for value in (0.05, 0.1, 0.5, 5):
+        histogram.observe(value)
+
+    assert histogram.render()[2:] == [
+        'seconds_bucket{le="0.1"} 2',
+        'seconds_bucket{le="1"} 3',
+        'seconds_bucket{le="+Inf"} 4',
+        "seconds_sum 5.65",
+        "seconds_count 4",
+    ]
+
+
+def test_label_values_are_escaped():
+    counter = Counter("errors_total", "Errors", ("message",))
+    counter.inc(message='say "hi"\n')
+    assert counter.render()[-1] == 'errors_total{message="say \\"hi\\"\\n"} 1'
+
+
+def test_render_includes_state_metrics():
+    state = state_metrics(
+        {"analysis": {"hits": 3, "misses": 1, "hit_rate": 0.75}, "text": None},
+        {"files": 2, "blobs": 1, "bytes": 1024},
+        {"completed": 4},
+        {"waiting": 0, "retries": 1, "rate_limited": 1, "failures": 0}
+    )
+    text = PipelineMetrics().render(state)
+
+    assert text.endswith("\n")
+    assert 'cvfilter_cache_hit_ratio{cache="analysis"} 0.75' in text
+    assert 'cvfilter_jobs{status="queued"} 0' in text
+    assert 'cvfilter_jobs{status="completed"} 4' in text
+    assert "cvfilter_stored_bytes 1024" in text
+    # Every sample line belongs to a family declared with HELP and TYPE
+    families = {line.split()[2] for line in text.splitlines() if line.startswith("# TYPE")}
+    for line in text.splitlines():
+        if not line.startswith("#"):
+            name = line.split("{")[0].split()[0]
+            assert any(name == family or name.startswith(family + "_") for family in families)
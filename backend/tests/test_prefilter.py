@@ -0,0 +1,31 @@
+from app.services.prefilter import BM25Ranker, select_candidates, tokenize
+
+DOCUMENTS = [
+    "Python developer: Django, PostgreSQL, Docker and Kubernetes on AWS",
+    "Java engineer with Spring and Oracle",
+    "Python data analyst using pandas",
+]
+
+
+def test_tokenize_keeps_technology_names():
+    assert tokenize("Experience with C++, C#, Node.js and R.") == ["c++", "c#", "node.js", "r"]
+
+
+def test_bm25_ranks_matching_documents_first():
+    scores = BM25Ranker(DOCUMENTS).scores("Python, Docker and Kubernetes")
+    assert scores[0] > scores[2] > scores[1] == 0
+
+
+def test_coverage_is_bounded():
+    coverage = BM25Ranker(DOCUMENTS).coverage("Python Docker")
+    assert coverage[0]['percentage'] == 100.0
+    assert coverage[1] == {"percentage": 0.0, "matched": [], "missing": ["docker", "python"]}
+    assert 0 < coverage[2]['percentage'] < 100
+
+
+def test_select_candidates():
+    scores = [3.0, 0.0, 1.0]
+    percentages = [100.0, 0.0, 40.0]
+    assert select_candidates(scores, percentages, top_n=2) == [0, 2]
+    assert select_candidates(scores, percentages, threshold=50) == [0]
+    assert select_candidates(scores, percentages) == [0, 2, 1]
@@ -0,0 +1,149 @@
+import asyncio
+from app.models import ProgressUpdate
+from app.services.cv_matcher import CVMatcher
+from app.services.progress import ProgressBus, TopKRanking
+
+
+def update(filename: str, status: str, progress: float) -> ProgressUpdate:
+    return ProgressUpdate(filename=filename, status=status, progress=progress, current_step=f"{status} {progress}")
+
+
+def result(filename: str, score: float):
+    result = CVMatcher._error_result(filename, "Analyzed", "None")
+    result.match_percentage = score
+    return result
+
+
+def describe(item) -> tuple:
+    if isinstance(item, ProgressUpdate):
+        return (item.filename, item.status, item.progress)
+    return (item.filename, "result")
+
+
+def test_pending_updates_are_coalesced_per_file():
+    async def run():
+        bus = ProgressBus(min_interval=0)
+        for progress in (10, 20, 30):
+            bus.publish(update("a.pdf", "processing", progress))
+            bus.publish(update("b.pdf", "processing", progress + 1))
+        bus.close()
+        return [[describe(item) for item in batch] async for batch in bus.stream()]
+
+    assert asyncio.run(run()) == [[("a.pdf", "processing", 30), ("b.pdf", "processing", 31)]]
+
+
+def test_slow_consumer_gets_every_terminal_update_and_result_in_order():
+    async def produce(bus: ProgressBus):
+        for index in range(5):
+            name = f"cv{index}.pdf"
+            for progress in range(0, 100, 10):
+                bus.publish(update(name, "analyzing", progress))
+                await asyncio.sleep(0.001)
+            bus.publish(update(name, "completed", 100))
+            bus.publish_result(result(name, index))
+        bus.close()
+
+    async def consume(bus: ProgressBus):
+        received = []
+        async for batch in bus.stream():
+            received.extend(describe(item) for item in batch)
+            # Slower than the producer, so several files' updates pile up between reads
+            await asyncio.sleep(0.02)
+        return received
+
+    async def run():
+        bus = ProgressBus(min_interval=0)
+        _, received = await asyncio.gather(produce(bus), consume(bus))
+        return received
+
+    received = asyncio.run(run())
+    final = [item for item in received if item[1] != "analyzing"]
+    assert final == [item for index in range(5) for item in ((f"cv{index}.pdf", "completed", 100), (f"cv{index}.pdf", "result"))]
+    # Intermediate updates were dropped rather than queued
+    assert len(received) < 5 * 12
+
+
+def test_batches_are_throttled_until_close():
+    async def run():
+        bus = ProgressBus(min_interval=10)
+        batches = []
+
+        async def consume():
+            async for batch in bus.stream():
+                batches.append([describe(item) for item in batch])
+
+        consumer = asyncio.ensure_future(consume())
+        bus.publish(update("a.pdf", "processing", 10))
+        await asyncio.sleep(0.05)
+        bus.publish(update("a.pdf", "processing", 50))
+        bus.publish(update("a.pdf", "completed", 100))
+        await asyncio.sleep(0.05)
+        assert len(batches) == 1
+        # Closing ends the wait and flushes what accumulated
+        bus.close()
+        await asyncio.wait_for(consumer, timeout=1)
+        return batches
+
+    assert asyncio.run(run()) == [[("a.pdf", "processing", 10)], [("a.pdf", "completed", 100)]]
+
+
+def test_ranking_keeps_the_best_k():
+    ranking = TopKRanking(3)
+    entered = [ranking.add(result(f"cv{score}.pdf", score)) for score in (40, 90, 10, 70, 80, 20)]
+
+    assert entered == [True, True, True, True, True, False]
+    assert [item.match_percentage for item in ranking.top()] == [90, 80, 70]
+    assert len(ranking._heap) == 3
+
+
+def test_ranking_ties_keep_the_earlier_result():
+    ranking = TopKRanking(2)
+    for name in ("first.pdf", "second.pdf", "third.pdf"):
+        ranking.add(result(name, 50))
+
+    assert [item.filename for item in ranking.top()] == ["first.pdf", "second.pdf"]
+    assert ranking.add(result("better.pdf", 51))
+    assert [item.filename for item in ranking.top()] == ["better.pdf", "first.pdf"]
+
+
+def test_ranking_size_is_at_least_one():
+    ranking = TopKRanking(0)
+    ranking.add(result("a.pdf", 10))
+    ranking.add(result("b.pdf", 20))
+    assert [item.filename for item in ranking.top()] == ["b.pdf"]
+
+
+def test_idle_stream_yields_keepalive_batches():
+    async def run():
+        bus = ProgressBus(min_interval=0, keepalive_interval=0.05)
+        batches = []
+
+        async def consume():
+            async for batch in bus.stream():
+                batches.append([describe(item) for item in batch])
+
+        consumer = asyncio.ensure_future(consume())
+        await asyncio.sleep(0.13)
+        bus.publish(update("a.pdf", "completed", 100))
+        bus.close()
+        await asyncio.wait_for(consumer, timeout=1)
+        return batches
+
+    batches = asyncio.run(run())
+    assert batches[-1] == [("a.pdf", "completed", 100)]
+    assert len(batches) >= 2 and all(batch == [] for batch in batches[:-1])
+
+
+def test_matcher_reports_only_real_state_changes(make_cv, monkeypatch):
+    # A slow LLM call used to produce a synthetic progress tick every second
+    monkeypatch.setenv("LLM_STUB_LATENCY_MEDIAN", "1.2")
+    path = make_cv("cv.docx", "Backend developer with 8 years of Python, Docker and PostgreSQL in production systems.")
+    events = []
+
+    asyncio.run(CVMatcher().process_cv_files(
+        [(path, "cv.docx", ".docx")], "Must have Python", progress_callback=lambda *event: events.append(event)
+    ))
+
+    steps = [step for _, _, _, step in events]
+    assert len(steps) == len(set(steps)) == 4
+    assert events[-1][1:3] == ("completed", 100)
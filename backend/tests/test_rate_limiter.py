@@ -0,0 +1,85 @@
+import asyncio
+import pytest
+from app.services.llm_backends import StubBackendError
+from app.services.rate_limiter import RateLimiter, call_with_retries, retry_after_seconds
+
+def unlimited() -> RateLimiter:
+    return RateLimiter(requests_per_minute=0, tokens_per_minute=0, adaptive=True)
+
+
+def test_rate_limit_halves_rate_and_success_recovers_it():
+    limiter = unlimited()
+    limiter.on_rate_limited(None)
+    limiter.on_rate_limited(None)
+    assert limiter.rate_factor == 0.25
+
+    limiter.on_success()
+    assert limiter.rate_factor == pytest.approx(0.30)
+    for _ in range(100):
+        limiter.on_rate_limited(None)
+    assert limiter.rate_factor == limiter.min_rate_factor
+
+
+def test_retry_after_header():
+    assert retry_after_seconds(StubBackendError("busy", 429, retry_after=2.5)) == 2.5
+    assert retry_after_seconds(StubBackendError("busy", 503)) is None
+
+
+def test_retries_rate_limits_then_succeeds():
+    limiter = unlimited()
+    attempts = []
+
+    async def call():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise StubBackendError("rate limited", 429)
+        return "ok"
+
+    result = asyncio.run(call_with_retries(call, limiter, max_retries=5, base_delay=0.001, max_delay=0.01))
+    assert result == "ok"
+    assert len(attempts) == 3
+    assert limiter.retries == 2
+    assert limiter.rate_limited == 2
+    assert limiter.rate_factor == pytest.approx(0.25 + limiter.recovery_step)
+
+
+def test_client_errors_are_not_retried():
+    limiter = unlimited()
+    attempts = []
+
+    async def call():
+        attempts.append(1)
+        raise StubBackendError("bad request", 400)
+
+    with pytest.raises(StubBackendError):
+        asyncio.run(call_with_retries(call, limiter, max_retries=5, base_delay=0.001))
+    assert len(attempts) == 1
+    assert limiter.failures == 1
+
+
+def test_gives_up_after_max_retries():
+    limiter = unlimited()
+    attempts = []
+
+    async def call():
+        attempts.append(1)
+        raise StubBackendError("unavailable", 503)
+
+    with pytest.raises(StubBackendError):
+        asyncio.run(call_with_retries(call, limiter, max_retries=2, base_delay=0.001))
+    assert len(attempts) == 3
+    assert limiter.failures == 1
+
+
+def test_request_bucket_throttles():
+    # 600 requests per minute: the bucket starts full, then admits one request every 0.1s
+    limiter = RateLimiter(requests_per_minute=600, tokens_per_minute=0, adaptive=False)
+    limiter._requests = 0
+
+    async def run():
+        for _ in range(3):
+            await limiter.acquire()
+
+    asyncio.run(run())
+    assert limiter.requests_admitted == 3
+    assert limiter.throttled_seconds >= 0.2
@@ -0,0 +1,74 @@
+from app.services.prompt_builder import compile_requirements
+from app.services.skill_engine import SkillEngine
+
+REQUIREMENTS = """Senior Backend Engineer (Remote, UK)
+We build Software for the Platform team. Strong Python and FastAPI experience is required.
+Experience with GitHub Actions, S3 and SAP.
+Nice to have: Snowflake, Kubernetes, a CV in English and a BSc."""
+
+
+def test_skills_come_from_vocabulary_and_tool_names():
+    engine = SkillEngine(REQUIREMENTS)
+    assert set(engine.skills) == {"python", "fastapi", "github", "s3", "sap", "snowflake", "kubernetes"}
+
+
+def test_capitalized_words_are_not_skills():
+    skills = SkillEngine(
+        "Join our Platform group. Software Engineers work with Product Managers in Berlin.\n"
+        "- Excellent Communication\n"
+        "Requirements: Senior level, MSc or BSc, HR and CV screening tools"
+    ).skills
+    assert skills == ["communication"]
+
+
+def test_line_weights():
+    engine = SkillEngine(REQUIREMENTS)
+    weights = dict(zip(engine.skills, engine.weights))
+    assert weights["python"] == 1.5
+    assert weights["sap"] == 1.0
+    assert weights["kubernetes"] == 0.5
+
+
+def test_scores_saturate_with_mentions():
+    engine = SkillEngine("Must have Python and Docker")
+    scores = engine.score(["Python Python Python Docker Docker Docker", "Python", "Nothing relevant"])
+    assert list(scores["skills_match"]) == [100.0, 25.0, 0.0]
+    assert engine.missing(scores["counts"][1]) == ["docker"]
+
+
+def test_prompt_lists_only_real_skills():
+    block = compile_requirements(REQUIREMENTS).render()
+    key_skills = block.split("KEY SKILLS TO ASSESS:\n")[1].splitlines()
+    assert key_skills[:2] == ["- python (required)", "- fastapi (required)"]
+    assert len(key_skills) == 7
+
+
+def test_everyday_words_are_not_skills():
+    skills = SkillEngine(
+        "We are ready to go the extra mile. Rest assured, our R&D team values security.\n"
+        "Bring your node of ideas, 250 ml of coffee and a rest day.\n"
+        "Must know Python and Django"
+    ).skills
+    assert skills == ["python", "django"]
+
+
+def test_ambiguous_skills_need_their_usual_spelling():
+    engine = SkillEngine("Must know Python and Go, REST APIs and R.\nNice to have JS/TS, ML and Node.js")
+    assert set(engine.skills) == {"python", "go", "rest", "r", "javascript", "typescript", "machine learning", "node.js"}
+
+    counts = engine.mention_counts([
+        "Go the extra mile. I rest on weekends and lead R&D.",
+        "Built Go services behind a REST API, statistics in R and golang tooling."
+    ])
+    columns = {skill: column for column, skill in enumerate(engine.skills)}
+    assert counts[0].sum() == 0
+    assert counts[1, columns["go"]] == 2
+    assert counts[1, columns["rest"]] == 1
+    assert counts[1, columns["r"]] == 1
+
+
+def test_prompt_skips_words_the_requirements_do_not_ask_for():
+    block = compile_requirements(
+        "We go the extra mile. Rest assured, our R&D team values security.\nMust know Python"
+    ).render()
+    assert block.split("KEY SKILLS TO ASSESS:\n")[1].splitlines() == ["- python (required)"]
@@ -0,0 +1,81 @@
+import time
+from app.services.text_compactor import TRUNCATION_MARKER, collapse_repeated_phrases, compact_text, estimate_tokens, remove_boilerplate
+
+CV = """Jane Doe
+Senior Backend Engineer
+
+Summary
+Backend engineer with ten years of Python experience.
+
+Experience
+Acme Corp 2018-2024: built payment APIs in Python and PostgreSQL.
+Page 1 of 2
+Confidential - Jane Doe CV
+Globex 2014-2018: Java services on AWS.
+Page 2 of 2
+Confidential - Jane Doe CV
+
+Skills
+Python Python Python, Docker, Kubernetes
+
+Hobbies
+Chess, hiking and photography.
+Confidential - Jane Doe CV
+"""
+
+
+def test_boilerplate_is_removed():
+    lines = remove_boilerplate(["Page 3", "Header", "Text", "Header", "More", "Header"])
+    assert lines == ["Header", "Text", "More"]
+
+
+def test_compaction_is_idempotent():
+    once = compact_text(CV, token_budget=0).text
+    assert compact_text(once, token_budget=0).text == once
+
+    # Truncation markers are not mistaken for repeated page furniture on a second pass
+    for budget in (40, 60):
+        budgeted = compact_text(CV, token_budget=budget).text
+        assert budgeted.count(TRUNCATION_MARKER) >= 3
+        assert sum(estimate_tokens(line) + 1 for line in budgeted.split("\n")) <= budget
+        assert compact_text(budgeted, token_budget=budget).text == budgeted
+
+
+def test_compaction_keeps_content():
+    result = compact_text(CV, token_budget=0)
+    assert "Page 1 of 2" not in result.text
+    assert result.text.count("Confidential - Jane Doe CV") == 1
+    assert "Globex 2014-2018: Java services on AWS." in result.text
+    assert result.tokens_after < result.tokens_before
+    assert not result.truncated
+
+
+def test_budget_drops_low_priority_sections_first():
+    result = compact_text(CV, token_budget=60)
+    assert result.truncated
+    assert "Hobbies" not in result.text
+    assert "Skills" in result.text
+    assert estimate_tokens(result.text) <= 60 or TRUNCATION_MARKER in result.text
+
+
+def test_repeated_phrases_are_collapsed():
+    assert collapse_repeated_phrases("Senior Developer Senior Developer Senior Developer at Acme") == "Senior Developer at Acme"
+    assert collapse_repeated_phrases("Skills: Kubernetes Kubernetes Go") == "Skills: Kubernetes Go"
+    # Short words legitimately repeat ("had had", "C C")
+    assert collapse_repeated_phrases("it had had no effect") == "it had had no effect"
+
+
+def test_long_repetitive_lines_compact_in_linear_time():
+    # One enormous line of near-repeats (e.g. a table flattened by the extractor) used to
+    # make the repeated-phrase regex backtrack quadratically
+    near_repeats = " ".join(f"Responsible for backend service number {index} and its deployment" for index in range(1500))
+    exact_repeats = " ".join(["Python Django PostgreSQL developer"] * 3000)
+    text = "\n".join([near_repeats, exact_repeats, "x" * 90000])
+
+    start = time.perf_counter()
+    result = compact_text(text, token_budget=0)
+    assert time.perf_counter() - start < 2
+
+    lines = result.text.split("\n")
+    assert lines[0] == near_repeats
+    assert lines[1] == "Python Django PostgreSQL developer"
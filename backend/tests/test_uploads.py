@@ -0,0 +1,70 @@
+import asyncio
+import io
+import os
+import pytest
+from fastapi import UploadFile
+
+CONTENT = b"%PDF-1.4 resume contents"
+
+
+def upload(routes, data: bytes = CONTENT, name: str = "cv.pdf", total_size: int = 0):
+    return asyncio.run(routes.save_upload(UploadFile(io.BytesIO(data), filename=name), total_size))
+
+
+def test_identical_uploads_share_one_hardlinked_blob(api):
+    routes = api.routes
+    first = upload(routes)
+    second = upload(routes, name="copy.pdf")
+
+    assert first["file_id"] != second["file_id"]
+    assert first["content_hash"] == second["content_hash"]
+    assert first["stored_path"] == second["stored_path"]
+    # The blob is the upload file itself, not a copy
+    assert os.path.samefile(first["processing_path"], first["stored_path"])
+    assert os.path.dirname(first["processing_path"]) == routes.UPLOAD_DIR
+    # Stored bytes count the one physical copy
+    assert routes.file_store.totals() == {"files": 2, "blobs": 1, "bytes": len(CONTENT)}
+
+
+def test_upload_is_moved_when_it_cannot_be_hardlinked(api, monkeypatch):
+    def no_link(source, target):
+        raise OSError("cross-device link")
+
+    monkeypatch.setattr(os, "link", no_link)
+    saved = upload(api.routes)
+
+    assert saved["processing_path"] == saved["stored_path"]
+    assert os.path.exists(saved["stored_path"])
+    assert os.listdir(api.routes.UPLOAD_DIR) == []
+
+
+def test_oversized_uploads_are_rejected_and_removed(api, monkeypatch):
+    routes = api.routes
+    monkeypatch.setattr(routes, "MAX_FILE_SIZE", 10)
+    monkeypatch.setattr(routes, "MAX_TOTAL_SIZE", 30)
+    monkeypatch.setattr(routes, "UPLOAD_CHUNK_SIZE", 4)
+
+    with pytest.raises(routes.UploadTooLargeError, match="too large"):
+        upload(routes, b"x" * 11)
+    with pytest.raises(routes.UploadTooLargeError, match="Total file size"):
+        upload(routes, b"x" * 8, total_size=25)
+
+    assert os.listdir(routes.UPLOAD_DIR) == []
+    assert routes.file_store.totals()["files"] == 0
+    assert upload(routes, b"x" * 10)["size"] == 10
+
+
+def test_file_routes_serve_and_delete_stored_files(api):
+    routes = api.routes
+    saved = upload(routes)
+    routes.cv_index.add(saved["content_hash"], "cv.pdf", "Backend developer with Python and Docker experience.")
+    url = f"/api/file/{saved['file_id']}"
+
+    assert api.request("GET", url).content == CONTENT
+    assert api.request("GET", f"{url}/preview").headers["content-disposition"] == "inline; filename=cv.pdf"
+
+    assert api.request("DELETE", url).status_code == 200
+    assert not os.path.exists(saved["stored_path"])
+    assert saved["content_hash"] not in routes.cv_index
+    assert api.request("GET", url).status_code == 404
+    assert api.request("DELETE", url).status_code == 404
@@ -113,8 +113,16 @@ export default function Home() {
                   }
                   return updated
                 })
-              } else if (data.type === 'results') {
-                setResults(data.data.results || [])
+              } else if (data.type === 'result') {
+                // Results stream in as each CV is scored; keep the list ranked by match
+                const result: CVMatchResult = data.data.result
+                setResults((prev) => {
+                  const index = prev.findIndex((r) => r.match_percentage < result.match_percentage)
+                  return index === -1
+                    ? [...prev, result]
+                    : [...prev.slice(0, index), result, ...prev.slice(index)]
+                })
+              } else if (data.type === 'complete') {
                 setLoading(false)
                 // Keep progress visible for a moment, then hide
                 setTimeout(() => {